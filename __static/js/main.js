@@ -2,6 +2,7 @@ $(function(){
     /* globals $, Vue, networkManager */
     var loc = window.location;
     var params = new URLSearchParams(loc.search)
+    var counterEvents = document.getElementById('app').hasAttribute('data-counter-events');
    
     var app = new Vue({
         el: '#app',
@@ -10,12 +11,21 @@ $(function(){
                 movies: [],
                 ordering: '-publication_date',
                 createMode: false,
-                username: params.get('search')
+                username: params.get('search'),
+                events: null
             }   
         },
         mounted: function(){
-            var ordering = (window.location.hash || '').replace('#', '') || this.ordering;
-            this.sortMovies(ordering);
+            var ordering = (window.location.hash || '').replace('#', '') || params.get('ordering') || this.ordering;
+            var firstPage = this.getFirstPage();
+            
+            // the page embedded by the server, unless the hash asks another ordering
+            if (firstPage && firstPage.ordering === ordering && firstPage.search === this.username){
+                this.setMovies(firstPage.page['results']);
+                this.ordering = ordering;
+            } else {
+                this.sortMovies(ordering);
+            }
         },
         methods: {
             // utilities
@@ -26,12 +36,50 @@ $(function(){
                     }
                 }
             },
+            getFirstPage: function(){
+                var script = document.getElementById('movies-first-page');
+                
+                return script ? JSON.parse(script.textContent) : null;
+            },
             updateUrl : function(query_key, query_value){
                 params.set(query_key, query_value);
                 
                 var urlPath = loc.origin + loc.pathname + '?' + params.toString();
                 window.history.pushState('', document.title, urlPath);
             },
+            setMovies: function(movies){
+                this.movies = movies;
+                this.listenCounters();
+            },
+            // live counters of the listed movies when the server enables them, rows 
+            // are patched in place
+            listenCounters: function(){
+                var cmp = this;
+                
+                if (cmp.events){
+                    cmp.events.close();
+                    cmp.events = null;
+                }
+                if (!counterEvents || !window.EventSource || !cmp.movies.length){
+                    return;
+                }
+                
+                cmp.events = networkManager.getMovieEvents(cmp.movies.map(function(movie){
+                    return movie.id;
+                }));
+                cmp.events.addEventListener('counters', function(event){
+                    JSON.parse(event.data).forEach(function(counters){
+                        var index = cmp.getMovieIndex(counters.id);
+                        if (index !== undefined){
+                            cmp.movies[index].likes_counter = counters.likes_counter;
+                            cmp.movies[index].hates_counter = counters.hates_counter;
+                        }
+                    });
+                });
+                cmp.events.addEventListener('reset', function(){
+                    cmp.sortMovies(cmp.ordering);
+                });
+            },
             // event callbacks
             sortMovies: function(ordering){
                 var cmp = this;
@@ -39,7 +87,7 @@ $(function(){
                 networkManager
                     .getUserMovies(cmp.username, ordering)
                     .then(function(response){
-                        cmp.movies = response['results'];
+                        cmp.setMovies(response['results']);
                         cmp.ordering = ordering;
                         
                         // change url based on ordering
@@ -62,7 +110,7 @@ $(function(){
                 networkManager
                     .getUserMovies(username)
                     .then(function(response){
-                        cmp.movies = response['results'];
+                        cmp.setMovies(response['results']);
                         cmp.username = username;
                         cmp.updateUrl('search', username );
                     });
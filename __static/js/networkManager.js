@@ -6,7 +6,8 @@
     */
     
     var RESOURCES = {
-        MOVIES : '/api/movies/'
+        MOVIES : '/api/movies/',
+        MOVIE_EVENTS : '/api/movies/events/'
     };
     /*
         Utilities
@@ -69,6 +70,16 @@
         });
     }
     
+    function getMovieEvents(movieIds){
+        var base_url = RESOURCES.MOVIE_EVENTS;
+        
+        if (movieIds && movieIds.length){
+            base_url += '?ids=' + movieIds.join(',')
+        }
+        
+        return new EventSource(base_url);
+    }
+    
     /*
         Expose Api
     */
@@ -78,6 +89,7 @@
         'getUserMovies': getUserMovies,
         'setOpinion': setOpinion,
         'createMovie': createMovie,
+        'getMovieEvents': getMovieEvents,
     };
     
 })(window)
\ No newline at end of file
@@ -0,0 +1,5 @@
+"""
+Reproducible load benchmarks of the movies API.
+
+Run with `python manage.py benchmark_movies`, see its help for the options.
+"""
@@ -0,0 +1,37 @@
+from django.contrib.auth import get_user_model
+
+from movies.factory import seed_movies
+from movies.models import Movie, MovieOpinion
+
+
+USERNAME_FORMAT = 'bench{}'
+
+
+def build_dataset(users=10000, movies=100000, opinions=1000000, seed=0, batch_size=5000):
+    """
+    Create a deterministic dataset of users, movies and opinions.
+    
+    Args:
+        users(int): number of users
+        movies(int): number of movies owned by random users and published in
+                     the last year
+        opinions(int): number of opinions of random users for movies they do 
+                       not own, 70% likes
+        seed(int): random seed
+        batch_size(int): number of rows per insert
+    
+    Returns:
+        dict: size of the dataset
+    """
+    seed_movies(users, movies, opinions, seed=seed, username_format=USERNAME_FORMAT, 
+                batch_size=batch_size)
+    
+    return get_dataset_size()
+
+
+def get_dataset_size():
+    return {
+        'users': get_user_model().objects.count(),
+        'movies': Movie.objects.count(),
+        'opinions': MovieOpinion.objects.count(),
+    }
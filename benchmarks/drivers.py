@@ -0,0 +1,152 @@
+import json
+import re
+import threading
+import zlib
+from time import time
+from wsgiref.simple_server import make_server, WSGIServer, WSGIRequestHandler
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.test import Client
+from django.utils.six.moves import socketserver
+from django.utils.six.moves.http_client import HTTPConnection
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+def get_query_count(server_timing):
+    """
+    Get the sql query count of a response from its Server-Timing header.
+    """
+    match = SERVER_TIMING_QUERIES.search(server_timing or '')
+    return int(match.group(1)) if match else None
+
+
+def decode_content(content, encoding):
+    if encoding == 'gzip':
+        return zlib.decompress(content, 16 + zlib.MAX_WBITS)
+    if encoding == 'br':
+        return brotli.decompress(content)
+    return content
+
+
+class Result(object):
+    """
+    Response of a benchmark request, `content` as sent on the wire.
+    """
+    def __init__(self, status_code, elapsed, queries, content, encoding=None):
+        self.status_code = status_code
+        self.elapsed = elapsed
+        self.queries = queries
+        self.content = content
+        self.encoding = encoding
+    
+    @property
+    def size(self):
+        return len(self.content)
+    
+    def json(self):
+        return json.loads(decode_content(self.content, self.encoding).decode('utf-8'))
+
+
+class ClientDriver(object):
+    """
+    Send requests in process through a django test client per thread.
+    """
+    name = 'client'
+    
+    def __init__(self, accept_encoding=None):
+        self.local = threading.local()
+        self.accept_encoding = accept_encoding
+    
+    @property
+    def client(self):
+        if not hasattr(self.local, 'client'):
+            self.local.client = Client(HTTP_HOST='localhost')
+        return self.local.client
+    
+    def request(self, method, path, data=None, token=None):
+        headers = {'HTTP_AUTHORIZATION': 'Token {}'.format(token)} if token else {}
+        if self.accept_encoding:
+            headers['HTTP_ACCEPT_ENCODING'] = self.accept_encoding
+        
+        start = time()
+        try:
+            if method == 'POST':
+                response = self.client.post(path, json.dumps(data), content_type='application/json', **headers)
+            else:
+                response = self.client.get(path, **headers)
+        except Exception:
+            # the test client raises the exceptions that a server turns to 500
+            return Result(500, time() - start, None, b'')
+        elapsed = time() - start
+        
+        return Result(response.status_code, elapsed,
+                      get_query_count(response.get('Server-Timing')), response.content,
+                      response.get('Content-Encoding'))
+    
+    def close(self):
+        pass
+
+
+class ThreadedWSGIServer(socketserver.ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class QuietWSGIRequestHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class WSGIServerDriver(object):
+    """
+    Send requests over http to a threaded WSGI server running the project in
+    a background thread.
+    """
+    name = 'wsgi'
+    
+    def __init__(self, accept_encoding=None):
+        self.accept_encoding = accept_encoding
+        self.server = make_server('127.0.0.1', 0, WSGIHandler(),
+                                  server_class=ThreadedWSGIServer,
+                                  handler_class=QuietWSGIRequestHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+    
+    def request(self, method, path, data=None, token=None):
+        headers = {'Host': 'localhost'}
+        if self.accept_encoding:
+            headers['Accept-Encoding'] = self.accept_encoding
+        if token:
+            headers['Authorization'] = 'Token {}'.format(token)
+        body = None
+        if method == 'POST':
+            headers['Content-Type'] = 'application/json'
+            body = json.dumps(data)
+        
+        start = time()
+        connection = HTTPConnection(*self.server.server_address)
+        try:
+            connection.request(method, path, body, headers)
+            response = connection.getresponse()
+            content = response.read()
+        finally:
+            connection.close()
+        elapsed = time() - start
+        
+        return Result(response.status, elapsed,
+                      get_query_count(response.getheader('Server-Timing')), content,
+                      response.getheader('Content-Encoding'))
+    
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+DRIVERS = dict((driver.name, driver) for driver in (ClientDriver, WSGIServerDriver))
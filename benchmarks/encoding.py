@@ -0,0 +1,68 @@
+from collections import OrderedDict
+from time import time
+
+from django.conf import settings
+from django.test.utils import override_settings
+
+from rest_framework.renderers import JSONRenderer
+
+from core.compression import compress, get_available_encodings
+from core.renderers import JSON_BACKENDS, FastJSONRenderer, get_json_backend
+
+
+# levels measured per encoding, from fastest to smallest
+COMPRESSION_LEVELS = {
+    'gzip': ('GZIP_LEVEL', (1, 6, 9)),
+    'br': ('BROTLI_QUALITY', (1, 6, 11)),
+}
+
+
+def measure(function, repeat):
+    """
+    Get the best time of some calls of a function in milliseconds and its result.
+    """
+    best = None
+    for i in range(repeat):
+        start = time()
+        result = function()
+        elapsed = time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    
+    return round(best * 1000, 3), result
+
+
+def benchmark_encoding(data, repeat=20):
+    """
+    Measure the CPU time and size of the JSON of response data with every 
+    installed JSON backend and of its compression with every available 
+    encoding and level.
+    
+    Args:
+        data: response data, as a page of the movies list
+        repeat(int): calls per measurement, the best one is reported
+    
+    Returns:
+        dict: `renderers` and `compression` with milliseconds and bytes
+    """
+    report = OrderedDict([('renderers', OrderedDict()), ('compression', OrderedDict())])
+    
+    for backend in [None] + sorted(name for name in JSON_BACKENDS if get_json_backend(name)):
+        with override_settings(JSON_RENDERER={'BACKEND': backend}):
+            renderer = FastJSONRenderer()
+            elapsed, content = measure(lambda: renderer.render(data), repeat)
+        report['renderers'][backend or 'json'] = OrderedDict([('ms', elapsed), ('bytes', len(content))])
+    
+    content = JSONRenderer().render(data)
+    report['compression']['identity'] = OrderedDict([('ms', 0), ('bytes', len(content)), ('ratio', 1.0)])
+    for encoding in get_available_encodings():
+        setting, levels = COMPRESSION_LEVELS[encoding]
+        for level in levels:
+            with override_settings(COMPRESSION=dict(settings.COMPRESSION, **{setting: level})):
+                elapsed, compressed = measure(lambda: compress(content, encoding), repeat)
+            report['compression']['{}:{}'.format(encoding, level)] = OrderedDict([
+                ('ms', elapsed),
+                ('bytes', len(compressed)),
+                ('ratio', round(float(len(compressed)) / len(content), 3)),
+            ])
+    
+    return report
@@ -0,0 +1,167 @@
+import platform
+import random
+import threading
+from collections import OrderedDict, Counter
+from time import time
+
+import django
+from django.db import connection
+from django.utils.timezone import now
+
+
+COMPARED_METRICS = ('p50_ms', 'p99_ms', 'queries_per_request', 'bytes_per_request', 'throughput_rps')
+
+
+def get_percentile(samples, percentile):
+    """
+    Get the nearest rank percentile of sorted samples.
+    """
+    index = max(int(round(percentile * len(samples) + 0.5)) - 1, 0)
+    return samples[min(index, len(samples) - 1)]
+
+
+def run_scenario(driver, scenario, requests=50, warmup=5, seed=0, concurrency=1):
+    """
+    Send the requests of a scenario after some warmup requests.
+    
+    Args:
+        driver(benchmarks.drivers.ClientDriver|WSGIServerDriver):
+        scenario(benchmarks.scenarios.Scenario):
+        requests(int): number of measured requests
+        warmup(int): number of requests sent before measuring
+        seed(int): random seed, combined with the driver and scenario names so 
+                   that drivers do not repeat the votes of each other
+        concurrency(int): number of client threads sharing the requests
+    
+    Returns:
+        dict: latency percentiles in milliseconds, queries per request,
+              throughput in requests per second and status codes
+    """
+    results = []
+    
+    def send(rng, count, measured):
+        state = {}
+        for i in range(count):
+            method, path, data, token = scenario.get_request(rng, state)
+            result = driver.request(method, path, data, token)
+            scenario.set_result(result, state)
+            if measured:
+                results.append(result)
+    
+    seed = '{}:{}:{}'.format(seed, driver.name, scenario.name)
+    send(random.Random('{}:warmup'.format(seed)), warmup, False)
+    
+    start = time()
+    if concurrency == 1:
+        send(random.Random('{}:0'.format(seed)), requests, True)
+    else:
+        threads = [threading.Thread(target=send, args=(random.Random('{}:{}'.format(seed, index)),
+                                                       requests // concurrency + (index < requests % concurrency),
+                                                       True))
+                   for index in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    elapsed = time() - start
+    
+    return summarize(results, elapsed)
+
+
+def summarize(results, elapsed):
+    samples = sorted(result.elapsed * 1000 for result in results)
+    queries = [result.queries for result in results if result.queries is not None]
+    status_codes = Counter(str(result.status_code) for result in results)
+    
+    return OrderedDict([
+        ('requests', len(results)),
+        ('status_codes', dict(status_codes)),
+        ('p50_ms', round(get_percentile(samples, 0.5), 3)),
+        ('p99_ms', round(get_percentile(samples, 0.99), 3)),
+        ('mean_ms', round(sum(samples) / len(samples), 3)),
+        ('max_ms', round(samples[-1], 3)),
+        ('queries_per_request', round(float(sum(queries)) / len(queries), 2) if queries else None),
+        ('bytes_per_request', round(float(sum(result.size for result in results)) / len(results), 1)),
+        ('throughput_rps', round(len(results) / elapsed, 2)),
+    ])
+
+
+def run_benchmark(drivers, scenarios, dataset, requests=50, warmup=5, seed=0, concurrency=1,
+                  accept_encoding=None):
+    """
+    Run all scenarios with every driver.
+    
+    Args:
+        drivers(list<class>): driver classes of benchmarks.drivers
+        scenarios(list<benchmarks.scenarios.Scenario>):
+        dataset(dict): size of the dataset, reported in meta
+        accept_encoding(str): Accept-Encoding header of the requests
+    
+    Returns:
+        dict: `meta` of the run and `results` per driver and scenario
+    """
+    report = OrderedDict([
+        ('meta', OrderedDict([
+            ('timestamp', now().isoformat()),
+            ('python', platform.python_version()),
+            ('django', django.get_version()),
+            ('database', connection.vendor),
+            ('dataset', dataset),
+            ('requests', requests),
+            ('warmup', warmup),
+            ('concurrency', concurrency),
+            ('accept_encoding', accept_encoding),
+            ('seed', seed),
+        ])),
+        ('results', OrderedDict()),
+    ])
+    
+    for driver_class in drivers:
+        driver = driver_class(accept_encoding)
+        try:
+            results = report['results'][driver.name] = OrderedDict()
+            for scenario in scenarios:
+                results[scenario.name] = run_scenario(driver, scenario, requests, warmup,
+                                                      seed, concurrency)
+        finally:
+            driver.close()
+    
+    return report
+
+
+def compare_reports(baseline, current, threshold=0.1):
+    """
+    Compare the metrics of the scenarios of two reports.
+    
+    Args:
+        baseline(dict): report of `run_benchmark`
+        current(dict): report of `run_benchmark`
+        threshold(float): relative change of latency or queries, or drop of
+                          throughput, reported as regression
+    
+    Returns:
+        dict: baseline, current and relative change of every metric per
+              driver and scenario and the list of regressions
+    """
+    comparison = OrderedDict([('results', OrderedDict()), ('regressions', [])])
+    
+    for driver, scenarios in current['results'].items():
+        for name, metrics in scenarios.items():
+            baseline_metrics = baseline['results'].get(driver, {}).get(name)
+            if baseline_metrics is None:
+                continue
+            
+            compared = comparison['results'].setdefault(driver, OrderedDict())[name] = OrderedDict()
+            for metric in COMPARED_METRICS:
+                old, new = baseline_metrics.get(metric), metrics.get(metric)
+                change = round(float(new) / old - 1, 4) if old and new is not None else None
+                compared[metric] = OrderedDict([('baseline', old), ('current', new), ('change', change)])
+                
+                if change is None:
+                    continue
+                regressed = change < -threshold if metric == 'throughput_rps' else change > threshold
+                if regressed:
+                    comparison['regressions'].append('{} {} {}'.format(driver, name, metric))
+    
+    comparison['regressions'].sort()
+    return comparison
@@ -0,0 +1,131 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils.six.moves.urllib.parse import urlencode, urlsplit
+
+from rest_framework.authtoken.models import Token
+
+from movies.models import Movie, OPINION_LIKE, OPINION_HATE
+from movies.viewsets import MovieViewSet
+
+
+class Fixtures(object):
+    """
+    Users, tokens and movies the scenarios pick their requests from.
+    
+    Args:
+        voters(int): number of users with tokens sending authenticated requests
+    """
+    def __init__(self, voters=100):
+        users = get_user_model().objects.order_by('pk')[:voters]
+        self.tokens = dict((user.pk, Token.objects.get_or_create(user=user)[0].key) for user in users)
+        self.voters = sorted(self.tokens.keys())
+        
+        self.movies = list(Movie.objects.order_by('pk').values_list('pk', 'user_id'))
+        owners = set(user_id for pk, user_id in self.movies)
+        self.owners = list(get_user_model().objects.filter(pk__in=owners
+                                                  ).order_by('pk').values_list('username', flat=True))
+    
+    def get_voter(self, rng):
+        user_id = rng.choice(self.voters)
+        return user_id, self.tokens[user_id]
+
+
+class Scenario(object):
+    """
+    Requests of a benchmark scenario, `state` is kept per client thread.
+    """
+    name = None
+    
+    def __init__(self, fixtures):
+        self.fixtures = fixtures
+    
+    def get_request(self, rng, state):
+        """
+        Returns:
+            tuple: method, path, data and token of the next request
+        """
+        raise NotImplementedError
+    
+    def set_result(self, result, state):
+        pass
+
+
+class ListScenario(Scenario):
+    """
+    Authenticated list pages of an ordering, with or without search, random
+    one of the first 10 limit|offset pages or the next 10 cursor pages.
+    """
+    max_pages = 10
+    
+    def __init__(self, fixtures, ordering, search, pagination):
+        super(ListScenario, self).__init__(fixtures)
+        self.ordering = ordering
+        self.search = search
+        self.pagination = pagination
+        self.name = 'list ordering={} search={} pagination={}'.format(ordering, int(search), pagination)
+    
+    def get_request(self, rng, state):
+        token = self.fixtures.get_voter(rng)[1]
+        
+        if self.pagination == 'cursor' and state.get('next') and state['pages'] < self.max_pages:
+            state['pages'] += 1
+            return 'GET', state['next'], None, token
+        
+        params = [('ordering', self.ordering)]
+        if self.search:
+            params.append(('search', rng.choice(self.fixtures.owners)))
+        if self.pagination == 'cursor':
+            params.append(('pagination', 'cursor'))
+            state['pages'] = 1
+        else:
+            params.append(('offset', rng.randrange(self.max_pages) * settings.REST_FRAMEWORK['PAGE_SIZE']))
+        
+        return 'GET', '{}?{}'.format(reverse('movie-list'), urlencode(params)), None, token
+    
+    def set_result(self, result, state):
+        if self.pagination == 'cursor':
+            next_url = result.json().get('next') if result.status_code == 200 else None
+            state['next'] = '{0.path}?{0.query}'.format(urlsplit(next_url)) if next_url else None
+
+
+class AnonymousListScenario(Scenario):
+    """
+    Anonymous first page of the default ordering, served by the list cache 
+    when it is enabled on a shared cache.
+    """
+    name = 'list anonymous'
+    
+    def get_request(self, rng, state):
+        return 'GET', reverse('movie-list'), None, None
+
+
+class OpinionScenario(Scenario):
+    """
+    Random opinions of random users for movies they do not own.
+    """
+    name = 'opinion'
+    
+    def get_request(self, rng, state):
+        user_id, token = self.fixtures.get_voter(rng)
+        movie_id, owner_id = rng.choice(self.fixtures.movies)
+        while owner_id == user_id:
+            movie_id, owner_id = rng.choice(self.fixtures.movies)
+        
+        data = {'opinion': rng.choice((OPINION_LIKE, OPINION_HATE, None))}
+        return 'POST', reverse('movie-opinion', kwargs={'pk': movie_id}), data, token
+
+
+def get_scenarios(fixtures):
+    """
+    Get the list scenarios of every ordering, search and pagination
+    combination followed by the anonymous list and opinion scenarios.
+    """
+    scenarios = []
+    for field in MovieViewSet.ordering_fields:
+        for ordering in ('-' + field, field):
+            for search in (False, True):
+                for pagination in ('limit', 'cursor'):
+                    scenarios.append(ListScenario(fixtures, ordering, search, pagination))
+    
+    return scenarios + [AnonymousListScenario(fixtures), OpinionScenario(fixtures)]
@@ -0,0 +1,118 @@
+import random
+import threading
+from collections import OrderedDict
+from time import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, connections, DatabaseError
+from django.test.utils import override_settings
+
+from movies.counters import set_opinion
+from movies.models import Movie, OPINION_LIKE, OPINION_HATE
+
+from .runner import get_percentile
+
+
+# settings.SQLITE of the compared profiles, `default` is SQLite as Django
+# opens it and None stands for the configured profile
+SQLITE_PROFILES = OrderedDict([
+    ('default', {
+        'PRAGMAS': (
+            ('journal_mode', 'DELETE'),
+            ('synchronous', 'FULL'),
+            ('mmap_size', 0),
+            ('temp_store', 'DEFAULT'),
+        ),
+        'IMMEDIATE_TRANSACTIONS': False,
+    }),
+    ('tuned', None),
+])
+
+
+def run_writes(user_ids, movie_ids, threads=8, writes=100, seed=0):
+    """
+    Set random opinions from many threads, every thread with its own
+    database connection.
+    
+    Args:
+        user_ids(list<int>): ids of the voting users
+        movie_ids(list<int>): ids of the voted movies
+        threads(int): number of writing threads
+        writes(int): opinions set per thread
+        seed(int): random seed
+    
+    Returns:
+        dict: writes, errors, latency percentiles and throughput
+    """
+    samples = []
+    errors = []
+    lock = threading.Lock()
+    User = get_user_model()
+    
+    def write(rng):
+        try:
+            for i in range(writes):
+                user = User(pk=rng.choice(user_ids))
+                movie = Movie(pk=rng.choice(movie_ids))
+                opinion = rng.choice((OPINION_LIKE, OPINION_HATE, None))
+                
+                start = time()
+                try:
+                    set_opinion(user, movie, opinion)
+                except DatabaseError as e:
+                    with lock:
+                        errors.append(str(e))
+                    continue
+                elapsed = time() - start
+                
+                with lock:
+                    samples.append(elapsed * 1000)
+        finally:
+            connection.close()
+    
+    workers = [threading.Thread(target=write, args=(random.Random('{}:{}'.format(seed, index)), ))
+               for index in range(threads)]
+    start = time()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time() - start
+    
+    samples.sort()
+    return OrderedDict([
+        ('writes', len(samples)),
+        ('errors', len(errors)),
+        ('p50_ms', round(get_percentile(samples, 0.5), 3) if samples else None),
+        ('p99_ms', round(get_percentile(samples, 0.99), 3) if samples else None),
+        ('throughput_wps', round(len(samples) / elapsed, 2)),
+    ])
+
+
+def benchmark_writes(threads=8, writes=100, seed=0):
+    """
+    Run the same concurrent opinion writes with every SQLite profile of
+    SQLITE_PROFILES on the default database, connections are reopened so
+    that every profile applies to all of them.
+    
+    Returns:
+        dict: run_writes report per profile and the throughput of the
+              configured profile relative to the default one
+    """
+    rng = random.Random(seed)
+    user_ids = list(get_user_model().objects.order_by('pk').values_list('pk', flat=True))
+    movie_ids = list(Movie.objects.order_by('pk').values_list('pk', flat=True))
+    user_ids = rng.sample(user_ids, min(len(user_ids), 1000))
+    movie_ids = rng.sample(movie_ids, min(len(movie_ids), 1000))
+    
+    report = OrderedDict([('threads', threads), ('writes_per_thread', writes), ('profiles', OrderedDict())])
+    for name, profile in SQLITE_PROFILES.items():
+        with override_settings(SQLITE=profile or settings.SQLITE):
+            connections.close_all()
+            report['profiles'][name] = run_writes(user_ids, movie_ids, threads, writes, seed)
+        connections.close_all()
+    
+    throughputs = [result['throughput_wps'] for result in report['profiles'].values()]
+    report['speedup'] = round(throughputs[-1] / throughputs[0], 2) if throughputs[0] else None
+    return report
@@ -3,6 +3,7 @@ from django.conf.urls import url, include
 from rest_framework.documentation import include_docs_urls
 from rest_framework.routers import DefaultRouter
 
+from core.views import MetricsView
 from movies import viewsets
 
 # Create a router and register our viewsets with it.
@@ -13,5 +14,6 @@ router.register(r'movies', viewsets.MovieViewSet)
 # The API URLs are now determined automatically by the router.
 urlpatterns = [
     url(r'^docs/', include_docs_urls(title='Movierama API')),
+    url(r'^metrics/$', MetricsView.as_view(), name='metrics'),
     url(r'^', include(router.urls))
 ]
\ No newline at end of file
@@ -62,6 +62,8 @@ INSTALLED_APPS += THIRD_PARTY_APPS + LOCAL_APPS
 
 
 MIDDLEWARE_CLASSES = [
+    'core.instrumentation.InstrumentationMiddleware',
+    'core.compression.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -98,11 +100,138 @@ WSGI_APPLICATION = 'config.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        # django.db.backends.sqlite3 configured with settings.SQLITE
+        'ENGINE': 'core.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # connections are kept per thread between requests
+        'CONN_MAX_AGE': 60,
     }
 }
 
+# pragmas of every new SQLite connection of core.backends.sqlite3. WAL lets 
+# reads run during a write and, with synchronous NORMAL, commits without 
+# syncing every transaction, busy_timeout is in milliseconds and mmap_size in 
+# bytes. IMMEDIATE_TRANSACTIONS takes the write lock when transactions begin,
+# so every transaction is a writer and read only atomic blocks wait for the
+# writes too.
+SQLITE = {
+    'PRAGMAS': (
+        ('busy_timeout', 5000),
+        ('journal_mode', 'WAL'),
+        ('synchronous', 'NORMAL'),
+        ('mmap_size', 256 * 1024 * 1024),
+        ('temp_store', 'MEMORY'),
+    ),
+    'IMMEDIATE_TRANSACTIONS': True,
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/1.9/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# users of API tokens and sessions, kept for at most TIMEOUT seconds and 
+# removed on logout, token rotation and user changes, TIMEOUT 0 disables it.
+# CACHE must be shared by the processes (memcached, database, file...), it is
+# disabled on local memory caches as entries removed by a process would stay
+# in the others. Users changed with `QuerySet.update()` send no signals and
+# are not removed, they are seen by cached requests after TIMEOUT at most
+AUTH_CACHE = {
+    'CACHE': 'default',
+    'TIMEOUT': 60 * 5,
+}
+
+# per request sql count, sql time, serializer time and total time, kept in a
+# histogram of the last SLOTS windows of WINDOW seconds, see /api/metrics/
+INSTRUMENTATION = {
+    'WINDOW': 60,
+    'SLOTS': 5,
+    'SERVER_TIMING': True,
+}
+
+# compact API JSON of core.renderers.FastJSONRenderer with the BACKEND 
+# package (ujson|orjson) when it is installed, None renders with the stdlib
+JSON_RENDERER = {
+    'BACKEND': 'ujson',
+}
+
+# responses of CONTENT_TYPES larger than MIN_SIZE bytes are compressed with
+# the first of ENCODINGS (br needs brotli) the client accepts
+COMPRESSION = {
+    'ENCODINGS': ('br', 'gzip'),
+    'MIN_SIZE': 1024,
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 6,
+    'CONTENT_TYPES': (
+        'application/json',
+        'application/x-ndjson',
+        'text/csv',
+        'application/javascript',
+        'text/javascript',
+        'text/css',
+    ),
+}
+
+# anonymous movie list pages, TIMEOUT 0 disables it. CACHE must be shared by
+# the processes (memcached, database, file...), it is disabled on local 
+# memory caches as the catalog versions bumped by a process on changes would
+# not be seen by the others
+MOVIES_LIST_CACHE = {
+    'CACHE': 'default',
+    'TIMEOUT': 60 * 5,
+}
+
+# number of counter slots per movie that votes are spread to, rolled up to 
+# movie counters with `manage.py rollup_counter_shards`, 0 disables them
+MOVIES_COUNTER_SHARDS = 0
+
+# trending score of movies, every DECAY seconds of newer publication weigh as
+# much as ten times the votes, hates weigh HATE_WEIGHT likes
+MOVIES_TRENDING = {
+    'DECAY': 45000,
+    'HATE_WEIGHT': 1,
+}
+
+# max number of opinions per bulk opinions request
+MOVIES_BULK_OPINIONS_LIMIT = 100
+
+# opinions of the opinion endpoint are queued and answered with 202, WORKERS 
+# threads per process apply them in batches of BATCH_SIZE and check for new 
+# ones every POLL_INTERVAL seconds, `manage.py drain_opinion_outbox` applies 
+# the queued opinions of stopped processes. Batches claimed by a worker are
+# claimed again by others after CLAIM_TIMEOUT seconds, opinions that fail 
+# MAX_ATTEMPTS times are kept with their `error` and no longer applied
+MOVIES_OPINION_OUTBOX = {
+    'ENABLED': False,
+    'WORKERS': 2,
+    'BATCH_SIZE': 100,
+    'POLL_INTERVAL': 1.0,
+    'CLAIM_TIMEOUT': 60,
+    'MAX_ATTEMPTS': 3,
+}
+
+# render movie lists from `.values()` rows with MovieValuesSerializer instead
+# of MovieSerializer, same output with less work per row
+MOVIES_VALUES_SERIALIZER = False
+
+# server sent events of counter changes at /api/movies/events/, changes of a
+# movie within COALESCE_WINDOW seconds are sent once, clients with more than 
+# MAX_PENDING unsent movies are told to reload, RETRY is in milliseconds.
+# Every stream holds a server thread for as long as the homepage is open, so
+# the endpoint and the homepage subscription are off unless ENABLED
+MOVIES_EVENTS = {
+    'ENABLED': False,
+    'COALESCE_WINDOW': 0.5,
+    'HEARTBEAT': 15,
+    'MAX_PENDING': 1000,
+    'RETRY': 3000,
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/1.9/ref/settings/#auth-password-validators
@@ -175,10 +304,14 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny'
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
+        'core.authentication.CachedSessionAuthentication',
+        'core.authentication.CachedTokenAuthentication',
     ],
     'EXCEPTION_HANDLER': 'core.api.custom_exception_handler',
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     'PAGE_SIZE': 100
 }
@@ -2,7 +2,29 @@
 from __future__ import unicode_literals
 
 from django.apps import AppConfig
+from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_logged_out
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+    
+    def ready(self):
+        from django.contrib.sessions.models import Session
+        from rest_framework.authtoken.models import Token
+        
+        from core import authentication
+        from core.instrumentation import instrument_connection
+        
+        connection_created.connect(instrument_connection)
+        
+        # cached authentication entries of changed users, tokens and sessions
+        User = get_user_model()
+        post_save.connect(authentication.invalidate_user, sender=User)
+        post_delete.connect(authentication.invalidate_user, sender=User)
+        post_save.connect(authentication.invalidate_token, sender=Token)
+        post_delete.connect(authentication.invalidate_token, sender=Token)
+        post_delete.connect(authentication.invalidate_session, sender=Session)
+        user_logged_out.connect(authentication.invalidate_logged_out_session)
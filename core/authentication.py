@@ -0,0 +1,138 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model, SESSION_KEY, HASH_SESSION_KEY
+from django.core.cache import caches
+from django.utils.crypto import constant_time_compare
+from django.utils.encoding import force_bytes
+
+from rest_framework.authentication import SessionAuthentication, TokenAuthentication
+
+from core.cache import is_shared_cache
+
+
+def get_cache():
+    return caches[settings.AUTH_CACHE['CACHE']]
+
+
+def get_timeout():
+    """
+    Get the TIMEOUT of settings.AUTH_CACHE, 0 when its cache is not shared by 
+    the processes of the site, as the other processes would keep accepting 
+    the revoked credentials they cached.
+    """
+    config = settings.AUTH_CACHE
+    return config['TIMEOUT'] if is_shared_cache(config['CACHE']) else 0
+
+
+def get_user_key(user_id):
+    return 'auth:user:{}'.format(user_id)
+
+
+def get_token_key(token):
+    # keys are hashed so that the cache does not hold credentials
+    return 'auth:token:{}'.format(hashlib.sha256(force_bytes(token)).hexdigest())
+
+
+def get_session_key(session_key):
+    return 'auth:session:{}'.format(hashlib.sha256(force_bytes(session_key)).hexdigest())
+
+
+def get_cached_user(user_id):
+    """
+    Get an active user from the cache or the database, users are cached until
+    they change or settings.AUTH_CACHE TIMEOUT expires.
+    
+    Returns:
+        django.conf.settings.AUTH_USER_MODEL: user or None
+    """
+    cache = get_cache()
+    user = cache.get(get_user_key(user_id))
+    if user is None:
+        user = get_user_model()._default_manager.filter(pk=user_id).first()
+        if user is None:
+            return None
+        cache.set(get_user_key(user_id), user, get_timeout())
+    
+    return user if user.is_active else None
+
+
+def cache_user(user):
+    get_cache().set(get_user_key(user.pk), user, get_timeout())
+
+
+def invalidate_user(sender, instance, **kwargs):
+    get_cache().delete(get_user_key(instance.pk))
+
+
+def invalidate_token(sender, instance, **kwargs):
+    get_cache().delete(get_token_key(instance.key))
+
+
+def invalidate_session(sender, instance, **kwargs):
+    get_cache().delete(get_session_key(instance.session_key))
+
+
+def invalidate_logged_out_session(sender, request, **kwargs):
+    session = getattr(request, 'session', None)
+    if session is not None and session.session_key:
+        get_cache().delete(get_session_key(session.session_key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication with the users of tokens cached for
+    settings.AUTH_CACHE TIMEOUT seconds in a shared cache, entries are removed 
+    when tokens are rotated or deleted and when users change.
+    """
+    def authenticate_credentials(self, key):
+        timeout = get_timeout()
+        if not timeout:
+            return super(CachedTokenAuthentication, self).authenticate_credentials(key)
+        
+        cache = get_cache()
+        user_id = cache.get(get_token_key(key))
+        if user_id is not None:
+            user = get_cached_user(user_id)
+            if user is not None:
+                return user, None
+        
+        user, token = super(CachedTokenAuthentication, self).authenticate_credentials(key)
+        cache.set(get_token_key(key), user.pk, timeout)
+        cache_user(user)
+        return user, token
+
+
+class CachedSessionAuthentication(SessionAuthentication):
+    """
+    Session authentication with the users of session keys cached for
+    settings.AUTH_CACHE TIMEOUT seconds or the expiry of the session in a 
+    shared cache, entries are removed on logout and session deletion and are 
+    rejected once the session hash of the user changes, as 
+    django.contrib.auth.get_user does.
+    """
+    def authenticate(self, request):
+        timeout = get_timeout()
+        session = getattr(request._request, 'session', None)
+        session_key = session.session_key if session is not None else None
+        if not timeout or not session_key:
+            return super(CachedSessionAuthentication, self).authenticate(request)
+        
+        cache = get_cache()
+        cached = cache.get(get_session_key(session_key))
+        if cached is not None:
+            user_id, session_hash = cached
+            user = get_cached_user(user_id)
+            if user is not None and constant_time_compare(session_hash, user.get_session_auth_hash()):
+                request._request.user = user
+                self.enforce_csrf(request)
+                return user, None
+        
+        result = super(CachedSessionAuthentication, self).authenticate(request)
+        if result is not None and session.get(SESSION_KEY) is not None:
+            user = result[0]
+            cache.set(get_session_key(session_key), (user.pk, session.get(HASH_SESSION_KEY, '')),
+                      min(timeout, session.get_expiry_age()))
+            cache_user(user)
+        
+        return result
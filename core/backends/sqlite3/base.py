@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    SQLite backend applying the PRAGMAS of settings.SQLITE to new connections
+    and beginning transactions with BEGIN IMMEDIATE when 
+    IMMEDIATE_TRANSACTIONS is set.
+    
+    Deferred transactions that read before they write fail with `database is 
+    locked` as soon as another connection writes, whatever the busy timeout, 
+    immediate ones wait for the write lock up to the busy timeout instead. 
+    Every transaction becomes a writer then, `transaction.atomic` blocks that 
+    only read wait for the write lock as well and run one at a time with the
+    writes, reads outside of transactions are not affected.
+    """
+    def get_new_connection(self, conn_params):
+        connection = super(DatabaseWrapper, self).get_new_connection(conn_params)
+        for name, value in settings.SQLITE['PRAGMAS']:
+            connection.execute('PRAGMA {}={}'.format(name, value))
+        
+        return connection
+    
+    def _start_transaction_under_autocommit(self):
+        if settings.SQLITE['IMMEDIATE_TRANSACTIONS']:
+            self.cursor().execute('BEGIN IMMEDIATE')
+        else:
+            super(DatabaseWrapper, self)._start_transaction_under_autocommit()
@@ -0,0 +1,22 @@
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+# backends whose entries are private to a process, other processes neither
+# read nor invalidate them
+LOCAL_CACHE_BACKENDS = (LocMemCache, DummyCache)
+
+
+def is_shared_cache(alias):
+    """
+    Check whether a cache is shared by the processes of the site, so that
+    entries invalidated by a process are invalidated for all of them.
+    
+    Args:
+        alias(str): alias of settings.CACHES
+    
+    Returns:
+        bool: False for local memory and dummy caches
+    """
+    return not isinstance(caches[alias], LOCAL_CACHE_BACKENDS)
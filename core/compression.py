@@ -0,0 +1,134 @@
+import re
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+ACCEPT_ENCODING_RE = re.compile(r'^\s*([^\s;]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*$')
+
+
+def get_available_encodings():
+    """
+    Get the enabled encodings of settings.COMPRESSION in order of preference,
+    `br` only when brotli is installed.
+    """
+    return [encoding for encoding in settings.COMPRESSION['ENCODINGS']
+            if encoding == 'gzip' or (encoding == 'br' and brotli is not None)]
+
+
+def get_accepted_encoding(accept_encoding, encodings):
+    """
+    Get the encoding of the highest quality of an Accept-Encoding header,
+    ties are resolved by the order of the available encodings.
+
+    Args:
+        accept_encoding(str): Accept-Encoding header
+        encodings(list<str>): available encodings in order of preference
+
+    Returns:
+        str: accepted encoding or None
+    """
+    qualities = {}
+    for token in accept_encoding.split(','):
+        match = ACCEPT_ENCODING_RE.match(token)
+        if not match:
+            continue
+        try:
+            qualities[match.group(1).lower()] = float(match.group(2)) if match.group(2) else 1.0
+        except ValueError:
+            continue
+
+    accepted = [(qualities.get(encoding, qualities.get('*', 0)), -index, encoding)
+                for index, encoding in enumerate(encodings)]
+    quality, index, encoding = max(accepted) if accepted else (0, 0, None)
+    return encoding if quality > 0 else None
+
+
+def get_compressor(encoding):
+    """
+    Get a streaming compressor of an encoding with the level of
+    settings.COMPRESSION.
+
+    Returns:
+        tuple: compress and flush functions of a chunk, finish function
+    """
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=settings.COMPRESSION['BROTLI_QUALITY'])
+        return compressor.process, compressor.flush, compressor.finish
+
+    # gzip container of a deflate stream
+    compressor = zlib.compressobj(settings.COMPRESSION['GZIP_LEVEL'], zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+
+def compress(content, encoding):
+    """
+    Compress bytes with an encoding of get_available_encodings.
+    """
+    process, flush, finish = get_compressor(encoding)
+    return process(content) + finish()
+
+
+def compress_sequence(sequence, encoding):
+    """
+    Compress the chunks of a streaming response, every chunk is flushed so
+    that clients get it without waiting for the next ones.
+    """
+    process, flush, finish = get_compressor(encoding)
+    for chunk in sequence:
+        data = process(chunk) + flush()
+        if data:
+            yield data
+    yield finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress responses of settings.COMPRESSION content types with the encoding
+    the client prefers among brotli and gzip.
+
+    Responses shorter than MIN_SIZE, or that would not get shorter, are sent
+    as they are. Etags of compressed responses become weak, as the bytes
+    differ from the identity response.
+    """
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding') or not self.is_compressible(response):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding', ))
+        encoding = get_accepted_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''),
+                                         get_available_encodings())
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = compress_sequence(response.streaming_content, encoding)
+            del response['Content-Length']
+        else:
+            if len(response.content) < settings.COMPRESSION['MIN_SIZE']:
+                return response
+
+            compressed = compress(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+
+        return response
+
+    def is_compressible(self, response):
+        content_type = response.get('Content-Type', '').split(';', 1)[0].strip().lower()
+        return content_type in settings.COMPRESSION['CONTENT_TYPES']
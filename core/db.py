@@ -0,0 +1,65 @@
+from django.db import connections, DEFAULT_DB_ALIAS
+
+
+def explain(sql, params=None, using=DEFAULT_DB_ALIAS):
+    """
+    Get the query plan of the database planner for an sql query.
+    
+    Args:
+        sql(str): sql query
+        params(list): sql query params
+        using(str): database alias
+    
+    Returns:
+        list<str>: query plan lines
+    """
+    connection = connections[using]
+    
+    if connection.vendor == 'sqlite':
+        explain_sql, plan_column = 'EXPLAIN QUERY PLAN ', -1
+    elif connection.vendor == 'postgresql':
+        explain_sql, plan_column = 'EXPLAIN ', 0
+    else:
+        raise NotImplementedError('EXPLAIN is not supported for `{}`'.format(connection.vendor))
+    
+    with connection.cursor() as cursor:
+        cursor.execute(explain_sql + sql, params)
+        return [row[plan_column] for row in cursor.fetchall()]
+
+
+def uses_index(plan, index_name):
+    """
+    Check that a query plan reads rows through an index.
+    
+    Args:
+        plan(list<str>): query plan lines of `explain`
+        index_name(str): name of the index
+    
+    Returns:
+        bool: True when the index is used
+    """
+    return any(' {}'.format(index_name) in line for line in plan)
+
+
+def is_ordered_by_index(plan, using=DEFAULT_DB_ALIAS):
+    """
+    Check that a query plan reads rows through an index without sorting them.
+    
+    Args:
+        plan(list<str>): query plan lines of `explain`
+        using(str): database alias
+    
+    Returns:
+        bool: True when the ordering is served by an index
+    """
+    vendor = connections[using].vendor
+    
+    if vendor == 'sqlite':
+        uses_index = any('USING INDEX' in line or 'USING COVERING INDEX' in line for line in plan)
+        is_sorted = any('USE TEMP B-TREE FOR' in line and 'ORDER BY' in line for line in plan)
+    else:
+        uses_index = any('Index Scan' in line or 'Index Only Scan' in line for line in plan)
+        is_sorted = any(line.strip().lstrip('-> ').startswith(('Sort', 'Incremental Sort')) 
+                        for line in plan)
+    
+    return uses_index and not is_sorted
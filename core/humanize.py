@@ -0,0 +1,126 @@
+from __future__ import unicode_literals
+
+import calendar
+from datetime import datetime, timedelta
+
+from django.template import defaultfilters
+from django.utils.timesince import TIMESINCE_CHUNKS
+from django.utils.timezone import is_aware, utc
+from django.utils.translation import pgettext, ugettext, ungettext, get_language
+
+
+# rendered strings per language and bucket, buckets are bounded by the chunks
+# of timesince so the cache is only cleared as a safety net
+MAX_CACHED_STRINGS = 10000
+
+_cache = {}
+
+
+def get_timesince_bucket(d, now):
+    """
+    Get the chunk counts `django.utils.timesince.timesince` renders for the
+    time from `d` to `now`, timestamps with the same bucket render the same.
+    
+    Returns:
+        tuple: first chunk index with its count and second chunk count, or
+               None for `0 minutes`
+    """
+    delta = now - d
+    
+    leapdays = calendar.leapdays(d.year, now.year)
+    if leapdays != 0:
+        if calendar.isleap(d.year):
+            leapdays -= 1
+        elif calendar.isleap(now.year):
+            leapdays += 1
+    delta -= timedelta(leapdays)
+    
+    since = delta.days * 24 * 60 * 60 + delta.seconds
+    if since <= 0:
+        return None
+    
+    for index, (seconds, name) in enumerate(TIMESINCE_CHUNKS):
+        count = since // seconds
+        if count != 0:
+            break
+    
+    count2 = 0
+    if index + 1 < len(TIMESINCE_CHUNKS):
+        count2 = (since - (seconds * count)) // TIMESINCE_CHUNKS[index + 1][0]
+    
+    return index, count, count2
+
+
+class NaturalTime(object):
+    """
+    Formatter with the output of the `naturaltime` humanize filter against a
+    single `now`, strings are rendered once per bucket of seconds, minutes,
+    hours or timesince chunks and cached per active language.
+    
+    Args:
+        now(datetime): reference time, the current time of the first
+                       formatted value by default
+    """
+    def __init__(self, now=None):
+        self.now = now
+    
+    def __call__(self, value):
+        if not isinstance(value, datetime):
+            from django.contrib.humanize.templatetags.humanize import naturaltime
+            return naturaltime(value)
+        
+        if self.now is None:
+            self.now = datetime.now(utc if is_aware(value) else None)
+        now = self.now
+        
+        past = value < now
+        delta = now - value if past else value - now
+        if delta.days != 0:
+            since = get_timesince_bucket(value, now) if past else get_timesince_bucket(now, value)
+            bucket = ('days', past) + (since or ())
+        elif delta.seconds == 0:
+            bucket = ('now', )
+        elif delta.seconds < 60:
+            bucket = ('seconds', past, delta.seconds)
+        elif delta.seconds // 60 < 60:
+            bucket = ('minutes', past, delta.seconds // 60)
+        else:
+            bucket = ('hours', past, delta.seconds // 60 // 60)
+        
+        key = (get_language(), bucket)
+        result = _cache.get(key)
+        if result is None:
+            if len(_cache) >= MAX_CACHED_STRINGS:
+                _cache.clear()
+            result = _cache[key] = self.render(value, now, bucket)
+        
+        return result
+    
+    def render(self, value, now, bucket):
+        """
+        Render a bucket with the translations of `naturaltime`.
+        """
+        unit = bucket[0]
+        if unit == 'now':
+            return ugettext('now')
+        
+        past, count = bucket[1], bucket[-1]
+        if unit == 'days':
+            if past:
+                return pgettext('naturaltime', '%(delta)s ago') % {
+                    'delta': defaultfilters.timesince(value, now)}
+            return pgettext('naturaltime', '%(delta)s from now') % {
+                'delta': defaultfilters.timeuntil(value, now)}
+        
+        # msgids of naturaltime, counts are followed by non-breaking spaces
+        if unit == 'seconds':
+            singular, plural = (('a second ago', '%(count)s\xa0seconds ago') if past else
+                                ('a second from now', '%(count)s\xa0seconds from now'))
+        elif unit == 'minutes':
+            singular, plural = (('a minute ago', '%(count)s\xa0minutes ago') if past else
+                                ('a minute from now', '%(count)s\xa0minutes from now'))
+        else:
+            singular, plural = (('an hour ago', '%(count)s\xa0hours ago') if past else
+                                ('an hour from now', '%(count)s\xa0hours from now'))
+        
+        return ungettext(singular, plural, count) % {'count': count}
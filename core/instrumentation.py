@@ -0,0 +1,275 @@
+import threading
+from bisect import bisect_left
+from collections import deque
+from time import time
+
+from django.conf import settings
+from django.db.backends import utils
+from django.utils.deprecation import MiddlewareMixin
+
+
+_local = threading.local()
+
+
+def start_request_stats():
+    _local.stats = {
+        'start': time(),
+        'endpoint': None,
+        'action': None,
+        'sql_count': 0,
+        'sql_time': 0.0,
+        'serializer_time': 0.0,
+    }
+
+
+def get_request_stats():
+    """
+    Get the stats of the request served by the current thread.
+    
+    Returns:
+        dict: stats of the request or None outside of instrumented requests
+    """
+    return getattr(_local, 'stats', None)
+
+
+def finish_request_stats():
+    stats = get_request_stats()
+    _local.stats = None
+    if stats is not None:
+        stats['total_time'] = time() - stats['start']
+    
+    return stats
+
+
+def set_request_endpoint(endpoint, action):
+    stats = get_request_stats()
+    if stats is not None:
+        stats['endpoint'] = endpoint
+        stats['action'] = action
+
+
+def record_query(duration):
+    stats = get_request_stats()
+    if stats is not None:
+        stats['sql_count'] += 1
+        stats['sql_time'] += duration
+
+
+class TimedCursorWrapper(utils.CursorWrapper):
+    def execute(self, sql, params=None):
+        start = time()
+        try:
+            return super(TimedCursorWrapper, self).execute(sql, params)
+        finally:
+            record_query(time() - start)
+    
+    def executemany(self, sql, param_list):
+        start = time()
+        try:
+            return super(TimedCursorWrapper, self).executemany(sql, param_list)
+        finally:
+            record_query(time() - start)
+
+
+class TimedCursorDebugWrapper(utils.CursorDebugWrapper):
+    def execute(self, sql, params=None):
+        start = time()
+        try:
+            return super(TimedCursorDebugWrapper, self).execute(sql, params)
+        finally:
+            record_query(time() - start)
+    
+    def executemany(self, sql, param_list):
+        start = time()
+        try:
+            return super(TimedCursorDebugWrapper, self).executemany(sql, param_list)
+        finally:
+            record_query(time() - start)
+
+
+def instrument_connection(sender, connection, **kwargs):
+    """
+    Wrap the cursors of a database connection to count and time its queries,
+    connected to `connection_created`.
+    """
+    if getattr(connection, '_instrumented', False):
+        return
+    
+    connection.make_cursor = lambda cursor: TimedCursorWrapper(cursor, connection)
+    connection.make_debug_cursor = lambda cursor: TimedCursorDebugWrapper(cursor, connection)
+    connection._instrumented = True
+
+
+class RollingHistogram(object):
+    """
+    Thread safe latency histogram of requests per endpoint and action over
+    the last `slots` windows of `window` seconds.
+    """
+    # upper bounds of the latency buckets in milliseconds
+    BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+    
+    def __init__(self, window=60, slots=5):
+        self.window = window
+        self.slots = slots
+        self._lock = threading.Lock()
+        self._slots = deque()
+    
+    def clear(self):
+        with self._lock:
+            self._slots.clear()
+    
+    def add(self, key, stats, timestamp=None):
+        """
+        Add the stats of a request.
+        
+        Args:
+            key(str): endpoint and action of the request
+            stats(dict): stats of `finish_request_stats`
+            timestamp(float): time of the request, now by default
+        """
+        slot_id = int((time() if timestamp is None else timestamp) // self.window)
+        total_ms = stats['total_time'] * 1000
+        bucket = bisect_left(self.BUCKETS, total_ms)
+        
+        with self._lock:
+            if not self._slots or self._slots[-1][0] != slot_id:
+                self._slots.append((slot_id, {}))
+                while self._slots[0][0] <= slot_id - self.slots:
+                    self._slots.popleft()
+            
+            entries = self._slots[-1][1]
+            entry = entries.get(key)
+            if entry is None:
+                entry = entries[key] = self._get_entry()
+            entry['count'] += 1
+            entry['sql_count'] += stats['sql_count']
+            entry['sql_time'] += stats['sql_time']
+            entry['serializer_time'] += stats['serializer_time']
+            entry['total_time'] += stats['total_time']
+            entry['buckets'][bucket] += 1
+    
+    def snapshot(self, timestamp=None):
+        """
+        Get the merged stats of the rolling window.
+        
+        Returns:
+            dict: window length in seconds and stats per endpoint and action
+                  with request count, means in milliseconds, latency
+                  percentiles estimated by bucket upper bounds and buckets
+        """
+        slot_id = int((time() if timestamp is None else timestamp) // self.window)
+        
+        merged = {}
+        with self._lock:
+            for entries_slot_id, entries in self._slots:
+                if entries_slot_id <= slot_id - self.slots:
+                    continue
+                for key, entry in entries.items():
+                    total = merged.setdefault(key, self._get_entry())
+                    for name in ('count', 'sql_count', 'sql_time', 'serializer_time', 'total_time'):
+                        total[name] += entry[name]
+                    total['buckets'] = [a + b for a, b in zip(total['buckets'], entry['buckets'])]
+        
+        endpoints = dict((key, self._get_summary(entry)) for key, entry in merged.items())
+        return {'window': self.window * self.slots, 'endpoints': endpoints}
+    
+    def _get_entry(self):
+        return {
+            'count': 0,
+            'sql_count': 0,
+            'sql_time': 0.0,
+            'serializer_time': 0.0,
+            'total_time': 0.0,
+            'buckets': [0] * (len(self.BUCKETS) + 1),
+        }
+    
+    def _get_summary(self, entry):
+        count = entry['count']
+        return {
+            'count': count,
+            'sql_count': round(float(entry['sql_count']) / count, 2),
+            'sql_ms': round(entry['sql_time'] * 1000 / count, 2),
+            'serializer_ms': round(entry['serializer_time'] * 1000 / count, 2),
+            'total_ms': round(entry['total_time'] * 1000 / count, 2),
+            'p50_ms': self._get_percentile(entry['buckets'], count, 0.5),
+            'p95_ms': self._get_percentile(entry['buckets'], count, 0.95),
+            'p99_ms': self._get_percentile(entry['buckets'], count, 0.99),
+            'buckets': [{'le': le, 'count': bucket_count} for le, bucket_count
+                        in zip(self.BUCKETS + (None, ), entry['buckets'])],
+        }
+    
+    def _get_percentile(self, buckets, count, percentile):
+        seen = 0
+        for le, bucket_count in zip(self.BUCKETS + (None, ), buckets):
+            seen += bucket_count
+            if seen >= count * percentile:
+                return le
+
+
+histogram = RollingHistogram(window=settings.INSTRUMENTATION['WINDOW'],
+                             slots=settings.INSTRUMENTATION['SLOTS'])
+
+
+def get_server_timing(stats):
+    """
+    Get the Server-Timing header value of request stats.
+    """
+    return 'sql;dur={:.2f};desc="{} queries", serializer;dur={:.2f}, total;dur={:.2f}'.format(
+        stats['sql_time'] * 1000,
+        stats['sql_count'],
+        stats['serializer_time'] * 1000,
+        stats['total_time'] * 1000)
+
+
+class InstrumentationMiddleware(MiddlewareMixin):
+    """
+    Record the sql count, sql time, serializer time and total time of
+    requests in the rolling histogram and in the Server-Timing header.
+    
+    Requests are recorded by the endpoint and action set by
+    `InstrumentedViewSetMixin`, by url name and method otherwise.
+    """
+    def process_request(self, request):
+        start_request_stats()
+    
+    def process_response(self, request, response):
+        stats = finish_request_stats()
+        if stats is None:
+            return response
+        
+        if stats['endpoint'] is None:
+            resolver_match = getattr(request, 'resolver_match', None)
+            stats['endpoint'] = resolver_match.view_name if resolver_match else 'unresolved'
+            stats['action'] = request.method.lower()
+        
+        histogram.add('{}.{}'.format(stats['endpoint'], stats['action']), stats)
+        if settings.INSTRUMENTATION['SERVER_TIMING']:
+            response['Server-Timing'] = get_server_timing(stats)
+        
+        return response
+
+
+class InstrumentedViewSetMixin(object):
+    """
+    Record the requests of a viewset by basename and action.
+    """
+    def initial(self, request, *args, **kwargs):
+        set_request_endpoint(self.basename, self.action)
+        return super(InstrumentedViewSetMixin, self).initial(request, *args, **kwargs)
+
+
+class TimedSerializerMixin(object):
+    """
+    Record the time spent to serialize data of a root serializer.
+    """
+    @property
+    def data(self):
+        stats = get_request_stats()
+        if stats is None:
+            return super(TimedSerializerMixin, self).data
+        
+        start = time()
+        try:
+            return super(TimedSerializerMixin, self).data
+        finally:
+            stats['serializer_time'] += time() - start
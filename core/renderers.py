@@ -0,0 +1,75 @@
+from importlib import import_module
+
+from django.conf import settings
+from django.utils import six
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+
+# keyword arguments of the dumps function of every backend for the compact,
+# unicode output of JSONRenderer
+JSON_BACKENDS = {
+    'ujson': lambda module: lambda data: module.dumps(data, ensure_ascii=False,
+                                                      escape_forward_slashes=False),
+    'orjson': lambda module: module.dumps,
+}
+
+_backends = {}
+
+
+def get_json_backend(name):
+    """
+    Get the dumps function of an installed JSON backend.
+
+    Args:
+        name(str): key of JSON_BACKENDS
+
+    Returns:
+        function: data to str|bytes function or None when the backend is not
+                  installed
+    """
+    if name not in _backends:
+        try:
+            _backends[name] = JSON_BACKENDS[name](import_module(name))
+        except ImportError:
+            _backends[name] = None
+
+    return _backends[name]
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Compact JSON renderer with the backend of settings.JSON_RENDERER, the
+    default JSONRenderer renders indented output, data the backend can not
+    encode and all data when the backend is not installed.
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        backend = settings.JSON_RENDERER['BACKEND']
+        dumps = get_json_backend(backend) if backend else None
+        if (data is None or dumps is None or not self.compact or
+                self.get_indent(accepted_media_type, renderer_context or {}) is not None):
+            return super(FastJSONRenderer, self).render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = dumps(data)
+        except (TypeError, ValueError, OverflowError):
+            # dates, decimals, lazy translations, NaN and other values of the
+            # encoder of JSONRenderer
+            return super(FastJSONRenderer, self).render(data, accepted_media_type, renderer_context)
+
+        if isinstance(ret, six.text_type):
+            ret = ret.encode('utf-8')
+        # line separators are escaped as by JSONRenderer, see its render
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Accept `text/event-stream` requests of EventSource clients, streams are
+    returned as responses so only error data is rendered, as JSON.
+    """
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return JSONRenderer().render(data, 'application/json', renderer_context)
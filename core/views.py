@@ -0,0 +1,39 @@
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.instrumentation import histogram
+
+
+class MetricsView(APIView):
+    permission_classes = (IsAdminUser, )
+    
+    def get(self, request, *args, **kwargs):
+        """
+        Get the request stats per endpoint and action of this process over the
+        rolling window.
+        
+        response:
+            
+            {
+                window(int): seconds
+                endpoints(dict): {
+                    <endpoint>.<action>(str): {
+                        count(int): number of requests
+                        sql_count(float): mean sql queries
+                        sql_ms(float): mean sql time
+                        serializer_ms(float): mean serializer time
+                        total_ms(float): mean total time
+                        p50_ms|p95_ms|p99_ms(int): upper bound of the bucket, 
+                                                   null when above all buckets
+                        buckets(list): [{le(int): upper bound, count(int):}]
+                    }
+                }
+            }
+        
+        http codes:
+
+            200: on success
+            403: on user without permission
+        """
+        return Response(histogram.snapshot())
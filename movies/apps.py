@@ -1,5 +1,15 @@
 from django.apps import AppConfig
+from django.db.models.signals import pre_save, post_save, post_delete
 
 
 class MoviesConfig(AppConfig):
     name = 'movies'
+    
+    def ready(self):
+        from movies import signals
+        
+        Movie = self.get_model('Movie')
+        pre_save.connect(signals.set_movie_trending, sender=Movie)
+        post_save.connect(signals.movie_changed, sender=Movie)
+        post_delete.connect(signals.movie_changed, sender=Movie)
+        signals.counters_changed.connect(signals.publish_counters, sender=Movie)
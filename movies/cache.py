@@ -0,0 +1,127 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.encoding import force_bytes
+from django.utils.six.moves.urllib.parse import urlencode
+
+from core.cache import is_shared_cache
+
+
+CATALOG_VERSION_KEY = 'movies:catalog:version'
+LIST_HITS_KEY = 'movies:list:hits'
+LIST_MISSES_KEY = 'movies:list:misses'
+
+
+def get_cache():
+    return caches[settings.MOVIES_LIST_CACHE['CACHE']]
+
+
+def is_list_cache_enabled():
+    """
+    Check whether anonymous list pages are cached, only in a cache shared by 
+    the processes of the site, as the catalog versions bumped by a process 
+    are not seen by the others in local memory caches.
+    """
+    config = settings.MOVIES_LIST_CACHE
+    return bool(config['TIMEOUT']) and is_shared_cache(config['CACHE'])
+
+
+def get_catalog_version():
+    """
+    Get the version of the movies catalog used in cache keys.
+    
+    Returns:
+        int: catalog version
+    """
+    cache = get_cache()
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # start from the current time so that an evicted version never 
+        # returns to a value of already cached pages
+        cache.add(CATALOG_VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    
+    return version
+
+
+def bump_catalog_version():
+    """
+    Bump the version of the movies catalog now and after the current 
+    transaction commits, so pages cached by concurrent requests in between 
+    are not served either.
+    """
+    def bump():
+        try:
+            get_cache().incr(CATALOG_VERSION_KEY)
+        except ValueError:
+            get_catalog_version()
+    
+    bump()
+    transaction.on_commit(bump)
+
+
+def get_list_cache_key(request):
+    """
+    Get the cache key of a movies list request for the current catalog version.
+    
+    Args:
+        request(rest_framework.request.Request): list request
+    
+    Returns:
+        str: cache key
+    """
+    query_params = sorted((key, value) for key, values in request.query_params.lists() 
+                          for value in values)
+    url = request.build_absolute_uri(request.path) + '?' + urlencode(query_params)
+    
+    # pages are cached per renderer, as their etags are
+    return 'movies:list:{}:{}:{}'.format(get_catalog_version(), request.accepted_renderer.format,
+                                         hashlib.md5(force_bytes(url)).hexdigest())
+
+
+def get_cached_list(request):
+    """
+    Get the cached response data of a movies list request and count the cache
+    hit|miss.
+    
+    Returns:
+        tuple<str, dict>: cache key and response data or None
+    """
+    key = get_list_cache_key(request)
+    data = get_cache().get(key)
+    
+    _incr(LIST_HITS_KEY if data is not None else LIST_MISSES_KEY)
+    return key, data
+
+
+def set_cached_list(key, data):
+    get_cache().set(key, data, settings.MOVIES_LIST_CACHE['TIMEOUT'])
+
+
+def get_list_cache_stats():
+    """
+    Get the movies list cache hit|miss counters.
+    
+    Returns:
+        dict: hits, misses and catalog version
+    """
+    cache = get_cache()
+    stats = cache.get_many([LIST_HITS_KEY, LIST_MISSES_KEY])
+    
+    return {
+        'hits': stats.get(LIST_HITS_KEY, 0),
+        'misses': stats.get(LIST_MISSES_KEY, 0),
+        'version': get_catalog_version(),
+    }
+
+
+def _incr(key):
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
@@ -0,0 +1,360 @@
+import random
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction, IntegrityError
+from django.db.models import F, Count, Sum, BigIntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils.timezone import now
+
+from movies.cache import bump_catalog_version
+from movies.models import Movie, MovieOpinion, MovieCounterShard, OPINION_LIKE, OPINION_HATE
+from movies.signals import counters_changed
+from movies.trending import update_trending, rebuild_trending
+
+
+def get_opinion_delta(old_opinion, new_opinion):
+    """
+    Get the likes|hates counter changes caused by an opinion change.
+    
+    Args:
+        old_opinion(str): movies.models.OPINION_LIKE | movies.models.OPINION_HATE | None
+        new_opinion(str): movies.models.OPINION_LIKE | movies.models.OPINION_HATE | None
+
+    Returns:
+        tuple<int, int>: likes and hates counter delta
+    """
+    likes = int(new_opinion == OPINION_LIKE) - int(old_opinion == OPINION_LIKE)
+    hates = int(new_opinion == OPINION_HATE) - int(old_opinion == OPINION_HATE)
+    return likes, hates
+
+
+def is_sharded():
+    return settings.MOVIES_COUNTER_SHARDS > 0
+
+
+def apply_counter_deltas(deltas):
+    """
+    Apply likes|hates counter deltas to movies with F() expressions.
+    
+    Movies with the same delta are updated with a single query and their 
+    trending scores are recomputed. When counter
+    shards are enabled the deltas are added to a random shard of each movie 
+    instead, and are rolled up to the movies by `rollup_counter_shards`.
+    
+    Args:
+        deltas(dict): mapping of movie id to tuple<int, int> of likes and 
+                      hates counter delta
+    
+    Returns:
+        list<int>: ids of the movies whose counters changed
+    """
+    deltas = dict((movie_id, delta) for movie_id, delta in deltas.items() if delta != (0, 0))
+    
+    with transaction.atomic():
+        if is_sharded():
+            for movie_id, delta in deltas.items():
+                _apply_shard_delta(movie_id, delta)
+        else:
+            _apply_movie_deltas(deltas)
+    
+    # movie rows of shards change only when they are rolled up
+    if deltas and not is_sharded():
+        bump_catalog_version()
+    
+    return list(deltas.keys())
+
+
+def _apply_movie_deltas(deltas):
+    grouped_deltas = defaultdict(list)
+    for movie_id, delta in deltas.items():
+        grouped_deltas[delta].append(movie_id)
+    
+    for (likes, hates), movie_ids in grouped_deltas.items():
+        Movie.objects.filter(pk__in=movie_ids).update(
+            likes_counter=F('likes_counter') + likes,
+            hates_counter=F('hates_counter') + hates,
+            updated_at=now())
+    
+    update_trending(deltas.keys())
+
+
+def _apply_shard_delta(movie_id, delta):
+    likes, hates = delta
+    slot = random.randrange(settings.MOVIES_COUNTER_SHARDS)
+    shard = MovieCounterShard.objects.filter(movie_id=movie_id, slot=slot)
+    
+    if shard.update(likes=F('likes') + likes, hates=F('hates') + hates):
+        return
+    
+    try:
+        with transaction.atomic():
+            MovieCounterShard.objects.create(movie_id=movie_id, slot=slot, 
+                                             likes=likes, hates=hates)
+    except IntegrityError:
+        # created by a concurrent vote
+        shard.update(likes=F('likes') + likes, hates=F('hates') + hates)
+
+
+def notify_counters(counters):
+    """
+    Send `counters_changed` for the counters of movies after the current 
+    transaction commits.
+    
+    Args:
+        counters(dict): mapping of movie id to tuple<int, int> of likes and 
+                        hates counters, including pending shards
+    """
+    if counters:
+        transaction.on_commit(lambda: counters_changed.send(sender=Movie, counters=counters))
+
+
+def get_pending_counters(movie_ids):
+    """
+    Get the likes|hates counters of shards not rolled up to movies yet.
+    
+    Args:
+        movie_ids(list<int>): list of movie ids
+    
+    Returns:
+        dict: mapping of movie id to tuple<int, int> of likes and hates
+    """
+    if not is_sharded():
+        return {}
+    
+    shards = MovieCounterShard.objects.filter(movie__in=movie_ids).order_by()
+    shards = shards.values('movie').annotate(likes=Sum('likes'), hates=Sum('hates'))
+    return dict((shard['movie'], (shard['likes'], shard['hates'])) for shard in shards)
+
+
+def refresh_counters(movie):
+    """
+    Refresh likes|hates counters of a movie instance including pending shards.
+    """
+    movie.refresh_from_db(fields=['likes_counter', 'hates_counter'])
+    
+    likes, hates = get_pending_counters([movie.pk]).get(movie.pk, (0, 0))
+    movie.likes_counter += likes
+    movie.hates_counter += hates
+
+
+def rollup_counter_shards(batch_size=1000):
+    """
+    Add the counters of shards to their movies and reset the shards.
+    
+    Args:
+        batch_size(int): number of shards rolled up per transaction
+    
+    Returns:
+        int: number of movies updated
+    """
+    updated = set()
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            shards = MovieCounterShard.objects.select_for_update().filter(pk__gt=last_id)
+            shards = list(shards.order_by('pk').values_list('pk', 'movie_id', 'likes', 'hates')[:batch_size])
+            if not shards:
+                break
+            last_id = shards[-1][0]
+            
+            deltas = defaultdict(lambda: (0, 0))
+            for pk, movie_id, likes, hates in shards:
+                deltas[movie_id] = (deltas[movie_id][0] + likes, deltas[movie_id][1] + hates)
+            deltas = dict((movie_id, delta) for movie_id, delta in deltas.items() if delta != (0, 0))
+            
+            _apply_movie_deltas(deltas)
+            MovieCounterShard.objects.filter(pk__in=[shard[0] for shard in shards]
+                                    ).exclude(likes=0, hates=0).update(likes=0, hates=0)
+            updated.update(deltas.keys())
+    
+    if updated:
+        bump_catalog_version()
+    
+    return len(updated)
+
+
+def set_opinion(user, movie, opinion):
+    """
+    Set the opinion of user for a movie and update the movie likes|hates 
+    counters in the same transaction.
+    
+    The opinion row is locked while the counters are updated, so concurrent
+    votes of the same user are applied one after the other.
+    
+    Args:
+        user(django.conf.settings.AUTH_USER_MODEL): 
+        movie(movies.models.Movie): movie to be refreshed with the new counters
+        opinion(str): movies.models.OPINION_LIKE | movies.models.OPINION_HATE | None
+    
+    Returns:
+        movies.models.MovieOpinion: the opinion of user for the movie
+    """
+    with transaction.atomic():
+        instance, created = MovieOpinion.objects.select_for_update().get_or_create(
+            user=user, movie=movie, defaults={'opinion': opinion})
+        
+        old_opinion = None if created else instance.opinion
+        if not created and old_opinion != opinion:
+            instance.opinion = opinion
+            instance.save(update_fields=['opinion'])
+        
+        changed = apply_counter_deltas({movie.pk: get_opinion_delta(old_opinion, opinion)})
+        if changed:
+            refresh_counters(movie)
+            notify_counters({movie.pk: (movie.likes_counter, movie.hates_counter)})
+    
+    instance.movie = movie
+    return instance
+
+
+OPINION_OK = 'ok'
+OPINION_NOT_FOUND = 'not_found'
+OPINION_FORBIDDEN = 'forbidden'
+
+
+def set_opinions(user, opinions):
+    """
+    Set the opinions of user for many movies and update their likes|hates
+    counters in the same transaction.
+    
+    Ownership of all movies is checked with a single query, new opinions are
+    inserted with a single query, or one by one when concurrent votes created
+    some of them, changed opinions are updated with one query per opinion 
+    value and counters are updated with grouped deltas. When a movie appears 
+    more than once its last opinion wins.
+    
+    Args:
+        user(django.conf.settings.AUTH_USER_MODEL): 
+        opinions(list<tuple>): list of movie id and opinion (movies.models.OPINION_LIKE | 
+                               movies.models.OPINION_HATE | None) pairs
+    
+    Returns:
+        list<dict>: result per pair in the same order with `movie`, `status` 
+                    (ok|not_found|forbidden) and for ok results the `opinion`,
+                    `likes_counter` and `hates_counter` of the movie
+    """
+    wanted = dict(opinions)
+    owners = dict(Movie.objects.filter(pk__in=list(wanted.keys())).order_by().values_list('pk', 'user_id'))
+    
+    statuses = {}
+    for movie_id in wanted:
+        if movie_id not in owners:
+            statuses[movie_id] = OPINION_NOT_FOUND
+        elif owners[movie_id] == user.pk:
+            statuses[movie_id] = OPINION_FORBIDDEN
+        else:
+            statuses[movie_id] = OPINION_OK
+    allowed = [movie_id for movie_id, value in statuses.items() if value == OPINION_OK]
+    
+    counters = {}
+    if allowed:
+        with transaction.atomic():
+            existing = MovieOpinion.objects.select_for_update().filter(user=user, movie__in=allowed)
+            existing = dict(existing.values_list('movie_id', 'opinion'))
+            
+            created = [MovieOpinion(user=user, movie_id=movie_id, opinion=wanted[movie_id]) 
+                       for movie_id in allowed if movie_id not in existing]
+            try:
+                with transaction.atomic():
+                    MovieOpinion.objects.bulk_create(created)
+            except IntegrityError:
+                # some were created by concurrent votes, those are updated as 
+                # existing opinions and the rest are inserted one by one
+                for instance in created:
+                    try:
+                        with transaction.atomic():
+                            instance.save(force_insert=True)
+                    except IntegrityError:
+                        opinion = MovieOpinion.objects.select_for_update().filter(
+                            user=user, movie_id=instance.movie_id).values_list('opinion', flat=True)
+                        existing[instance.movie_id] = opinion.get()
+            
+            changed = defaultdict(list)
+            for movie_id, old_opinion in existing.items():
+                if old_opinion != wanted[movie_id]:
+                    changed[wanted[movie_id]].append(movie_id)
+            for opinion, movie_ids in changed.items():
+                MovieOpinion.objects.filter(user=user, movie__in=movie_ids).update(opinion=opinion)
+            
+            updated = apply_counter_deltas(dict((movie_id, get_opinion_delta(existing.get(movie_id), 
+                                                                              wanted[movie_id]))
+                                                for movie_id in allowed))
+            
+            pending = get_pending_counters(allowed)
+            movies = Movie.objects.filter(pk__in=allowed).order_by().values_list('pk', 'likes_counter', 'hates_counter')
+            for movie_id, likes, hates in movies:
+                pending_likes, pending_hates = pending.get(movie_id, (0, 0))
+                counters[movie_id] = (likes + pending_likes, hates + pending_hates)
+            notify_counters(dict((movie_id, counters[movie_id]) for movie_id in updated))
+    
+    results = []
+    for movie_id, opinion in opinions:
+        result = {'movie': movie_id, 'status': statuses[movie_id]}
+        if movie_id in counters:
+            result.update(opinion=wanted[movie_id], 
+                          likes_counter=counters[movie_id][0],
+                          hates_counter=counters[movie_id][1])
+        results.append(result)
+    
+    return results
+
+
+def _opinions_count(opinion):
+    opinions = MovieOpinion.objects.filter(movie=OuterRef('pk'), opinion=opinion)
+    count = opinions.order_by().values('movie').annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(count, output_field=BigIntegerField()), 0)
+
+
+def _pending_count(field):
+    shards = MovieCounterShard.objects.filter(movie=OuterRef('pk'))
+    count = shards.order_by().values('movie').annotate(count=Sum(field)).values('count')
+    return Coalesce(Subquery(count, output_field=BigIntegerField()), 0)
+
+
+def get_counter_drift(queryset=None):
+    """
+    Get movies whose likes|hates counters, including pending shards, do not 
+    match their opinions.
+    
+    Args:
+        queryset(django.db.models.QuerySet): movies to be checked, all by default
+    
+    Returns:
+        django.db.models.QuerySet: movies annotated with `likes_total` and 
+                                   `hates_total` counters and `likes_count` 
+                                   and `hates_count` of their opinions
+    """
+    queryset = Movie.objects.all() if queryset is None else queryset
+    
+    return queryset.annotate(likes_total=F('likes_counter') + _pending_count('likes'),
+                             hates_total=F('hates_counter') + _pending_count('hates'),
+                             likes_count=_opinions_count(OPINION_LIKE),
+                             hates_count=_opinions_count(OPINION_HATE)
+                   ).exclude(likes_total=F('likes_count'),
+                             hates_total=F('hates_count'))
+
+
+def recount_counters(queryset=None):
+    """
+    Recount likes|hates counters of movies from their opinions with a single
+    UPDATE query and reset their pending shards.
+    
+    Args:
+        queryset(django.db.models.QuerySet): movies to be recounted, all by default
+    
+    Returns:
+        int: number of updated movies
+    """
+    queryset = Movie.objects.all() if queryset is None else queryset
+    
+    with transaction.atomic():
+        MovieCounterShard.objects.filter(movie__in=queryset.values('pk')
+                                ).exclude(likes=0, hates=0).update(likes=0, hates=0)
+        updated = queryset.update(likes_counter=_opinions_count(OPINION_LIKE),
+                                  hates_counter=_opinions_count(OPINION_HATE),
+                                  updated_at=now())
+        rebuild_trending(queryset)
+    bump_catalog_version()
+    
+    return updated
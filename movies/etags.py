@@ -0,0 +1,75 @@
+import hashlib
+import time
+from calendar import timegm
+
+from django.utils.cache import patch_vary_headers
+from django.utils.encoding import force_bytes
+from django.utils.http import http_date, parse_etags
+
+from movies.models import Movie
+
+
+# `publication_date_since` renders relative times, so etags also change 
+# every bucket even when no movie changed
+RELATIVE_TIME_BUCKET_SECONDS = 60
+
+
+def get_list_etag(movies, request, count=None):
+    """
+    Get the etag and last modified date of a page of movies from the ids, 
+    update dates and counters of its movies, read by id with a single query
+    without serializing them, and from the renderer of the request.
+    
+    Args:
+        movies(list): movies of the page, instances or `.values()` rows
+        request(rest_framework.request.Request): list request
+        count(int): count of the list rendered with the page or None
+    
+    Returns:
+        tuple<str, datetime.datetime>: quoted etag and last modified date or None
+    """
+    pks = [movie['id'] if isinstance(movie, dict) else movie.pk for movie in movies]
+    rows = {}
+    if pks:
+        # updated_at is deferred by the list
+        rows = Movie.objects.filter(pk__in=pks).order_by().values_list('pk', 'updated_at', 'likes_counter', 'hates_counter')
+        rows = dict((row[0], row[1:]) for row in rows)
+    
+    user = request.user
+    tokens = [
+        count,
+        user.pk if user.is_authenticated() else '',
+        # the browsable API and JSON of a list are different representations
+        request.accepted_renderer.format,
+        int(time.time() // RELATIVE_TIME_BUCKET_SECONDS),
+        request.get_full_path(),
+    ]
+    for pk in pks:
+        updated_at, likes, hates = rows.get(pk, (None, '', ''))
+        tokens += [pk, updated_at.isoformat() if updated_at else '', likes, hates]
+    etag = hashlib.md5(force_bytes(':'.join(str(token) for token in tokens))).hexdigest()
+    
+    dates = [row[0] for row in rows.values() if row[0] is not None]
+    return '"{}"'.format(etag), max(dates) if dates else None
+
+
+def is_not_modified(request, etag):
+    """
+    Check the If-None-Match header of a request against an etag with weak 
+    comparison.
+    """
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if not if_none_match:
+        return False
+    
+    etags = [e[2:] if e.startswith('W/') else e for e in parse_etags(if_none_match)]
+    return etag in etags or '*' in etags
+
+
+def set_etag_headers(response, etag, last_modified):
+    response['ETag'] = etag
+    patch_vary_headers(response, ('Accept', ))
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(timegm(last_modified.utctimetuple()))
+    
+    return response
@@ -0,0 +1,134 @@
+import json
+import threading
+from collections import OrderedDict
+from time import sleep
+
+from django.conf import settings
+
+
+# returned instead of counters when a subscription missed changes
+RESET = 'reset'
+
+
+class Subscription(object):
+    """
+    Counters of changed movies waiting to be sent to a client, later counters
+    of a movie replace the earlier ones.
+    
+    Args:
+        movie_ids(set<int>): (optional) ids of the movies of interest, all by default
+        max_pending(int): number of pending movies after which the client is
+                          told to reload instead
+    """
+    def __init__(self, movie_ids=None, max_pending=1000):
+        self.movie_ids = movie_ids
+        self.max_pending = max_pending
+        self.pending = OrderedDict()
+        self.overflow = False
+        self.condition = threading.Condition()
+    
+    def put(self, counters):
+        with self.condition:
+            for movie_id, value in counters.items():
+                if self.movie_ids is None or movie_id in self.movie_ids:
+                    self.pending[movie_id] = value
+            
+            if len(self.pending) > self.max_pending:
+                self.pending.clear()
+                self.overflow = True
+            if self.pending or self.overflow:
+                self.condition.notify()
+    
+    def get(self, timeout, window=0):
+        """
+        Wait up to `timeout` seconds for changes, then keep collecting changes
+        for `window` seconds so that a burst of votes is sent once per movie.
+        
+        Returns:
+            dict: mapping of movie id to tuple<int, int> of likes and hates
+                  counters, RESET after an overflow or None on timeout
+        """
+        with self.condition:
+            if not self.pending and not self.overflow:
+                self.condition.wait(timeout)
+            if not self.pending and not self.overflow:
+                return None
+        
+        if window:
+            sleep(window)
+        
+        with self.condition:
+            if self.overflow:
+                self.overflow = False
+                self.pending.clear()
+                return RESET
+            
+            pending, self.pending = self.pending, OrderedDict()
+            return pending
+
+
+class CounterEvents(object):
+    """
+    In process publish|subscribe of movie counter changes, fed by the
+    `counters_changed` signal. Clients of other processes are not notified.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = set()
+    
+    def subscribe(self, movie_ids=None):
+        subscription = Subscription(movie_ids, settings.MOVIES_EVENTS['MAX_PENDING'])
+        with self.lock:
+            self.subscriptions.add(subscription)
+        
+        return subscription
+    
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscriptions.discard(subscription)
+    
+    def publish(self, counters):
+        """
+        Args:
+            counters(dict): mapping of movie id to tuple<int, int> of likes and
+                            hates counters
+        """
+        with self.lock:
+            subscriptions = list(self.subscriptions)
+        
+        for subscription in subscriptions:
+            subscription.put(counters)
+
+
+events = CounterEvents()
+
+
+def iter_event_stream(movie_ids=None):
+    """
+    Iterate the server sent events of counter changes, `counters` events with
+    a list of {id, likes_counter, hates_counter} objects, `reset` events when
+    changes were missed and comments as heartbeat. 
+    
+    The subscription starts on the first iteration and ends when the response
+    is closed, responses closed before they are iterated never subscribe.
+    
+    Args:
+        movie_ids(set<int>): ids of the movies of interest or None for all
+    """
+    config = settings.MOVIES_EVENTS
+    subscription = events.subscribe(movie_ids)
+    try:
+        yield 'retry: {}\n\n'.format(config['RETRY'])
+        
+        while True:
+            changes = subscription.get(config['HEARTBEAT'], config['COALESCE_WINDOW'])
+            if changes is None:
+                yield ': heartbeat\n\n'
+            elif changes is RESET:
+                yield 'event: reset\ndata: {}\n\n'
+            else:
+                data = [OrderedDict([('id', movie_id), ('likes_counter', likes), ('hates_counter', hates)])
+                        for movie_id, (likes, hates) in changes.items()]
+                yield 'event: counters\ndata: {}\n\n'.format(json.dumps(data, separators=(',', ':')))
+    finally:
+        events.unsubscribe(subscription)
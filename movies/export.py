@@ -0,0 +1,87 @@
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import six
+
+from movies.models import Movie
+
+
+EXPORT_FIELDS = (
+    ('id', 'id'),
+    ('title', 'title'),
+    ('description', 'description'),
+    ('user_id', 'user_id'),
+    ('username', 'user__username'),
+    ('air_date', 'air_date'),
+    ('publication_date', 'publication_date'),
+    ('likes_counter', 'likes_counter'),
+    ('hates_counter', 'hates_counter'),
+)
+
+
+def iter_movie_rows(queryset=None, chunk_size=1000):
+    """
+    Iterate movies with their owner username as tuples of `EXPORT_FIELDS`.
+    
+    Movies are read in chunks by primary key, each chunk with a single query
+    joining the owners, so that memory and transactions stay short
+    regardless of the number of movies.
+    
+    Args:
+        queryset(django.db.models.QuerySet): movies to be exported, all by default
+        chunk_size(int): number of movies per query
+    
+    Yields:
+        tuple: movie values
+    """
+    queryset = Movie.objects.all() if queryset is None else queryset
+    queryset = queryset.values_list(*[lookup for name, lookup in EXPORT_FIELDS])
+    
+    last_id = 0
+    while True:
+        chunk = queryset.filter(pk__gt=last_id).order_by('pk')[:chunk_size]
+        count = 0
+        for row in chunk.iterator():
+            count += 1
+            yield row
+        if count < chunk_size:
+            return
+        last_id = row[0]
+
+
+def iter_ndjson(rows):
+    """
+    Iterate rows of `iter_movie_rows` as lines of JSON objects.
+    """
+    names = [name for name, lookup in EXPORT_FIELDS]
+    encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    for row in rows:
+        yield encoder.encode(dict(zip(names, row))) + '\n'
+
+
+class Echo(object):
+    """
+    File like object returning what is written, used to stream csv rows.
+    """
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    """
+    Iterate rows of `iter_movie_rows` as CSV lines after a header line.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow([name for name, lookup in EXPORT_FIELDS])
+    for row in rows:
+        if six.PY2:
+            row = [value.encode('utf-8') if isinstance(value, six.text_type) else value
+                   for value in row]
+        yield writer.writerow(row)
+
+
+# format: (rows to lines function, content type, file extension)
+EXPORT_FORMATS = {
+    'ndjson': (iter_ndjson, 'application/x-ndjson', 'ndjson'),
+    'csv': (iter_csv, 'text/csv', 'csv'),
+}
@@ -1,10 +1,24 @@
+import random
+from datetime import datetime, timedelta
+from itertools import islice
+
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AnonymousUser
-from django.utils.timezone import now
+from django.db import transaction
+from django.utils.six.moves import range
+from django.utils.timezone import now, utc
 from django.conf import settings
 from django.http import HttpRequest
 
-from movies.models import Movie, MovieOpinion
+from movies.counters import set_opinion, recount_counters
+from movies.models import Movie, MovieOpinion, OPINION_LIKE, OPINION_HATE
+
+
+# latest publication date of seeded movies, fixed so that seeds are repeatable
+SEED_PUBLISHED = datetime(2018, 7, 1, tzinfo=utc)
+
+SAMPLE_WORDS = ('space', 'love', 'war', 'city', 'night', 'river', 'king', 'dream', 'ghost',
+                'summer', 'last', 'secret', 'road', 'game', 'fire', 'island', 'hero', 'story')
 
 
 def get_paginated_queryset(qs):
@@ -74,18 +88,8 @@ def set_sample_opinion(user, movie, opinion):
         movie(movies.models.Movie): 
         opinion(str): movies.models.OPINION_LIKE | movies.models.OPINION_HATE | None
     """
-    # set liked movie by user
-    opinion = MovieOpinion.objects.create(
-                            user=user, 
-                            movie=movie, 
-                            opinion=opinion)
-   
-    # update movie likes|hates counter
-    movie = opinion.movie
-    movie.likes_counter = movie.likes.count()
-    movie.hates_counter = movie.hates.count()
-    
-    movie.save(update_fields=['likes_counter', 'hates_counter'])
+    # set liked movie by user and update movie likes|hates counter
+    set_opinion(user, movie, opinion)
 
 
 def get_sample_request(user=None):
@@ -102,3 +106,149 @@ def get_sample_request(user=None):
     request.user = user if user else AnonymousUser()
     
     return request
+
+
+def get_sample_text(rng, min_words, max_words):
+    """
+    Get random capitalized words.
+    
+    Args:
+        rng(random.Random): random generator
+        min_words(int): min number of words
+        max_words(int): max number of words
+    
+    Returns:
+        str: text
+    """
+    return ' '.join(rng.choice(SAMPLE_WORDS) for i in range(rng.randint(min_words, max_words))).capitalize()
+
+
+def generate_users(number, username_format='user{}', start=0):
+    """
+    Generate unsaved users with unusable passwords.
+    
+    Args:
+        number(int): number of users
+        username_format(str): username format to be used in username generation
+        start(int): index of the first username
+    
+    Yields:
+        django.conf.settings.AUTH_USER_MODEL: unsaved user
+    """
+    User = get_user_model()
+    for i in range(start, start + number):
+        yield User(username=username_format.format(i), password='!')
+
+
+def generate_movies(user_ids, number, rng, published=None):
+    """
+    Generate unsaved movies of random owners published in the year before 
+    `published`, 90% with an air date.
+    
+    Args:
+        user_ids(list<int>): ids of the owners
+        number(int): number of movies
+        rng(random.Random): random generator
+        published(datetime): latest publication date, now by default
+    
+    Yields:
+        movies.models.Movie: unsaved movie
+    """
+    published = published or now()
+    for i in range(number):
+        publication_date = published - timedelta(seconds=rng.randrange(365 * 24 * 3600))
+        air_date = publication_date.date() + timedelta(days=rng.randrange(-3650, 365))
+        yield Movie(title=get_sample_text(rng, 1, 4),
+                    description=get_sample_text(rng, 20, 80),
+                    user_id=rng.choice(user_ids),
+                    publication_date=publication_date,
+                    air_date=air_date if rng.random() < 0.9 else None)
+
+
+def generate_opinions(user_ids, movies, number, rng, like_ratio=0.7):
+    """
+    Generate unsaved opinions spread evenly to movies, each by distinct 
+    random users other than the owner of the movie.
+    
+    Args:
+        user_ids(list<int>): ids of the voters
+        movies(list<tuple<int, int>>): movie id and owner id pairs
+        number(int): number of opinions, less when there are not enough voters
+        rng(random.Random): random generator
+        like_ratio(float): ratio of likes to opinions
+    
+    Yields:
+        movies.models.MovieOpinion: unsaved opinion
+    """
+    per_movie, remainder = divmod(number, len(movies)) if movies else (0, 0)
+    for index, (movie_id, owner_id) in enumerate(movies):
+        votes = per_movie + (index < remainder)
+        if not votes:
+            continue
+        voters = rng.sample(user_ids, min(votes + 1, len(user_ids)))
+        for user_id in [voter for voter in voters if voter != owner_id][:votes]:
+            opinion = OPINION_LIKE if rng.random() < like_ratio else OPINION_HATE
+            yield MovieOpinion(user_id=user_id, movie_id=movie_id, opinion=opinion)
+
+
+def bulk_create_batches(model, objects, batch_size=5000):
+    """
+    Insert objects of an iterable with a transaction and `bulk_create` per
+    batch, without keeping more than a batch in memory.
+    
+    Returns:
+        int: number of created objects
+    """
+    objects = iter(objects)
+    created = 0
+    while True:
+        batch = list(islice(objects, batch_size))
+        if not batch:
+            return created
+        with transaction.atomic():
+            model.objects.bulk_create(batch)
+        created += len(batch)
+
+
+def seed_movies(users, movies, opinions, seed=0, username_format='user{}', batch_size=5000,
+                published=SEED_PUBLISHED):
+    """
+    Create deterministic users, movies and opinions with batched inserts and
+    compute the movie counters with a single aggregated UPDATE at the end.
+    
+    Movies are owned by and opinions are set by all users of `username_format`,
+    including the ones of previous runs.
+    
+    Args:
+        users(int): number of users
+        movies(int): number of movies
+        opinions(int): number of opinions
+        seed(int): random seed
+        username_format(str): username format to be used in username generation
+        batch_size(int): number of rows per insert
+        published(datetime): latest publication date of the movies
+    
+    Returns:
+        dict: number of created users, movies and opinions
+    """
+    rng = random.Random(seed)
+    User = get_user_model()
+    
+    prefix = username_format.split('{', 1)[0]
+    existing_users = User.objects.filter(username__startswith=prefix)
+    created_users = bulk_create_batches(User, generate_users(users, username_format, 
+                                                             start=existing_users.count()), batch_size)
+    user_ids = list(existing_users.order_by('pk').values_list('pk', flat=True))
+    if movies and not user_ids:
+        raise ValueError('There are no users to own the movies.')
+    
+    last_movie_id = Movie.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    created_movies = bulk_create_batches(Movie, generate_movies(user_ids, movies, rng, published), batch_size)
+    new_movies = Movie.objects.filter(pk__gt=last_movie_id)
+    
+    created_opinions = bulk_create_batches(MovieOpinion, generate_opinions(
+        user_ids, list(new_movies.order_by('pk').values_list('pk', 'user_id')), opinions, rng), batch_size)
+    
+    recount_counters(new_movies)
+    
+    return {'users': created_users, 'movies': created_movies, 'opinions': created_opinions}
@@ -0,0 +1,87 @@
+import operator
+from functools import reduce
+
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.utils import six
+from django.utils.encoding import force_text
+from django.utils.translation import ugettext_lazy as _
+
+from rest_framework.compat import coreapi, coreschema
+from rest_framework.filters import BaseFilterBackend, OrderingFilter, SearchFilter
+
+from movies.search import get_search_terms, search_movies
+
+
+class UserSearchFilter(SearchFilter):
+    """
+    Search filter over fields of the movie user (`user__<field>`).
+    
+    The matching users are resolved first with a query on the users table, so
+    that movies are filtered by `user_id` and ordered by the (user, ordering)
+    indexes instead of joining users and scanning all movies.
+    """
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        search_terms = self.get_search_terms(request)
+
+        if not search_fields or not search_terms:
+            return queryset
+        
+        orm_lookups = []
+        for search_field in search_fields:
+            orm_lookup = self.construct_search(six.text_type(search_field))
+            assert orm_lookup.startswith('user__'), (
+                'UserSearchFilter only supports search fields of the user, '
+                'got `{}`'.format(search_field))
+            orm_lookups.append(orm_lookup[len('user__'):])
+        
+        users = get_user_model().objects.all()
+        for search_term in search_terms:
+            queries = [Q(**{orm_lookup: search_term}) for orm_lookup in orm_lookups]
+            users = users.filter(reduce(operator.or_, queries))
+        
+        user_ids = list(users.values_list('pk', flat=True))
+        if len(user_ids) == 1:
+            return queryset.filter(user=user_ids[0])
+        
+        return queryset.filter(user__in=user_ids)
+
+
+class MovieFullTextSearchFilter(BaseFilterBackend):
+    """
+    Full text search of movie titles and descriptions with the `q` query 
+    param, see movies.search.
+    
+    Results are ordered by relevance unless an ordering is requested, cursor
+    pagination always orders by its ordering field.
+    """
+    search_param = 'q'
+    search_title = _('Full text search')
+    search_description = _('Words of the movie title or description.')
+    
+    def filter_queryset(self, request, queryset, view):
+        terms = get_search_terms(request.query_params.get(self.search_param, ''))
+        if not terms:
+            return queryset
+        
+        queryset = search_movies(queryset, terms)
+        if not request.query_params.get(OrderingFilter.ordering_param):
+            queryset = queryset.order_by('-search_rank', '-id')
+        
+        return queryset
+    
+    def get_schema_fields(self, view):
+        assert coreapi is not None, 'coreapi must be installed to use `get_schema_fields()`'
+        assert coreschema is not None, 'coreschema must be installed to use `get_schema_fields()`'
+        return [
+            coreapi.Field(
+                name=self.search_param,
+                required=False,
+                location='query',
+                schema=coreschema.String(
+                    title=force_text(self.search_title),
+                    description=force_text(self.search_description)
+                )
+            )
+        ]
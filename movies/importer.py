@@ -0,0 +1,241 @@
+from __future__ import unicode_literals
+
+import io
+import json
+import os
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.db import connections, transaction
+from django.utils import six
+from django.utils.timezone import now
+
+from rest_framework import serializers
+
+from movies.counters import recount_counters
+from movies.models import Movie, MovieOpinion, CatalogImport, OPINION_LIKE, OPINION_HATE
+from movies.serializers import MovieSerializer
+
+
+# validated fields of MovieSerializer written on import, counters are rebuilt from opinions
+IMPORT_FIELDS = ('title', 'description', 'air_date')
+
+# number of reported errors kept, the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+
+def iter_records(path):
+    """
+    Iterate the records of an NDJSON file, streamed line by line, or of a
+    JSON file with a list of records, loaded at once.
+    
+    Yields:
+        tuple: line number (list index + 1 for JSON lists) and the JSON line or record
+    """
+    with io.open(path, encoding='utf-8') as source:
+        first = source.read(1)
+        while first.isspace():
+            first = source.read(1)
+        source.seek(0)
+        
+        if first == '[':
+            for number, record in enumerate(json.load(source), 1):
+                yield number, record
+            return
+        
+        for number, line in enumerate(source, 1):
+            if line.strip():
+                yield number, line
+
+
+class UsernameCache(object):
+    """
+    Username to user id lookups, unknown usernames are loaded in batches and
+    cached with None when they do not exist.
+    """
+    def __init__(self, max_size=100000, batch_size=500):
+        self.ids = {}
+        self.max_size = max_size
+        self.batch_size = batch_size
+    
+    def load(self, usernames):
+        usernames = set(usernames)
+        missing = [username for username in usernames if username not in self.ids]
+        if len(self.ids) + len(missing) > self.max_size:
+            # only the cached usernames the batch needs are kept
+            self.ids = dict((username, pk) for username, pk in self.ids.items() if username in usernames)
+        
+        User = get_user_model()
+        for index in range(0, len(missing), self.batch_size):
+            batch = missing[index:index + self.batch_size]
+            found = dict(User.objects.filter(username__in=batch).values_list('username', 'pk'))
+            for username in batch:
+                self.ids[username] = found.get(username)
+    
+    def get(self, username):
+        return self.ids.get(username)
+
+
+class RecordError(Exception):
+    pass
+
+
+def parse_record(value, validator):
+    """
+    Validate a movie record with the field rules of `MovieSerializer`.
+    
+    Records are objects with `title`, `description`, `air_date`, optional
+    `publication_date`, the `username` of the owner and optional `opinions`
+    as a list of {username, opinion} objects, other keys are ignored so that
+    the NDJSON output of `export_movies` can be imported.
+    
+    Args:
+        value(str|dict): JSON line or record
+        validator(movies.serializers.MovieSerializer): serializer without data
+    
+    Returns:
+        tuple: owner username, movie fields and dict of opinions by username
+    
+    Raises:
+        RecordError: on invalid record
+    """
+    if isinstance(value, six.string_types):
+        try:
+            value = json.loads(value)
+        except ValueError as e:
+            raise RecordError('Invalid JSON: {}'.format(e))
+    if not isinstance(value, dict):
+        raise RecordError('Expected an object.')
+    
+    try:
+        data = validator.run_validation(value)
+        fields = dict((name, data[name]) for name in IMPORT_FIELDS if name in data)
+        publication_date = value.get('publication_date')
+        fields['publication_date'] = (serializers.DateTimeField().run_validation(publication_date)
+                                      if publication_date else now())
+    except serializers.ValidationError as e:
+        raise RecordError(json.dumps(e.detail))
+    
+    username = value.get('username')
+    if not username or not isinstance(username, six.string_types):
+        raise RecordError('Missing owner `username`.')
+    
+    opinions = {}
+    for item in value.get('opinions') or []:
+        if (not isinstance(item, dict) or not isinstance(item.get('username'), six.string_types) or
+                item.get('opinion') not in (OPINION_LIKE, OPINION_HATE)):
+            raise RecordError('Invalid opinion `{}`.'.format(json.dumps(item)))
+        opinions[item.get('username')] = item['opinion']
+    if username in opinions:
+        raise RecordError('The owner `{}` can not have an opinion.'.format(username))
+    
+    return username, fields, opinions
+
+
+def create_movies(movies):
+    """
+    Insert movies and set their ids, with a single query on databases that 
+    return the ids of bulk inserts and on SQLite, one by one otherwise.
+    """
+    if not movies:
+        return
+    
+    connection = connections[Movie.objects.db]
+    if connection.features.can_return_ids_from_bulk_insert:
+        Movie.objects.bulk_create(movies)
+    elif connection.vendor == 'sqlite':
+        Movie.objects.bulk_create(movies)
+        # the write lock of the transaction is held since the insert, so the
+        # last ids are the created movies
+        ids = Movie.objects.order_by('-pk').values_list('pk', flat=True)[:len(movies)]
+        for movie, pk in zip(movies, reversed(list(ids))):
+            movie.pk = pk
+    else:
+        # concurrent inserts may interleave ids on other databases
+        for movie in movies:
+            movie.save(force_insert=True)
+
+
+def import_batch(batch, checkpoint, validator, users, errors):
+    """
+    Insert the valid records of a batch and advance the checkpoint past the
+    batch in the same transaction.
+    """
+    records = []
+    for number, value in batch:
+        try:
+            records.append((number, ) + parse_record(value, validator))
+        except RecordError as e:
+            errors.append((number, six.text_type(e)))
+    
+    users.load([username for number, username, fields, opinions in records] +
+               [voter for record in records for voter in record[3]])
+    
+    movies, movie_opinions = [], []
+    for number, username, fields, opinions in records:
+        unknown = [name for name in [username] + list(opinions) if users.get(name) is None]
+        if unknown:
+            errors.append((number, 'Unknown users `{}`.'.format('`, `'.join(sorted(unknown)))))
+            continue
+        
+        movies.append(Movie(user_id=users.get(username), **fields))
+        movie_opinions.append(opinions)
+    
+    with transaction.atomic():
+        create_movies(movies)
+        
+        created = MovieOpinion.objects.bulk_create([
+            MovieOpinion(user_id=users.get(voter), movie_id=movie.pk, opinion=opinion)
+            for movie, opinions in zip(movies, movie_opinions)
+            for voter, opinion in opinions.items()
+        ])
+        
+        checkpoint.line = batch[-1][0]
+        checkpoint.movies += len(movies)
+        checkpoint.opinions += len(created)
+        checkpoint.errors += len(batch) - len(movies)
+        checkpoint.save()
+
+
+def import_catalog(path, batch_size=1000, restart=False):
+    """
+    Import movies with their opinions from a JSON or NDJSON file, see
+    `parse_record` for the record format, and rebuild the counters of the
+    imported movies at the end.
+    
+    Every batch is inserted with `bulk_create` in a transaction that also
+    advances the `CatalogImport` checkpoint of the file, an interrupted
+    import continues after the last imported batch when run again.
+    
+    Args:
+        path(str): file path
+        batch_size(int): number of records per transaction
+        restart(bool): ignore the checkpoint and import the whole file again
+    
+    Returns:
+        tuple: movies.models.CatalogImport checkpoint with the import totals
+               and list of (line number, error) of invalid records
+    """
+    last_movie_id = Movie.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    checkpoint, created = CatalogImport.objects.get_or_create(source=os.path.abspath(path), defaults={
+        'start_movie_id': last_movie_id
+    })
+    if restart and not created:
+        checkpoint.line = checkpoint.movies = checkpoint.opinions = checkpoint.errors = 0
+        checkpoint.start_movie_id = last_movie_id
+        checkpoint.save()
+    
+    records = ((number, value) for number, value in iter_records(path) if number > checkpoint.line)
+    validator = MovieSerializer()
+    users = UsernameCache()
+    errors = []
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            break
+        import_batch(batch, checkpoint, validator, users, errors)
+        del errors[MAX_REPORTED_ERRORS:]
+    
+    recount_counters(Movie.objects.filter(pk__gt=checkpoint.start_movie_id))
+    
+    return checkpoint, errors
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from movies.counters import get_counter_drift, recount_counters
+from movies.models import Movie
+
+
+class Command(BaseCommand):
+    help = 'Audit movie likes|hates counters against opinions and repair drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', default=False,
+                            help='Recount counters of movies with drift.')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of movies checked per query.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        drifted = fixed = 0
+        
+        last_id = 0
+        while True:
+            batch = Movie.objects.filter(pk__gt=last_id).order_by('pk')
+            batch_ids = list(batch.values_list('pk', flat=True)[:batch_size])
+            if not batch_ids:
+                break
+            last_id = batch_ids[-1]
+            
+            with transaction.atomic():
+                drift = get_counter_drift(Movie.objects.filter(pk__in=batch_ids))
+                drift = list(drift.values_list('pk', 'likes_total', 'likes_count', 
+                                               'hates_total', 'hates_count'))
+                
+                for movie_id, likes_total, likes_count, hates_total, hates_count in drift:
+                    self.stdout.write('movie {}: likes {} -> {}, hates {} -> {}'.format(
+                        movie_id, likes_total, likes_count, hates_total, hates_count))
+                
+                drifted += len(drift)
+                if options['fix'] and drift:
+                    fixed += recount_counters(Movie.objects.filter(pk__in=[d[0] for d in drift]))
+        
+        self.stdout.write('{} movies with counter drift, {} fixed.'.format(drifted, fixed))
@@ -0,0 +1,132 @@
+import json
+import os
+import re
+import shutil
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from benchmarks.dataset import build_dataset, get_dataset_size
+from benchmarks.drivers import DRIVERS, ClientDriver
+from benchmarks.encoding import benchmark_encoding
+from benchmarks.runner import run_benchmark, compare_reports
+from benchmarks.scenarios import Fixtures, get_scenarios
+from benchmarks.writes import benchmark_writes
+
+
+class Command(BaseCommand):
+    help = ('Benchmark the movies list and opinion endpoints on a generated '
+            'dataset and print a JSON report with latency percentiles, queries '
+            'per request and throughput of every scenario.')
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=os.path.join(tempfile.gettempdir(), 'movierama-benchmark.sqlite3'),
+                            help=('SQLite database file of the dataset, built when empty. Every '
+                                  'run works on a copy so that runs are repeatable. Other '
+                                  'databases are benchmarked in place and ignore it.'))
+        parser.add_argument('--rebuild', action='store_true', default=False,
+                            help='Flush the database and build the dataset again.')
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--movies', type=int, default=100000)
+        parser.add_argument('--opinions', type=int, default=1000000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--driver', choices=sorted(DRIVERS) + ['all'], default='all',
+                            help='Test client in process, threaded WSGI server over http or both.')
+        parser.add_argument('--requests', type=int, default=50,
+                            help='Measured requests per scenario.')
+        parser.add_argument('--warmup', type=int, default=5,
+                            help='Requests per scenario sent before measuring.')
+        parser.add_argument('--concurrency', type=int, default=1,
+                            help='Client threads per scenario.')
+        parser.add_argument('--scenario', help='Regular expression of the scenario names to run.')
+        parser.add_argument('--accept-encoding', default='gzip, br',
+                            help='Accept-Encoding header of the requests, empty for identity.')
+        parser.add_argument('--encoding', action='store_true', default=False,
+                            help=('Add the render time and size of a list page with every JSON '
+                                  'backend and compression level to the report.'))
+        parser.add_argument('--writes', type=int, default=0,
+                            help=('Opinions set per thread by the concurrent write benchmark of the '
+                                  'SQLite profiles, 0 skips it.'))
+        parser.add_argument('--write-threads', type=int, default=8,
+                            help='Writing threads of the concurrent write benchmark.')
+        parser.add_argument('--output', help='Write the report to a file instead of stdout.')
+        parser.add_argument('--compare', help=('Report of a previous run, the comparison '
+                                               'of every metric is added to the report.'))
+        parser.add_argument('--threshold', type=float, default=0.1,
+                            help='Relative change of a metric reported as regression.')
+    
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite':
+            self.use_database(options['database'])
+        call_command('migrate', verbosity=0, interactive=False)
+        if options['rebuild']:
+            call_command('flush', verbosity=0, interactive=False)
+        
+        dataset = get_dataset_size()
+        if not dataset['movies']:
+            self.stderr.write('Building dataset...')
+            dataset = build_dataset(options['users'], options['movies'], options['opinions'],
+                                    seed=options['seed'])
+        
+        work_database = None
+        if connection.vendor == 'sqlite':
+            descriptor, work_database = tempfile.mkstemp(suffix='.sqlite3')
+            os.close(descriptor)
+            # the last connection to close checkpoints the WAL into the file
+            connections.close_all()
+            shutil.copy(options['database'], work_database)
+            self.use_database(work_database)
+        
+        try:
+            with override_settings(DEBUG=False):
+                report = self.run(dataset, options)
+        finally:
+            connection.close()
+            if work_database:
+                os.remove(work_database)
+        
+        if options['compare']:
+            with open(options['compare']) as baseline:
+                report['comparison'] = compare_reports(json.load(baseline), report, options['threshold'])
+        
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as report_file:
+                report_file.write(output)
+        else:
+            self.stdout.write(output)
+    
+    def run(self, dataset, options):
+        scenarios = get_scenarios(Fixtures())
+        if options['scenario']:
+            scenarios = [scenario for scenario in scenarios if re.search(options['scenario'], scenario.name)]
+        if not scenarios:
+            raise CommandError('There are no scenarios matching `{}`.'.format(options['scenario']))
+        
+        drivers = DRIVERS.values() if options['driver'] == 'all' else [DRIVERS[options['driver']]]
+        report = run_benchmark(sorted(drivers, key=lambda driver: driver.name), scenarios, dataset,
+                               requests=options['requests'],
+                               warmup=options['warmup'],
+                               seed=options['seed'],
+                               concurrency=options['concurrency'],
+                               accept_encoding=options['accept_encoding'] or None)
+        
+        if options['encoding']:
+            page = ClientDriver().request('GET', reverse('movie-list'))
+            report['encoding'] = benchmark_encoding(page.json())
+        
+        if options['writes'] and connection.vendor == 'sqlite':
+            report['writes'] = benchmark_writes(options['write_threads'], options['writes'], options['seed'])
+        
+        return report
+    
+    def use_database(self, name):
+        """
+        Point the default database of all threads to another database.
+        """
+        connections.close_all()
+        connection.settings_dict['NAME'] = name
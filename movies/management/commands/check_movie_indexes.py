@@ -0,0 +1,106 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.six.moves.urllib.parse import urlencode
+
+from rest_framework.test import APIRequestFactory
+
+from core.db import explain, is_ordered_by_index, uses_index
+from movies.models import Movie
+from movies.viewsets import MovieViewSet
+
+
+class Command(BaseCommand):
+    help = ('Explain the sql queries of the movies list endpoint for every '
+            'ordering and check that they are ordered by an index.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', 
+                            help=('Username used in search queries, the owner '
+                                  'of the latest movie by default.'))
+        parser.add_argument('--force-index', action='store_true', default=False,
+                            help=('Disable sequential scans and sorts where the '
+                                  'database supports it (PostgreSQL), useful on '
+                                  'small databases where the planner prefers them.'))
+
+    def handle(self, *args, **options):
+        if options['force_index'] and connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off; SET enable_sort = off')
+        
+        username = options['username'] or Movie.objects.values_list('user__username', flat=True).first()
+        if username is None:
+            raise CommandError('There are no movies to explain the list queries for.')
+        
+        failures = 0
+        for label, sql, index_name in self.get_list_queries(username):
+            plan = explain(sql)
+            ordered_by_index = uses_index(plan, index_name) and is_ordered_by_index(plan)
+            failures += not ordered_by_index
+            
+            self.stdout.write('{} {} ({})'.format('OK  ' if ordered_by_index else 'FAIL', 
+                                                  label, index_name))
+            if options['verbosity'] > 1 or not ordered_by_index:
+                self.stdout.write('    {}'.format(sql))
+                for line in plan:
+                    self.stdout.write('    {}'.format(line))
+        
+        if failures:
+            raise CommandError('{} queries are not ordered by an index.'.format(failures))
+    
+    def get_list_queries(self, username):
+        """
+        Get the movie sql queries of the list endpoint for all orderings with 
+        limit|offset and cursor pagination, with and without search.
+        
+        Returns:
+            list<tuple<str, str, str>>: request query string, sql query and 
+                                        name of the index expected to be used
+        """
+        queries = []
+        for field in MovieViewSet.ordering_fields:
+            for ordering in (field, '-' + field):
+                for search in (None, username):
+                    params = [('limit', 1), ('ordering', ordering)]
+                    if search:
+                        params.append(('search', search))
+                    url = '/api/movies/?' + urlencode(params)
+                    index_name = self.get_index_name(field, search)
+                    
+                    page_queries = self.get_movie_queries(url)[1]
+                    
+                    response, cursor_queries = self.get_movie_queries(url + '&pagination=cursor')
+                    page_queries += cursor_queries
+                    if response.data['next']:
+                        page_queries += self.get_movie_queries(response.data['next'])[1]
+                    
+                    queries += [(query_string, sql, index_name) 
+                                for query_string, sql in page_queries]
+        
+        return queries
+    
+    def get_index_name(self, field, search):
+        fields = ['user', field, 'id'] if search else [field, 'id']
+        for index in Movie._meta.indexes:
+            if index.fields == fields:
+                return index.name
+        
+        raise CommandError('There is no index on ({}).'.format(', '.join(fields)))
+    
+    def get_movie_queries(self, url):
+        """
+        Get the response and the ordered movie sql queries of a list request.
+        """
+        view = MovieViewSet.as_view({'get': 'list'})
+        request = APIRequestFactory().get(url, HTTP_HOST='localhost')
+        
+        with CaptureQueriesContext(connection) as context:
+            response = view(request)
+        
+        query_string = url.split('?', 1)[-1]
+        queries = [(query_string, query['sql']) for query in context.captured_queries
+                   if self.is_movie_list_query(query['sql'])]
+        return response, queries
+    
+    def is_movie_list_query(self, sql):
+        return sql.startswith('SELECT') and 'FROM "movies_movie"' in sql and 'ORDER BY' in sql
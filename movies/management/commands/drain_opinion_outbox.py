@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from movies.outbox import drain_outbox
+
+
+class Command(BaseCommand):
+    help = 'Apply all the queued opinions of the opinion outbox.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Number of opinions applied per transaction.')
+
+    def handle(self, *args, **options):
+        applied = drain_outbox(batch_size=options['batch_size'])
+        self.stdout.write('{} opinions applied.'.format(applied))
@@ -0,0 +1,29 @@
+import io
+
+from django.core.management.base import BaseCommand
+from django.utils import six
+
+from movies.export import EXPORT_FORMATS, iter_movie_rows
+
+
+class Command(BaseCommand):
+    help = ('Export all movies with their owner and counters as NDJSON or CSV, '
+            'movies are read in chunks so that memory does not grow with the catalog.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='ndjson')
+        parser.add_argument('--output', help='Write the export to a file instead of stdout.')
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Number of movies read per query.')
+
+    def handle(self, *args, **options):
+        iter_lines = EXPORT_FORMATS[options['format']][0]
+        lines = iter_lines(iter_movie_rows(chunk_size=options['chunk_size']))
+        
+        if options['output']:
+            with io.open(options['output'], 'w', encoding='utf-8', newline='') as export_file:
+                for line in lines:
+                    export_file.write(line if isinstance(line, six.text_type) else line.decode('utf-8'))
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
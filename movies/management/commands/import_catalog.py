@@ -0,0 +1,34 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from movies.importer import import_catalog
+
+
+class Command(BaseCommand):
+    help = ('Import movies with their opinions from a JSON or NDJSON file with '
+            'batched inserts and rebuild their counters. Progress is saved per '
+            'batch, an interrupted import continues where it stopped.')
+    
+    def add_arguments(self, parser):
+        parser.add_argument('path', help=('NDJSON file with a movie object per line or JSON file '
+                                          'with a list of movies, see movies.importer.parse_record.'))
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of movies inserted per transaction.')
+        parser.add_argument('--restart', action='store_true', default=False,
+                            help='Ignore the saved progress and import the whole file again.')
+    
+    def handle(self, *args, **options):
+        if not os.path.isfile(options['path']):
+            raise CommandError('File `{}` does not exist.'.format(options['path']))
+        
+        checkpoint, errors = import_catalog(options['path'], batch_size=options['batch_size'],
+                                            restart=options['restart'])
+        
+        for number, error in errors:
+            self.stderr.write(u'Line {}: {}'.format(number, error))
+        if checkpoint.errors > len(errors):
+            self.stderr.write('{} more invalid lines.'.format(checkpoint.errors - len(errors)))
+        
+        self.stdout.write('{} movies and {} opinions imported, {} invalid lines.'.format(
+            checkpoint.movies, checkpoint.opinions, checkpoint.errors))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from movies.trending import rebuild_trending
+
+
+class Command(BaseCommand):
+    help = ('Recompute the trending scores of movies, needed after the '
+            'MOVIES_TRENDING setting changes or counters are edited directly.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of movies updated per batch.')
+
+    def handle(self, *args, **options):
+        updated = rebuild_trending(batch_size=options['batch_size'])
+        self.stdout.write('{} movies updated.'.format(updated))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from movies.counters import rollup_counter_shards
+
+
+class Command(BaseCommand):
+    help = 'Roll up the likes|hates counter shards to the movie counters.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of shards rolled up per transaction.')
+
+    def handle(self, *args, **options):
+        updated = rollup_counter_shards(batch_size=options['batch_size'])
+        self.stdout.write('{} movies updated.'.format(updated))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from movies.factory import seed_movies
+
+
+class Command(BaseCommand):
+    help = ('Create random users, movies and opinions with batched inserts, '
+            'the same seed creates the same data.')
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--movies', type=int, default=1000)
+        parser.add_argument('--opinions', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--username-format', default='user{}',
+                            help='Username format of the created users, movies are owned '
+                                 'and voted by all users of the format.')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Number of rows per insert.')
+    
+    def handle(self, *args, **options):
+        if '{}' not in options['username_format']:
+            raise CommandError('The username format must contain `{}`.')
+        
+        try:
+            created = seed_movies(options['users'], options['movies'], options['opinions'],
+                                  seed=options['seed'],
+                                  username_format=options['username_format'],
+                                  batch_size=options['batch_size'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        
+        self.stdout.write('{users} users, {movies} movies and {opinions} opinions created.'.format(**created))
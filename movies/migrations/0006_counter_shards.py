@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 19:32
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0005_movie_ordering_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovieCounterShard',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slot', models.PositiveSmallIntegerField()),
+                ('likes', models.BigIntegerField(default=0)),
+                ('hates', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='movie',
+            name='hates_counter',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='movie',
+            name='likes_counter',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='moviecountershard',
+            name='movie',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='counter_shards', to='movies.Movie'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='moviecountershard',
+            unique_together=set([('movie', 'slot')]),
+        ),
+    ]
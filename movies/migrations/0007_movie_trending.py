@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 19:35
+from __future__ import unicode_literals
+
+import math
+from datetime import datetime
+
+from django.db import migrations, models
+from django.db.models import Case, When, Value, FloatField
+from django.utils.timezone import utc
+
+
+# movies.trending.get_trending_score with the MOVIES_TRENDING of this 
+# migration, later changes of either are applied by `rebuild_trending`
+TRENDING_EPOCH = datetime(2018, 1, 1, tzinfo=utc)
+TRENDING_DECAY = 45000
+TRENDING_HATE_WEIGHT = 1
+
+BATCH_SIZE = 200
+
+
+def get_trending_score(likes, hates, publication_date):
+    votes = likes - hates * TRENDING_HATE_WEIGHT
+    order = math.log10(1 + abs(votes))
+    sign = 1 if votes > 0 else -1 if votes < 0 else 0
+    
+    seconds = (publication_date - TRENDING_EPOCH).total_seconds()
+    return round(sign * order + seconds / TRENDING_DECAY, 7)
+
+
+def set_trending(apps, schema_editor):
+    Movie = apps.get_model('movies', 'Movie')
+    movies = Movie.objects.order_by('pk').values_list('pk', 'likes_counter', 'hates_counter', 'publication_date')
+    
+    last_pk = 0
+    while True:
+        batch = list(movies.filter(pk__gt=last_pk)[:BATCH_SIZE])
+        if not batch:
+            break
+        last_pk = batch[-1][0]
+        
+        trending = Case(*[When(pk=pk, then=Value(get_trending_score(likes, hates, publication_date)))
+                          for pk, likes, hates, publication_date in batch],
+                        output_field=FloatField())
+        Movie.objects.filter(pk__in=[row[0] for row in batch]).update(trending=trending)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0006_counter_shards'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='trending',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(set_trending, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['trending', 'id'], name='movie_trending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['user', 'trending', 'id'], name='movie_user_trending_idx'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+# the index of movies.search when this migration was written, later changes
+# of the index need migrations of their own
+SQLITE_CREATE_SQL = [
+    'CREATE VIRTUAL TABLE movies_movie_fts USING fts5(title, description, '
+    'content="movies_movie", content_rowid="id")',
+    # external content tables are kept in sync by triggers
+    'CREATE TRIGGER movies_movie_fts_insert AFTER INSERT ON movies_movie BEGIN '
+    'INSERT INTO movies_movie_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END',
+    'CREATE TRIGGER movies_movie_fts_delete AFTER DELETE ON movies_movie BEGIN '
+    'INSERT INTO movies_movie_fts(movies_movie_fts, rowid, title, description) '
+    'VALUES (\'delete\', old.id, old.title, old.description); END',
+    'CREATE TRIGGER movies_movie_fts_update AFTER UPDATE OF title, description ON movies_movie '
+    'WHEN old.title IS NOT new.title OR old.description IS NOT new.description BEGIN '
+    'INSERT INTO movies_movie_fts(movies_movie_fts, rowid, title, description) '
+    'VALUES (\'delete\', old.id, old.title, old.description); '
+    'INSERT INTO movies_movie_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END',
+    'INSERT INTO movies_movie_fts(movies_movie_fts) VALUES (\'rebuild\')',
+]
+
+SQLITE_DROP_SQL = [
+    'DROP TRIGGER IF EXISTS movies_movie_fts_insert',
+    'DROP TRIGGER IF EXISTS movies_movie_fts_delete',
+    'DROP TRIGGER IF EXISTS movies_movie_fts_update',
+    'DROP TABLE IF EXISTS movies_movie_fts',
+]
+
+POSTGRESQL_CREATE_SQL = [
+    'CREATE INDEX movie_search_idx ON movies_movie USING GIN ('
+    'to_tsvector(\'english\', COALESCE("movies_movie"."title", \'\') || \' \' || '
+    'COALESCE("movies_movie"."description", \'\')))',
+]
+
+POSTGRESQL_DROP_SQL = [
+    'DROP INDEX IF EXISTS movie_search_idx',
+]
+
+
+def run_sql(schema_editor, statements):
+    # other databases have no index and are searched with `icontains`
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def create_index(apps, schema_editor):
+    run_sql(schema_editor, {'sqlite': SQLITE_CREATE_SQL, 'postgresql': POSTGRESQL_CREATE_SQL})
+
+
+def drop_index(apps, schema_editor):
+    run_sql(schema_editor, {'sqlite': SQLITE_DROP_SQL, 'postgresql': POSTGRESQL_DROP_SQL})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0007_movie_trending'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
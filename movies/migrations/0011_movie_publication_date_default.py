@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 22:40
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0010_opinion_outbox'),
+    ]
+
+    operations = [
+        # the column is unchanged, SQLite would rebuild the table and drop the
+        # triggers of the search index
+        migrations.SeparateDatabaseAndState(state_operations=[
+            migrations.AlterField(
+                model_name='movie',
+                name='publication_date',
+                field=models.DateTimeField(blank=True, default=django.utils.timezone.now, editable=False),
+            ),
+        ]),
+    ]
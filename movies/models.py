@@ -2,6 +2,7 @@ from __future__ import unicode_literals
 
 from django.db import models
 from django.conf import settings
+from django.utils.timezone import now
 from django.utils.translation import ugettext_lazy as _
 
 
@@ -10,15 +11,33 @@ class Movie(models.Model):
     description = models.TextField(null=True, blank=True)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     air_date =  models.DateField(null=True, blank=True)
-    publication_date = models.DateTimeField(auto_now_add=True)
+    # a default instead of auto_now_add, so that seeded and imported movies
+    # keep the publication dates they are created with
+    publication_date = models.DateTimeField(default=now, editable=False, blank=True)
     
-    likes_counter = models.PositiveSmallIntegerField(default=0)    
-    hates_counter = models.PositiveSmallIntegerField(default=0)
+    likes_counter = models.BigIntegerField(default=0)    
+    hates_counter = models.BigIntegerField(default=0)
+    # time decayed score of counters, see movies.trending
+    trending = models.FloatField(default=0)
 
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ('-publication_date', )
+        # indexes match MovieViewSet ordering fields with id as tiebreaker,
+        # alone and filtered by user
+        indexes = [
+            models.Index(fields=['likes_counter', 'id'], name='movie_likes_idx'),
+            models.Index(fields=['hates_counter', 'id'], name='movie_hates_idx'),
+            models.Index(fields=['publication_date', 'id'], name='movie_publication_idx'),
+            models.Index(fields=['air_date', 'id'], name='movie_air_date_idx'),
+            models.Index(fields=['trending', 'id'], name='movie_trending_idx'),
+            models.Index(fields=['user', 'likes_counter', 'id'], name='movie_user_likes_idx'),
+            models.Index(fields=['user', 'hates_counter', 'id'], name='movie_user_hates_idx'),
+            models.Index(fields=['user', 'publication_date', 'id'], name='movie_user_publication_idx'),
+            models.Index(fields=['user', 'air_date', 'id'], name='movie_user_air_date_idx'),
+            models.Index(fields=['user', 'trending', 'id'], name='movie_user_trending_idx'),
+        ]
     
     def __unicode__(self):
         return '{} | {} | {}'.format(self.id, self.title, self.user) 
@@ -54,5 +73,74 @@ class MovieOpinion(models.Model):
     def __unicode__(self):
         return '{} | {} | {}'.format(self.get_opinion_display() or '', 
                                      self.movie.title, 
-                                     self.user) 
-    
\ No newline at end of file
+                                     self.user)
+
+
+class MovieCounterShard(models.Model):
+    """
+    Likes|hates counter slot of a movie, votes are spread to the slots of a 
+    movie when settings.MOVIES_COUNTER_SHARDS is enabled and rolled up to the 
+    movie counters periodically.
+    """
+    movie = models.ForeignKey('movies.Movie', related_name='counter_shards', 
+                              on_delete=models.CASCADE)
+    slot = models.PositiveSmallIntegerField()
+    likes = models.BigIntegerField(default=0)
+    hates = models.BigIntegerField(default=0)
+    
+    class Meta:
+        unique_together = (
+            ('movie', 'slot'),
+        )
+    
+    def __unicode__(self):
+        return '{} | {} | {} | {}'.format(self.movie_id, self.slot, self.likes, self.hates)
+
+
+class MovieOpinionOutbox(models.Model):
+    """
+    Opinion of a user waiting to be applied to MovieOpinion and the movie 
+    counters, see movies.outbox. A user has at most one queued opinion per 
+    movie, a later opinion replaces it and is queued after the earlier ones.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='+', on_delete=models.CASCADE)
+    movie = models.ForeignKey('movies.Movie', related_name='+', on_delete=models.CASCADE)
+    opinion = models.CharField(max_length=1, choices=MovieOpinion.OPINION_CHOICES, 
+                               null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # batch of the worker applying the opinion and since when
+    claimed_by = models.CharField(max_length=32, null=True, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    # failed attempts to apply the opinion, the last error is kept and the 
+    # opinion is no longer applied once they reach MAX_ATTEMPTS
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(null=True, blank=True)
+    
+    class Meta:
+        unique_together = (
+            ('user', 'movie'),
+        )
+    
+    def __unicode__(self):
+        return '{} | {} | {}'.format(self.user_id, self.movie_id, self.opinion or '')
+
+
+class CatalogImport(models.Model):
+    """
+    Checkpoint of a catalog import source, lines up to `line` are imported 
+    and an interrupted import resumes after it, see movies.importer.
+    """
+    source = models.CharField(max_length=255, unique=True)
+    line = models.PositiveIntegerField(default=0)
+    # last movie id before the import started, counters of later movies are rebuilt
+    start_movie_id = models.BigIntegerField(default=0)
+    
+    movies = models.PositiveIntegerField(default=0)
+    opinions = models.PositiveIntegerField(default=0)
+    errors = models.PositiveIntegerField(default=0)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __unicode__(self):
+        return '{} | {} | {} | {}'.format(self.source, self.line, self.movies, self.opinions)
@@ -0,0 +1,245 @@
+import logging
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+from uuid import uuid4
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections, connection, transaction, IntegrityError, OperationalError
+from django.db.models import F, Q
+from django.utils.timezone import now
+
+from movies.counters import get_opinion_delta, refresh_counters, set_opinions
+from movies.models import MovieOpinion, MovieOpinionOutbox
+
+
+logger = logging.getLogger(__name__)
+
+# attempts of queuing an opinion while concurrent requests queue opinions of
+# the same user and movie
+ENQUEUE_ATTEMPTS = 3
+
+
+def enqueue_opinion(user, movie, opinion):
+    """
+    Queue the opinion of user for a movie in place of a queued opinion of the
+    same user and movie, the workers are woken up after commit.
+    
+    Args:
+        user(django.conf.settings.AUTH_USER_MODEL):
+        movie(movies.models.Movie): movie to be refreshed with the projected
+                                    counters
+        opinion(str): movies.models.OPINION_LIKE | movies.models.OPINION_HATE | None
+    
+    Returns:
+        movies.models.MovieOpinionOutbox: the queued opinion, the counters of 
+                                          its movie include the opinion
+    """
+    for attempt in range(ENQUEUE_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                # the replaced opinion is never applied, so the opinion is 
+                # projected on the applied one
+                MovieOpinionOutbox.objects.filter(user=user, movie=movie).delete()
+                old_opinion = MovieOpinion.objects.filter(user=user, movie=movie).values_list(
+                    'opinion', flat=True).first()
+                
+                entry = MovieOpinionOutbox.objects.create(user=user, movie=movie, opinion=opinion)
+                transaction.on_commit(wake_workers)
+            break
+        except IntegrityError:
+            # queued by a concurrent request in between, replaced on retry
+            if attempt == ENQUEUE_ATTEMPTS - 1:
+                raise
+    
+    refresh_counters(movie)
+    likes, hates = get_opinion_delta(old_opinion, opinion)
+    movie.likes_counter += likes
+    movie.hates_counter += hates
+    
+    entry.movie = movie
+    return entry
+
+
+def get_claimable_entries(worker=0, workers=1):
+    """
+    Get the queued opinions of the users of a worker that are not claimed by
+    another worker, or whose claim is older than CLAIM_TIMEOUT seconds of 
+    settings.MOVIES_OPINION_OUTBOX as their worker stopped, failed opinions 
+    are left out.
+    """
+    expired = now() - timedelta(seconds=settings.MOVIES_OPINION_OUTBOX['CLAIM_TIMEOUT'])
+    entries = MovieOpinionOutbox.objects.filter(Q(claimed_by=None) | Q(claimed_at__lt=expired), error=None)
+    if workers > 1:
+        entries = entries.annotate(partition=F('user_id') % workers).filter(partition=worker)
+    
+    return entries
+
+
+def claim_outbox(worker=0, workers=1, batch_size=100):
+    """
+    Claim a batch of the oldest claimable opinions of the users of a worker 
+    with an UPDATE that only matches claimable opinions, so the workers of all
+    processes and `drain_opinion_outbox` never claim the same opinions.
+    
+    Args:
+        worker(int): index of the worker
+        workers(int): number of workers
+        batch_size(int): max number of opinions claimed
+    
+    Returns:
+        tuple<str, int>: claim and number of opinions claimed
+    """
+    claim = uuid4().hex
+    pks = list(get_claimable_entries(worker, workers).order_by('pk').values_list('pk', flat=True)[:batch_size])
+    claimed = get_claimable_entries().filter(pk__in=pks).update(claimed_by=claim, claimed_at=now())
+    
+    return claim, claimed
+
+
+def apply_claimed(claim):
+    """
+    Apply the opinions of a claim with a transaction per user, so that the
+    opinions of a user that fail are not retried with the ones of the other
+    users. Opinions replaced by a later opinion of the same user and movie 
+    since they were claimed, or claimed again after CLAIM_TIMEOUT, are no 
+    longer in the claim and are skipped.
+    
+    Returns:
+        int: number of opinions applied
+    """
+    user_ids = MovieOpinionOutbox.objects.filter(claimed_by=claim).order_by('pk').values_list('user_id', flat=True)
+    
+    applied = 0
+    for user_id in OrderedDict.fromkeys(user_ids):
+        try:
+            applied += apply_user_claimed(claim, user_id)
+        except OperationalError:
+            # the database is unavailable, the claim expires and is retried
+            raise
+        except Exception as e:
+            logger.exception('Failed to apply the queued opinions of user %s', user_id)
+            fail_user_claimed(claim, user_id, e)
+    
+    return applied
+
+
+def apply_user_claimed(claim, user_id):
+    with transaction.atomic():
+        # locked until applied, later opinions replace them after the commit
+        entries = MovieOpinionOutbox.objects.select_for_update().filter(claimed_by=claim, user_id=user_id)
+        entries = list(entries.order_by('pk').values_list('pk', 'movie_id', 'opinion'))
+        if entries:
+            set_opinions(get_user_model()(pk=user_id), [entry[1:] for entry in entries])
+            MovieOpinionOutbox.objects.filter(pk__in=[entry[0] for entry in entries]).delete()
+    
+    return len(entries)
+
+
+def fail_user_claimed(claim, user_id, error):
+    """
+    Release the claimed opinions of a user that failed to be applied, to be 
+    claimed again until they fail MAX_ATTEMPTS times of 
+    settings.MOVIES_OPINION_OUTBOX, they are then kept with their error and 
+    no longer applied.
+    """
+    entries = MovieOpinionOutbox.objects.filter(claimed_by=claim, user_id=user_id)
+    pks = list(entries.values_list('pk', flat=True))
+    entries.update(attempts=F('attempts') + 1, claimed_by=None, claimed_at=None)
+    
+    failed = MovieOpinionOutbox.objects.filter(pk__in=pks, 
+                                               attempts__gte=settings.MOVIES_OPINION_OUTBOX['MAX_ATTEMPTS'])
+    failed.update(error='{}: {}'.format(type(error).__name__, error))
+
+
+def apply_outbox(worker=0, workers=1, batch_size=100):
+    """
+    Claim a batch of the oldest queued opinions of the users of a worker and
+    apply them, users are split by id between the workers of a process.
+    
+    Args:
+        worker(int): index of the worker
+        workers(int): number of workers
+        batch_size(int): max number of opinions applied
+    
+    Returns:
+        int: number of opinions claimed
+    """
+    claim, claimed = claim_outbox(worker, workers, batch_size)
+    if claimed:
+        apply_claimed(claim)
+    
+    return claimed
+
+
+def drain_outbox(batch_size=100):
+    """
+    Apply all the queued opinions in the current thread, until the ones left
+    are claimed by workers or failed.
+    
+    Returns:
+        int: number of opinions applied
+    """
+    applied = 0
+    while True:
+        claim, claimed = claim_outbox(batch_size=batch_size)
+        if not claimed:
+            return applied
+        applied += apply_claimed(claim)
+
+
+class OutboxWorkers(object):
+    """
+    Threads applying the queued opinions in batches, every thread applies the
+    opinions of its share of users until the outbox is empty and then waits
+    to be woken up or for POLL_INTERVAL seconds of settings.MOVIES_OPINION_OUTBOX.
+    """
+    def __init__(self, workers, batch_size, poll_interval):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.events = [threading.Event() for index in range(workers)]
+        self.threads = [threading.Thread(target=self.run, args=(index, ), name='outbox-{}'.format(index))
+                        for index in range(workers)]
+        for thread in self.threads:
+            thread.daemon = True
+            thread.start()
+    
+    def wake(self):
+        for event in self.events:
+            event.set()
+    
+    def run(self, index):
+        while True:
+            self.events[index].clear()
+            # as around requests, connections of the thread that failed or 
+            # outlived CONN_MAX_AGE are replaced
+            close_old_connections()
+            try:
+                count = apply_outbox(index, len(self.threads), self.batch_size)
+            except Exception:
+                logger.exception('Failed to apply queued opinions')
+                connection.close()
+                count = 0
+            close_old_connections()
+            
+            if not count:
+                self.events[index].wait(self.poll_interval)
+
+
+_workers = None
+_workers_lock = threading.Lock()
+
+
+def wake_workers():
+    """
+    Wake up the workers of the process, started on the first call.
+    """
+    global _workers
+    
+    with _workers_lock:
+        if _workers is None:
+            config = settings.MOVIES_OPINION_OUTBOX
+            _workers = OutboxWorkers(config['WORKERS'], config['BATCH_SIZE'], config['POLL_INTERVAL'])
+    
+    _workers.wake()
@@ -0,0 +1,146 @@
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+from django.utils import six
+from django.utils.six.moves.urllib import parse as urlparse
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class MovieCursorPagination(CursorPagination):
+    """
+    Keyset pagination for the orderings of MovieViewSet.
+    
+    Pages are fetched with `(field, id)` comparisons against the last movie of 
+    the previous page instead of OFFSET, so every page costs the same no 
+    matter how deep the client scrolls. The total count is only computed when
+    `count=true`.
+    """
+    ordering = '-publication_date'
+    page_size_query_param = 'limit'
+    max_page_size = api_settings.PAGE_SIZE
+    count_query_param = 'count'
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)[0]
+        self.field = queryset.model._meta.get_field(self.ordering.lstrip('-'))
+        self.descending = self.ordering.startswith('-')
+        self.db = queryset.db
+        
+        self.count = None
+        if request.query_params.get(self.count_query_param) in ('true', '1'):
+            self.count = queryset.count()
+        
+        queryset = queryset.order_by(*self.get_order_by())
+        position = self.decode_cursor(request)
+        if position is None:
+            results = list(queryset[:self.page_size + 1])
+        else:
+            results = []
+            for position_filter in self.get_position_filters(*position):
+                limit = self.page_size + 1 - len(results)
+                if limit <= 0:
+                    break
+                results += list(queryset.filter(position_filter)[:limit])
+        
+        self.page = results[:self.page_size]
+        self.has_next = len(results) > len(self.page)
+        
+        return self.page
+    
+    def get_order_by(self):
+        """
+        Get the ordering of the keyset, ordering field and id, in the same 
+        direction so that it is served by the (field, id) indexes.
+        """
+        prefix = '-' if self.descending else ''
+        return [prefix + self.field.name, prefix + 'id']
+    
+    def get_position_filters(self, value, pk):
+        """
+        Get the filters of movies ordered after the position (value, pk).
+        
+        Every filter is a range on the (field, id) index, the filters are 
+        queried in order until the page is full. NULL values keep the native 
+        ordering of the database, largest on PostgreSQL and smallest on SQLite,
+        and are queried separately from the rest of the values.
+        """
+        name = self.field.name
+        lookup = 'lt' if self.descending else 'gt'
+        nulls_first = self.descending == connections[self.db].features.nulls_order_largest
+        
+        if value is None:
+            filters = [Q(**{name + '__isnull': True, 'id__' + lookup: pk})]
+            if nulls_first:
+                filters.append(Q(**{name + '__isnull': False}))
+            return filters
+        
+        filters = [Q(**{name + '__' + lookup + 'e': value}) &
+                   (Q(**{name + '__' + lookup: value}) | Q(**{'id__' + lookup: pk}))]
+        if self.field.null and not nulls_first:
+            filters.append(Q(**{name + '__isnull': True}))
+        return filters
+    
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        
+        instance = self.page[-1]
+        if isinstance(instance, dict):
+            # `.values()` rows of MovieValuesSerializer
+            return self.encode_cursor((instance[self.field.attname], instance['id']))
+        return self.encode_cursor((getattr(instance, self.field.attname), instance.pk))
+    
+    def decode_cursor(self, request):
+        """
+        Given a request with a cursor, return the (value, pk) position.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        
+        try:
+            querystring = b64decode(encoded.encode('ascii')).decode('ascii')
+            tokens = urlparse.parse_qs(querystring, keep_blank_values=True)
+            
+            if tokens['o'][0] != self.ordering:
+                raise ValueError()
+            
+            pk = int(tokens['i'][0])
+            value = tokens.get('v', [None])[0]
+            if value is not None:
+                value = self.field.to_python(value)
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        
+        return value, pk
+    
+    def encode_cursor(self, position):
+        """
+        Given a (value, pk) position, return an url with encoded cursor.
+        """
+        value, pk = position
+        tokens = {'o': self.ordering, 'i': str(pk)}
+        if value is not None:
+            tokens['v'] = value.isoformat() if hasattr(value, 'isoformat') else six.text_type(value)
+        
+        querystring = urlparse.urlencode(sorted(tokens.items()))
+        encoded = b64encode(querystring.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+    
+    def get_paginated_response(self, data):
+        response_data = OrderedDict([('next', self.get_next_link())])
+        if self.count is not None:
+            response_data['count'] = self.count
+        response_data['results'] = data
+        
+        return Response(response_data)
@@ -0,0 +1,146 @@
+import re
+from functools import reduce
+from operator import and_
+
+from django.db import connections
+from django.db.models import Q, Value, FloatField
+
+
+# text search configuration of the PostgreSQL index, changing it needs a migration
+SEARCH_CONFIG = 'english'
+
+SQLITE_FTS_TABLE = 'movies_movie_fts'
+
+SQLITE_CREATE_SQL = [
+    'CREATE VIRTUAL TABLE {table} USING fts5(title, description, '
+    'content="movies_movie", content_rowid="id")',
+    # external content tables are kept in sync by triggers
+    'CREATE TRIGGER {table}_insert AFTER INSERT ON movies_movie BEGIN '
+    'INSERT INTO {table}(rowid, title, description) VALUES (new.id, new.title, new.description); END',
+    'CREATE TRIGGER {table}_delete AFTER DELETE ON movies_movie BEGIN '
+    'INSERT INTO {table}({table}, rowid, title, description) '
+    'VALUES (\'delete\', old.id, old.title, old.description); END',
+    'CREATE TRIGGER {table}_update AFTER UPDATE OF title, description ON movies_movie '
+    'WHEN old.title IS NOT new.title OR old.description IS NOT new.description BEGIN '
+    'INSERT INTO {table}({table}, rowid, title, description) '
+    'VALUES (\'delete\', old.id, old.title, old.description); '
+    'INSERT INTO {table}(rowid, title, description) VALUES (new.id, new.title, new.description); END',
+    'INSERT INTO {table}({table}) VALUES (\'rebuild\')',
+]
+
+SQLITE_DROP_SQL = [
+    'DROP TRIGGER IF EXISTS {table}_insert',
+    'DROP TRIGGER IF EXISTS {table}_delete',
+    'DROP TRIGGER IF EXISTS {table}_update',
+    'DROP TABLE IF EXISTS {table}',
+]
+
+POSTGRESQL_VECTOR = ("to_tsvector('{}', COALESCE(\"movies_movie\".\"title\", '') || ' ' || "
+                     "COALESCE(\"movies_movie\".\"description\", ''))".format(SEARCH_CONFIG))
+
+POSTGRESQL_CREATE_SQL = [
+    'CREATE INDEX movie_search_idx ON movies_movie USING GIN ({})'.format(POSTGRESQL_VECTOR),
+]
+
+POSTGRESQL_DROP_SQL = [
+    'DROP INDEX IF EXISTS movie_search_idx',
+]
+
+
+def get_search_terms(query):
+    """
+    Get the words of a search query, any full text search syntax is dropped.
+    
+    Args:
+        query(str): search query
+    
+    Returns:
+        list<str>: lowercase words
+    """
+    return re.findall(r'\w+', query.lower(), re.UNICODE)
+
+
+def create_search_index(schema_editor):
+    """
+    Create the full text index of movie titles and descriptions, an FTS5
+    table on SQLite and a GIN index on PostgreSQL, other databases have no 
+    index and are searched with `icontains`.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        statements = [sql.format(table=SQLITE_FTS_TABLE) for sql in SQLITE_CREATE_SQL]
+    elif vendor == 'postgresql':
+        statements = POSTGRESQL_CREATE_SQL
+    else:
+        statements = []
+    
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def drop_search_index(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        statements = [sql.format(table=SQLITE_FTS_TABLE) for sql in SQLITE_DROP_SQL]
+    elif vendor == 'postgresql':
+        statements = POSTGRESQL_DROP_SQL
+    else:
+        statements = []
+    
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def search_movies(queryset, terms):
+    """
+    Filter movies by full text search of all terms in their title or
+    description, the last term as prefix, and annotate them with their
+    relevance as `search_rank`, higher is more relevant. Databases other than 
+    SQLite and PostgreSQL are searched with `search_movies_unindexed`.
+    
+    Args:
+        queryset(django.db.models.QuerySet): movies
+        terms(list<str>): words of `get_search_terms`
+    
+    Returns:
+        django.db.models.QuerySet: matching movies
+    """
+    vendor = connections[queryset.db].vendor
+    
+    if vendor == 'sqlite':
+        match = ' '.join('"{}"'.format(term) for term in terms) + '*'
+        return queryset.extra(
+            select={'search_rank': '-bm25("{}")'.format(SQLITE_FTS_TABLE)},
+            tables=[SQLITE_FTS_TABLE],
+            where=['"{0}"."rowid" = "movies_movie"."id"'.format(SQLITE_FTS_TABLE),
+                   '"{0}" MATCH %s'.format(SQLITE_FTS_TABLE)],
+            params=[match])
+    
+    if vendor == 'postgresql':
+        match = ' & '.join(terms) + ':*'
+        tsquery = "to_tsquery('{}', %s)".format(SEARCH_CONFIG)
+        return queryset.extra(
+            select={'search_rank': 'ts_rank({}, {})'.format(POSTGRESQL_VECTOR, tsquery)},
+            select_params=[match],
+            where=['{} @@ {}'.format(POSTGRESQL_VECTOR, tsquery)],
+            params=[match])
+    
+    return search_movies_unindexed(queryset, terms)
+
+
+def search_movies_unindexed(queryset, terms):
+    """
+    Filter movies by all terms in their title or description with `icontains`
+    on databases without a full text index, all matching movies are equally
+    relevant.
+    
+    Args:
+        queryset(django.db.models.QuerySet): movies
+        terms(list<str>): words of `get_search_terms`
+    
+    Returns:
+        django.db.models.QuerySet: matching movies
+    """
+    matches = [Q(title__icontains=term) | Q(description__icontains=term) for term in terms]
+    return queryset.filter(reduce(and_, matches)).annotate(
+        search_rank=Value(0, output_field=FloatField()))
@@ -1,6 +1,16 @@
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import models
+
 from rest_framework import serializers
 
-from movies.models import Movie, MovieOpinion
+from core.humanize import NaturalTime
+from core.instrumentation import TimedSerializerMixin
+from movies.counters import set_opinion, set_opinions
+from movies.models import Movie, MovieOpinion, OPINION_LIKE, OPINION_HATE
+from movies.outbox import enqueue_opinion
 from users.serializers import UserSerializer
 
 
@@ -13,7 +23,45 @@ def user_of_request(serializer_instance):
     return user
 
 
-class MovieSerializer(serializers.ModelSerializer):
+class MovieListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    """
+    List serializer that resolves the opinions of the request user for the 
+    whole page with a single query instead of one query per movie.
+    """
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.Manager) else data
+        movies = list(iterable)
+        
+        # sparse fieldsets without is_liked and is_hated need no opinions
+        fields = self.child.fields
+        if 'is_liked' in fields or 'is_hated' in fields:
+            self.child.opinions = self.get_opinions(movies)
+        else:
+            self.child.opinions = {}
+        
+        return super(MovieListSerializer, self).to_representation(movies)
+    
+    def get_opinions(self, movies):
+        """
+        Get the opinions of the request user for a list of movies.
+        
+        Args:
+            movies(list<movies.models.Movie>): list of movies
+        
+        Returns:
+            dict: mapping of movie id to opinion (movies.models.OPINION_LIKE |
+                  movies.models.OPINION_HATE | None)
+        """
+        user = user_of_request(self)
+        if not movies or not user or not user.is_authenticated():
+            return {}
+        
+        opinions = MovieOpinion.objects.filter(user=user, 
+                                               movie__in=[m.pk for m in movies])
+        return dict(opinions.values_list('movie_id', 'opinion'))
+
+
+class MovieSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     
     is_liked = serializers.SerializerMethodField()
@@ -24,23 +72,162 @@ class MovieSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Movie
-        exclude = ('updated_at', )
+        exclude = ('updated_at', 'trending', )
+        list_serializer_class = MovieListSerializer
+    
+    # model columns of fields that are not columns themselves, see `get_columns`
+    field_columns = {
+        'user': ('user', 'user__id', 'user__first_name', 'user__last_name', 'user__username'),
+        'is_liked': (),
+        'is_hated': (),
+        'is_opinion_disabled': ('user', ),
+        'publication_date_since': ('publication_date', ),
+    }
+    
+    def __init__(self, *args, **kwargs):
+        """
+        Args:
+            fields(set<str>): (optional) names of the rendered fields, all by default
+        """
+        fields = kwargs.pop('fields', None)
+        super(MovieSerializer, self).__init__(*args, **kwargs)
+        
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+    
+    @classmethod
+    def get_columns(cls, fields):
+        """
+        Get the model columns to be loaded for a set of rendered fields.
+        
+        Args:
+            fields(set<str>): names of serializer fields
+        
+        Returns:
+            list<str>: field names and lookups for `QuerySet.only`
+        """
+        columns = set(['id'])
+        for name in fields:
+            columns.update(cls.field_columns.get(name, (name, )))
+        
+        return sorted(columns)
+    
+    def get_user_opinion(self, instance, user):
+        # opinions of a page are resolved in batch by MovieListSerializer
+        opinions = getattr(self, 'opinions', None)
+        if opinions is not None:
+            return opinions.get(instance.pk)
+        
+        # single instance opinion is looked up once for is_liked and is_hated
+        cached = getattr(self, '_instance_opinion', None)
+        if cached is None or cached[0] != instance.pk:
+            opinion = instance.opinions.filter(user=user).values_list('opinion', flat=True)
+            cached = self._instance_opinion = (instance.pk, opinion.first())
+        
+        return cached[1]
 
     def get_is_liked(self, instance):
         user = user_of_request(self)
-        return user and user.is_authenticated() and instance.likes.filter(user=user).exists()
+        return user and user.is_authenticated() and self.get_user_opinion(instance, user) == OPINION_LIKE
     
     def get_is_hated(self, instance):
         user = user_of_request(self)
-        return user and user.is_authenticated() and instance.hates.filter(user=user).exists()
+        return user and user.is_authenticated() and self.get_user_opinion(instance, user) == OPINION_HATE
     
     def get_is_opinion_disabled(self, instance):
         user = user_of_request(self)
-        return not user or not user.is_authenticated() or instance.user == user
+        return not user or not user.is_authenticated() or instance.user_id == user.pk
     
     def get_publication_date_since(self, instance):
-        from django.contrib.humanize.templatetags.humanize import naturaltime
-        return naturaltime(instance.publication_date)
+        # one formatter per root serializer so a page is rendered against one now
+        root = self.root
+        natural_time = getattr(root, '_natural_time', None)
+        if natural_time is None:
+            natural_time = root._natural_time = NaturalTime()
+        
+        return natural_time(instance.publication_date)
+
+class MovieValuesSerializer(TimedSerializerMixin, serializers.BaseSerializer):
+    """
+    Read only serializer of a page of movie `.values()` rows with the same 
+    output as `MovieSerializer`, fields are resolved once per page instead of 
+    per row and the owners and opinions of the page are fetched with one 
+    query each.
+    
+    Args:
+        instance(list<dict>): rows of a queryset of `get_values`
+        fields(set<str>): (optional) names of the rendered fields, all by default
+    """
+    def __init__(self, instance=None, fields=None, **kwargs):
+        super(MovieValuesSerializer, self).__init__(instance, **kwargs)
+        self.fields = MovieSerializer(fields=fields, context=self.context).fields
+    
+    @staticmethod
+    def get_values(queryset, fields=None, columns=()):
+        """
+        Get the rows of the columns a set of fields needs.
+        
+        Args:
+            queryset(django.db.models.QuerySet): movies
+            fields(set<str>): (optional) names of the rendered fields, all by default
+            columns(list<str>): additional columns, as the ordering of cursor pages
+        
+        Returns:
+            django.db.models.QuerySet: `.values()` queryset, owners as `user` ids
+        """
+        if fields is None:
+            fields = MovieSerializer().fields
+        
+        names = [name for name in MovieSerializer.get_columns(fields) if '__' not in name]
+        names += [name for name in columns if name not in names]
+        # extra selects as the full text search rank are kept for the ordering
+        return queryset.values(*(names + list(queryset.query.extra_select)))
+    
+    def to_representation(self, rows):
+        user = user_of_request(self)
+        authenticated = user and user.is_authenticated()
+        
+        owners = self.get_owners(rows) if 'user' in self.fields else {}
+        opinions = {}
+        if authenticated and rows and ('is_liked' in self.fields or 'is_hated' in self.fields):
+            opinions = MovieOpinion.objects.filter(user=user, movie__in=[row['id'] for row in rows])
+            opinions = dict(opinions.values_list('movie_id', 'opinion'))
+        natural_time = NaturalTime()
+        
+        def get_value(name, field):
+            def value(row):
+                value = row[name]
+                return None if value is None else field.to_representation(value)
+            return value
+        
+        # values of MovieSerializer method fields, see the matching get_<field> methods
+        getters = {
+            'user': lambda row: owners.get(row['user']),
+            'is_liked': lambda row: authenticated and opinions.get(row['id']) == OPINION_LIKE,
+            'is_hated': lambda row: authenticated and opinions.get(row['id']) == OPINION_HATE,
+            'is_opinion_disabled': lambda row: not authenticated or row['user'] == user.pk,
+            'publication_date_since': lambda row: natural_time(row['publication_date']),
+        }
+        getters = [(name, getters.get(name) or get_value(name, field)) for name, field in self.fields.items()]
+        
+        return [OrderedDict((name, getter(row)) for name, getter in getters) for row in rows]
+    
+    def get_owners(self, rows):
+        """
+        Get the nested representation of the owners of a page.
+        
+        Returns:
+            dict: mapping of user id to `UserSerializer` data
+        """
+        fields = list(self.fields['user'].fields.items())
+        owners = get_user_model().objects.filter(pk__in=set(row['user'] for row in rows))
+        
+        return dict((owner['id'], OrderedDict((name, None if owner[name] is None else 
+                                               field.to_representation(owner[name]))
+                                              for name, field in fields))
+                    for owner in owners.values(*[name for name, field in fields]))
+
 
 class MovieOpinionSerializer(serializers.ModelSerializer):
     class Meta:
@@ -48,13 +235,22 @@ class MovieOpinionSerializer(serializers.ModelSerializer):
         fields = ['opinion', ]
     
     def save(self, **kwargs):
-        opinion, exists = MovieOpinion.objects.update_or_create(defaults=self.validated_data, **kwargs)
-        
-        # update movie likes|hates counter
-        movie = opinion.movie
-        movie.likes_counter = movie.likes.count()
-        movie.hates_counter = movie.hates.count()
-        
-        movie.save(update_fields=['likes_counter', 'hates_counter'])
-        
-        return opinion
\ No newline at end of file
+        return set_opinion(opinion=self.validated_data.get('opinion'), **kwargs)
+    
+    def enqueue(self, **kwargs):
+        return enqueue_opinion(opinion=self.validated_data.get('opinion'), **kwargs)
+
+
+class MovieOpinionItemSerializer(serializers.Serializer):
+    movie = serializers.IntegerField()
+    opinion = serializers.ChoiceField(choices=MovieOpinion.OPINION_CHOICES, 
+                                      allow_null=True, allow_blank=True)
+
+
+class MovieBulkOpinionSerializer(serializers.Serializer):
+    opinions = serializers.ListField(child=MovieOpinionItemSerializer(), min_length=1,
+                                     max_length=settings.MOVIES_BULK_OPINIONS_LIMIT)
+    
+    def save(self, user):
+        return set_opinions(user, [(item['movie'], item['opinion'] or None) 
+                                   for item in self.validated_data['opinions']])
@@ -0,0 +1,24 @@
+from django.dispatch import Signal
+
+from movies.cache import bump_catalog_version
+from movies.events import events
+from movies.trending import get_trending_score
+
+
+# sent after commit with `counters`, mapping of movie id to tuple<int, int>
+# of the likes and hates counters of movies whose opinions changed
+counters_changed = Signal(providing_args=['counters'])
+
+
+def movie_changed(sender, **kwargs):
+    bump_catalog_version()
+
+
+def set_movie_trending(sender, instance, **kwargs):
+    instance.trending = get_trending_score(instance.likes_counter, 
+                                           instance.hates_counter, 
+                                           instance.publication_date)
+
+
+def publish_counters(sender, counters, **kwargs):
+    events.publish(counters)
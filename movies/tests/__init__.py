@@ -1,2 +1,18 @@
 from .test_api import *
-from .test_serializers import *
\ No newline at end of file
+from .test_serializers import *
+from .test_counters import *
+from .test_indexes import *
+from .test_trending import *
+from .test_instrumentation import *
+from .test_benchmarks import *
+from .test_factory import *
+from .test_search import *
+from .test_export import *
+from .test_importer import *
+from .test_humanize import *
+from .test_compression import *
+from .test_events import *
+from .test_authentication import *
+from .test_sqlite import *
+from .test_outbox import *
+from .test_views import *
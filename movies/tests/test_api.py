@@ -3,12 +3,17 @@ from datetime import timedelta
 from rest_framework import status
 from rest_framework.test import APITestCase
 
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from django.utils.timezone import now
 
+from movies.cache import get_cache, get_list_cache_stats
 from movies.models import Movie, MovieOpinion, OPINION_LIKE, OPINION_HATE
 from movies.serializers import MovieSerializer
+from movies.viewsets import MovieViewSet
 from movies.factory import (
     get_paginated_queryset,
     get_sample_users,
@@ -17,6 +22,7 @@ from movies.factory import (
     set_sample_opinion,
     get_sample_request
 )
+from movies.tests.utils import SHARED_CACHES
 
 
 class MovieViewSetCreateTests(APITestCase):
@@ -755,3 +761,519 @@ class MovieOpinionViewSetTests(APITestCase):
         self.assertEqual(movie.hates_counter, 0)
         self.assertEqual(movie.hates.count(), 0)
 
+
+
+class MovieViewSetCursorPaginationTests(APITestCase):
+    def setUp(self):
+        users = get_sample_users()
+        movies = get_sample_movies(users, number=7)
+        set_sample_opinions(users, movies, OPINION_LIKE)
+        set_sample_opinion(users[-1], movies[5], OPINION_HATE)
+        Movie.objects.filter(pk__in=[movies[1].pk, movies[6].pk]).update(air_date=None)
+        Movie.objects.filter(pk=movies[4].pk).update(air_date=now().date() - timedelta(days=1))
+    
+    def get_cursor_paginated_ids(self, ordering):
+        url = '{}?pagination=cursor&limit=2&ordering={}'.format(reverse('movie-list'), ordering)
+        ids = []
+        while url:
+            response = self.client.get(url, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data['results']), 2)
+            self.assertNotIn('count', response.data)
+            
+            ids += [movie['id'] for movie in response.data['results']]
+            url = response.data['next']
+        
+        return ids
+    
+    def get_expected_ids(self, ordering):
+        field = ordering.lstrip('-')
+        descending = ordering.startswith('-')
+        
+        movies = list(Movie.objects.all())
+        not_null = sorted([m for m in movies if getattr(m, field) is not None],
+                          key=lambda m: (getattr(m, field), m.pk))
+        null = sorted([m for m in movies if getattr(m, field) is None],
+                      key=lambda m: m.pk)
+        
+        # NULL values keep the native database ordering
+        if connection.features.nulls_order_largest:
+            ordered = not_null + null
+        else:
+            ordered = null + not_null
+        
+        return [m.pk for m in (reversed(ordered) if descending else ordered)]
+    
+    def test_cursor_pagination_orderings(self):
+        """
+        Ensure that cursor pagination returns all movies once in the requested 
+        ordering with id as tiebreaker.
+        """
+        for field in MovieViewSet.ordering_fields:
+            for ordering in (field, '-' + field):
+                self.assertEqual(self.get_cursor_paginated_ids(ordering), 
+                                 self.get_expected_ids(ordering), ordering)
+    
+    def test_cursor_pagination_count(self):
+        """
+        Ensure that cursor pagination count is returned only when requested.
+        """
+        url = '{}?pagination=cursor&count=true'.format(reverse('movie-list'))
+        response = self.client.get(url, format='json')
+        
+        self.assertEqual(response.data['count'], 7)
+        self.assertIsNone(response.data['next'])
+    
+    def test_cursor_pagination_invalid_cursor(self):
+        """
+        Ensure that invalid cursors or cursors of another ordering are rejected.
+        """
+        url = '{}?pagination=cursor&limit=2&ordering=likes_counter'.format(reverse('movie-list'))
+        next_url = self.client.get(url, format='json').data['next']
+        
+        response = self.client.get(next_url.replace('ordering=likes_counter', 'ordering=air_date'))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        
+        response = self.client.get('{}?cursor=invalid'.format(reverse('movie-list')))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class MovieListQueriesTests(APITestCase):
+    def setUp(self):
+        self.users = get_sample_users()
+        movies = get_sample_movies(self.users, number=100)
+        # spread movies to all users
+        for index, user in enumerate(self.users):
+            Movie.objects.filter(pk__in=[m.pk for m in movies[index::len(self.users)]]).update(user=user)
+        set_sample_opinions(self.users, movies, OPINION_LIKE)
+    
+    def test_list_movies_queries_anonymous_user(self):
+        """
+        Ensure that a page of movies is fetched with etag, count and select 
+        queries.
+        """
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('movie-list'), format='json')
+        
+        self.assertEqual(len(response.data['results']), 100)
+    
+    def test_list_movies_queries_authenticated_user(self):
+        """
+        Ensure that a page of movies is fetched with etag, count, select and 
+        opinions queries for authenticated users.
+        """
+        self.client.force_authenticate(user=self.users[-1])
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('movie-list'), format='json')
+        
+        self.assertEqual(len(response.data['results']), 100)
+        self.assertEqual(len([m for m in response.data['results'] if m['is_opinion_disabled']]), 25)
+    
+    def test_opinion_queries(self):
+        """
+        Ensure that setting an opinion does not fetch the movie owner again.
+        """
+        movie = Movie.objects.filter(user=self.users[0]).first()
+        url = reverse('movie-opinion', kwargs={'pk': movie.pk})
+        
+        self.client.force_authenticate(user=self.users[-1])
+        with self.assertNumQueries(13):
+            response = self.client.post(url, {'opinion': OPINION_HATE}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['user']['id'], self.users[0].pk)
+
+
+class MovieSparseFieldsetTests(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.users = get_sample_users()
+        self.movies = get_sample_movies(self.users, number=30)
+        set_sample_opinions(self.users[1:], self.movies, OPINION_LIKE)
+        self.url = reverse('movie-list')
+        self.client.force_authenticate(user=self.users[1])
+    
+    def get_list(self, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, params, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, [query['sql'] for query in queries.captured_queries]
+    
+    def test_fields(self):
+        """
+        Ensure that only the requested fields are rendered and selected and
+        that the opinions are not queried without is_liked and is_hated.
+        """
+        response, queries = self.get_list({'fields': 'id,title,likes_counter', 'ordering': 'air_date'})
+        
+        for movie in response.data['results']:
+            self.assertEqual(sorted(movie.keys()), ['id', 'likes_counter', 'title'])
+        select = queries[1]
+        self.assertNotIn('description', select)
+        self.assertNotIn('auth_user', select)
+        self.assertIn('"movies_movie"."air_date"', select)
+        self.assertEqual(len(queries), 3)
+        
+        response, queries = self.get_list({'fields': 'id,is_liked,user'})
+        self.assertEqual(sorted(m['id'] for m in response.data['results'] if m['is_liked']), 
+                         [m.pk for m in self.movies[:4]])
+        self.assertEqual(response.data['results'][0]['user']['id'], self.users[0].pk)
+        self.assertEqual(len(queries), 4)
+    
+    def test_omit(self):
+        """
+        Ensure that omitted fields are left out of the rendered movies and the 
+        query and both params can be combined.
+        """
+        response, queries = self.get_list({'omit': 'description,user'})
+        
+        movie = response.data['results'][0]
+        self.assertNotIn('description', movie)
+        self.assertNotIn('user', movie)
+        self.assertIn('is_opinion_disabled', movie)
+        self.assertTrue(all('"movies_movie"."description"' not in query for query in queries))
+        
+        response, queries = self.get_list({'fields': 'id,title,description', 'omit': 'description'})
+        self.assertEqual(sorted(response.data['results'][0].keys()), ['id', 'title'])
+    
+    def test_sparse_cursor_pages(self):
+        """
+        Ensure that cursor pages of sparse fieldsets do not load the ordering
+        field of the next cursor separately.
+        """
+        params = {'fields': 'id', 'pagination': 'cursor', 'limit': 10, 'ordering': '-likes_counter'}
+        response, queries = self.get_list(params)
+        
+        self.assertEqual(len(queries), 2)
+        self.assertEqual([m['id'] for m in response.data['results']][:4], 
+                         [m.pk for m in reversed(self.movies[:4])])
+        self.assertIsNotNone(response.data['next'])
+    
+    def test_unknown_fields(self):
+        """
+        Ensure that unknown fields are rejected.
+        """
+        response = self.client.get(self.url, {'fields': 'id,secret', 'omit': 'password'}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('secret', response.data['fields'])
+        self.assertIn('password', response.data['omit'])
+
+
+@override_settings(CACHES=SHARED_CACHES)
+class MovieListCacheTests(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.users = get_sample_users()
+        self.movies = get_sample_movies(self.users)
+    
+    def test_anonymous_list_is_cached(self):
+        """
+        Ensure that anonymous list pages are served from cache.
+        """
+        url = '{}?ordering=-likes_counter'.format(reverse('movie-list'))
+        response = self.client.get(url, format='json')
+        
+        with self.assertNumQueries(0):
+            cached_response = self.client.get(url, format='json')
+        
+        self.assertEqual(cached_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(cached_response.data, response.data)
+        self.assertEqual(get_list_cache_stats()['hits'], 1)
+        self.assertEqual(get_list_cache_stats()['misses'], 1)
+    
+    def test_cached_list_per_renderer(self):
+        """
+        Ensure that cached pages of the browsable API are not served as JSON.
+        """
+        url = reverse('movie-list')
+        etag = self.client.get(url, HTTP_ACCEPT='text/html')['ETag']
+        
+        response = self.client.get(url, format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(get_list_cache_stats()['misses'], 2)
+    
+    def test_authenticated_list_is_not_cached(self):
+        """
+        Ensure that list pages of authenticated users are not cached.
+        """
+        self.client.force_authenticate(user=self.users[-1])
+        self.client.get(reverse('movie-list'), format='json')
+        self.client.get(reverse('movie-list'), format='json')
+        
+        self.assertEqual(get_list_cache_stats()['hits'], 0)
+        self.assertEqual(get_list_cache_stats()['misses'], 0)
+    
+    def test_cache_is_invalidated_on_movie_create(self):
+        """
+        Ensure that a created movie is listed in the next anonymous page.
+        """
+        url = reverse('movie-list')
+        self.assertEqual(self.client.get(url, format='json').data['count'], 4)
+        
+        self.client.force_authenticate(user=self.users[0])
+        self.client.post(url, {'title': 'Movie title', 'description': 'Description'}, format='json')
+        self.client.force_authenticate(user=None)
+        
+        self.assertEqual(self.client.get(url, format='json').data['count'], 5)
+        self.assertEqual(get_list_cache_stats()['hits'], 0)
+    
+    def test_cache_is_invalidated_on_opinion(self):
+        """
+        Ensure that counter changes are listed in the next anonymous page.
+        """
+        url = reverse('movie-list')
+        response = self.client.get(url, format='json')
+        self.assertEqual(response.data['results'][-1]['likes_counter'], 0)
+        
+        self.client.force_authenticate(user=self.users[-1])
+        opinion_url = reverse('movie-opinion', kwargs={'pk': self.movies[0].pk})
+        self.client.post(opinion_url, {'opinion': OPINION_LIKE}, format='json')
+        self.client.force_authenticate(user=None)
+        
+        response = self.client.get(url, format='json')
+        self.assertEqual(response.data['results'][-1]['likes_counter'], 1)
+    
+    def test_cache_stats_admin_only(self):
+        """
+        Ensure that only admin users can get the cache stats.
+        """
+        url = reverse('movie-cache-stats')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        
+        admin = get_user_model().objects.create(username='admin', is_staff=True)
+        self.client.force_authenticate(user=admin)
+        response = self.client.get(url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(response.data.keys()), ['hits', 'misses', 'version'])
+    
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_local_cache(self):
+        """
+        Ensure that list pages are not cached in local memory caches.
+        """
+        url = reverse('movie-list')
+        self.client.get(url, format='json')
+        
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url, format='json')
+        self.assertGreater(len(queries), 0)
+        self.assertEqual(get_list_cache_stats()['misses'], 0)
+
+
+
+class MovieListConditionalTests(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.users = get_sample_users()
+        self.movies = get_sample_movies(self.users)
+        self.url = reverse('movie-list')
+    
+    def test_list_etag_not_modified(self):
+        """
+        Ensure that list requests with a matching etag get a 304 response.
+        """
+        response = self.client.get(self.url, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.has_header('Last-Modified'))
+        etag = response['ETag']
+        
+        response = self.client.get(self.url, format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+        
+        response = self.client.get(self.url, format='json', HTTP_IF_NONE_MATCH='W/' + etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+    
+    def test_list_etag_authenticated_user(self):
+        """
+        Ensure that authenticated users get a 304 response without fetching 
+        their opinions.
+        """
+        self.client.force_authenticate(user=self.users[-1])
+        etag = self.client.get(self.url, format='json')['ETag']
+        
+        # count, page and etag of the page
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url, format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        
+        self.client.force_authenticate(user=self.users[-2])
+        response = self.client.get(self.url, format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_list_etag_changes_on_opinion(self):
+        """
+        Ensure that the etag changes when movie counters change.
+        """
+        self.client.force_authenticate(user=self.users[-1])
+        etag = self.client.get(self.url, format='json')['ETag']
+        
+        opinion_url = reverse('movie-opinion', kwargs={'pk': self.movies[0].pk})
+        self.client.post(opinion_url, {'opinion': OPINION_LIKE}, format='json')
+        
+        response = self.client.get(self.url, format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+    
+    def test_list_etag_changes_on_edit(self):
+        """
+        Ensure that the etag changes when a movie of the page is edited and not
+        when a movie of another page is.
+        """
+        url = '{}?limit=1'.format(self.url)
+        response = self.client.get(url, format='json')
+        etag, movie_id = response['ETag'], response.data['results'][0]['id']
+        
+        Movie.objects.exclude(pk=movie_id).first().save()
+        response = self.client.get(url, format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        
+        Movie.objects.get(pk=movie_id).save()
+        response = self.client.get(url, format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_list_etag_depends_on_renderer(self):
+        """
+        Ensure that the browsable API and JSON lists have different etags and
+        vary by Accept.
+        """
+        response = self.client.get(self.url, HTTP_ACCEPT='text/html')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('Accept', response['Vary'])
+        
+        response = self.client.get(self.url, format='json', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('Accept', response['Vary'])
+    
+    def test_list_etag_depends_on_query(self):
+        """
+        Ensure that lists with different query params have different etags.
+        """
+        etag = self.client.get(self.url, format='json')['ETag']
+        
+        url = '{}?ordering=likes_counter'.format(self.url)
+        response = self.client.get(url, format='json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class MovieBulkOpinionViewSetTests(APITestCase):
+    def setUp(self):
+        self.users = get_sample_users()
+        self.movies = get_sample_movies(self.users)
+        self.user = self.users[-1]
+        self.url = reverse('movie-bulk-opinions')
+    
+    def test_bulk_opinions(self):
+        """
+        Ensure that a user can like, hate and undo opinions of many movies 
+        with a single request.
+        """
+        set_sample_opinion(self.user, self.movies[2], OPINION_LIKE)
+        set_sample_opinion(self.user, self.movies[3], OPINION_HATE)
+        data = {'opinions': [
+            {'movie': self.movies[0].pk, 'opinion': OPINION_LIKE},
+            {'movie': self.movies[1].pk, 'opinion': OPINION_HATE},
+            {'movie': self.movies[2].pk, 'opinion': None},
+            {'movie': self.movies[3].pk, 'opinion': OPINION_LIKE},
+        ]}
+        
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(self.url, data, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([(r['status'], r['likes_counter'], r['hates_counter']) 
+                          for r in response.data['results']],
+                         [('ok', 1, 0), ('ok', 0, 1), ('ok', 0, 0), ('ok', 1, 0)])
+        
+        opinions = dict(MovieOpinion.objects.filter(user=self.user).values_list('movie_id', 'opinion'))
+        self.assertEqual(opinions, {self.movies[0].pk: OPINION_LIKE, 
+                                    self.movies[1].pk: OPINION_HATE,
+                                    self.movies[2].pk: None,
+                                    self.movies[3].pk: OPINION_LIKE})
+        counters = Movie.objects.order_by('pk').values_list('likes_counter', 'hates_counter')
+        self.assertEqual(list(counters), [(1, 0), (0, 1), (0, 0), (1, 0)])
+    
+    def test_bulk_opinions_owner_and_missing_movies(self):
+        """
+        Ensure that opinions of owned and missing movies are reported per item
+        without failing the other opinions.
+        """
+        owner = self.users[0]
+        other_movie = Movie.objects.create(title='other', description='other', user=self.user)
+        data = {'opinions': [
+            {'movie': self.movies[0].pk, 'opinion': OPINION_LIKE},
+            {'movie': 0, 'opinion': OPINION_LIKE},
+            {'movie': other_movie.pk, 'opinion': OPINION_HATE},
+        ]}
+        
+        self.client.force_authenticate(user=owner)
+        response = self.client.post(self.url, data, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['status'] for r in response.data['results']], 
+                         ['forbidden', 'not_found', 'ok'])
+        self.assertEqual(response.data['results'][0], {'movie': self.movies[0].pk, 'status': 'forbidden'})
+        self.assertEqual(MovieOpinion.objects.get().movie, other_movie)
+    
+    def test_bulk_opinions_last_opinion_wins(self):
+        """
+        Ensure that only the last opinion of a repeated movie is applied.
+        """
+        movie = self.movies[0]
+        data = {'opinions': [
+            {'movie': movie.pk, 'opinion': OPINION_LIKE},
+            {'movie': movie.pk, 'opinion': OPINION_HATE},
+        ]}
+        
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(self.url, data, format='json')
+        
+        self.assertEqual([r['opinion'] for r in response.data['results']], [OPINION_HATE] * 2)
+        movie.refresh_from_db()
+        self.assertEqual((movie.likes_counter, movie.hates_counter), (0, 1))
+    
+    def test_bulk_opinions_anonymous_user(self):
+        """
+        Ensure that anonymous user cannot set opinions.
+        """
+        data = {'opinions': [{'movie': self.movies[0].pk, 'opinion': OPINION_LIKE}]}
+        response = self.client.post(self.url, data, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(MovieOpinion.objects.count(), 0)
+    
+    def test_bulk_opinions_invalid(self):
+        """
+        Ensure that invalid opinions and oversized requests are rejected.
+        """
+        self.client.force_authenticate(user=self.user)
+        
+        data = {'opinions': [{'movie': self.movies[0].pk, 'opinion': 'X'}]}
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        data = {'opinions': [{'movie': self.movies[0].pk, 'opinion': OPINION_LIKE}] * 101}
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(MovieOpinion.objects.count(), 0)
+    
+    def test_bulk_opinions_queries(self):
+        """
+        Ensure that the number of queries does not depend on the number of 
+        opinions.
+        """
+        movies = get_sample_movies(self.users, number=50)
+        set_sample_opinion(self.user, movies[0], OPINION_HATE)
+        data = {'opinions': [{'movie': m.pk, 'opinion': OPINION_LIKE} for m in movies]}
+        
+        self.client.force_authenticate(user=self.user)
+        with self.assertNumQueries(15):
+            response = self.client.post(self.url, data, format='json')
+        
+        self.assertEqual(len(response.data['results']), 50)
+        self.assertEqual(Movie.objects.filter(likes_counter=1).count(), 50)
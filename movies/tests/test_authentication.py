@@ -0,0 +1,160 @@
+import threading
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.authentication import invalidate_token
+from movies.tests.utils import SHARED_CACHES
+
+
+@override_settings(CACHES=SHARED_CACHES)
+class CachedAuthenticationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('movie-cache-stats')
+        self.admin = get_user_model().objects.create(username='admin', is_staff=True)
+        self.admin.set_password('123456qwert')
+        self.admin.save()
+    
+    def get(self, **headers):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, **headers)
+        return response, len(queries)
+    
+    def test_token(self):
+        """
+        Ensure that token users are read once and the cache is invalidated on
+        token rotation.
+        """
+        token = Token.objects.create(user=self.admin)
+        headers = {'HTTP_AUTHORIZATION': 'Token {}'.format(token.key)}
+        
+        response, queries = self.get(**headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(queries, 1)
+        
+        response, queries = self.get(**headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(queries, 0)
+        
+        token.delete()
+        Token.objects.create(user=self.admin)
+        response, queries = self.get(**headers)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.data['detail'], 'Invalid token.')
+    
+    def test_token_user_change(self):
+        """
+        Ensure that cached token users are reloaded when they change.
+        """
+        token = Token.objects.create(user=self.admin)
+        headers = {'HTTP_AUTHORIZATION': 'Token {}'.format(token.key)}
+        self.get(**headers)
+        
+        self.admin.is_staff = False
+        self.admin.save()
+        response, queries = self.get(**headers)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        
+        self.admin.is_active = False
+        self.admin.save()
+        response, queries = self.get(**headers)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.data['detail'], 'User inactive or deleted.')
+    
+    def test_session(self):
+        """
+        Ensure that session users are read once and the cache is invalidated
+        on logout.
+        """
+        self.client.login(username='admin', password='123456qwert')
+        
+        response, queries = self.get()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertGreater(queries, 0)
+        
+        response, queries = self.get()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(queries, 0)
+        
+        session_key = self.client.session.session_key
+        self.client.logout()
+        self.client.cookies['sessionid'] = session_key
+        response, queries = self.get()
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+    
+    def test_session_password_change(self):
+        """
+        Ensure that cached sessions are rejected once the password changes.
+        """
+        self.client.login(username='admin', password='123456qwert')
+        self.get()
+        
+        self.admin.set_password('changed-password')
+        self.admin.save()
+        response, queries = self.get()
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+    
+    @override_settings(AUTH_CACHE={'CACHE': 'default', 'TIMEOUT': 0})
+    def test_disabled(self):
+        """
+        Ensure that users are read on every request when the cache is disabled.
+        """
+        token = Token.objects.create(user=self.admin)
+        headers = {'HTTP_AUTHORIZATION': 'Token {}'.format(token.key)}
+        
+        for _ in range(2):
+            response, queries = self.get(**headers)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(queries, 1)
+    
+    def test_token_revoked_by_other_process(self):
+        """
+        Ensure that tokens revoked by another process are rejected once the
+        other process invalidates them.
+        """
+        token = Token.objects.create(user=self.admin)
+        headers = {'HTTP_AUTHORIZATION': 'Token {}'.format(token.key)}
+        self.get(**headers)
+        
+        # the rotation of the other process, its signal handlers run on the
+        # cache clients of its own, as the ones of another thread
+        Token.objects.filter(pk=token.pk).update(key=token.generate_key())
+        clients = []
+        def revoke():
+            clients.append(caches['default'])
+            invalidate_token(Token, token)
+        other = threading.Thread(target=revoke)
+        other.start()
+        other.join()
+        
+        self.assertIsNot(clients[0], caches['default'])
+        response, queries = self.get(**headers)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.data['detail'], 'Invalid token.')
+    
+    def test_local_cache(self):
+        """
+        Ensure that users are read on every request with a local memory cache,
+        so changes made without signals by any process are seen at once.
+        """
+        token = Token.objects.create(user=self.admin)
+        headers = {'HTTP_AUTHORIZATION': 'Token {}'.format(token.key)}
+        
+        with self.settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            response, queries = self.get(**headers)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(queries, 1)
+            
+            get_user_model().objects.filter(pk=self.admin.pk).update(is_active=False)
+            response, queries = self.get(**headers)
+            self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+            self.assertEqual(response.data['detail'], 'User inactive or deleted.')
@@ -0,0 +1,99 @@
+from django.test import TestCase, override_settings
+
+from django.urls import reverse
+
+from benchmarks.dataset import build_dataset
+from benchmarks.drivers import ClientDriver
+from benchmarks.encoding import benchmark_encoding
+from benchmarks.runner import run_benchmark, compare_reports
+from benchmarks.scenarios import Fixtures, AnonymousListScenario, get_scenarios
+from movies.cache import get_cache
+from movies.counters import get_counter_drift
+from movies.models import Movie
+from movies.tests.utils import SHARED_CACHES
+
+
+@override_settings(CACHES=SHARED_CACHES)
+class BenchmarkTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+    
+    def test_build_dataset(self):
+        """
+        Ensure that datasets are deterministic and their counters match their 
+        opinions.
+        """
+        dataset = build_dataset(users=5, movies=20, opinions=40, seed=1, batch_size=7)
+        
+        self.assertEqual(dataset, {'users': 5, 'movies': 20, 'opinions': 40})
+        self.assertFalse(get_counter_drift().exists())
+        self.assertEqual(len(set(Movie.objects.values_list('publication_date', flat=True))), 20)
+        
+        titles = list(Movie.objects.order_by('pk').values_list('title', 'user__username'))
+        Movie.objects.all().delete()
+        build_dataset(users=0, movies=20, opinions=0, seed=1, batch_size=7)
+        self.assertEqual(list(Movie.objects.order_by('pk').values_list('title', 'user__username')), titles)
+    
+    def test_run_benchmark(self):
+        """
+        Ensure that every scenario reports latency, queries and throughput.
+        """
+        dataset = build_dataset(users=5, movies=30, opinions=50)
+        scenarios = get_scenarios(Fixtures())
+        self.assertEqual(len(scenarios), 5 * 2 * 2 * 2 + 2)
+        
+        report = run_benchmark([ClientDriver], scenarios, dataset, requests=3, warmup=1)
+        
+        self.assertEqual(report['meta']['dataset'], dataset)
+        results = report['results']['client']
+        self.assertEqual(len(results), len(scenarios))
+        for name, result in results.items():
+            self.assertEqual(result['status_codes'], {'200': 3}, name)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+            self.assertGreater(result['throughput_rps'], 0)
+        # authenticated requests query the database, anonymous pages are cached
+        queries = dict((name, result['queries_per_request']) for name, result in results.items())
+        self.assertEqual(queries.pop('list anonymous'), 0)
+        self.assertTrue(all(count > 0 for count in queries.values()), queries)
+    
+    def test_compressed_benchmark(self):
+        """
+        Ensure that bytes per request are the compressed sizes and the encoding
+        report measures every renderer and compression level.
+        """
+        dataset = build_dataset(users=5, movies=100, opinions=50)
+        scenarios = [AnonymousListScenario(Fixtures())]
+        
+        reports = [run_benchmark([ClientDriver], scenarios, dataset, requests=2, warmup=1, 
+                                 accept_encoding=accept_encoding)
+                   for accept_encoding in (None, 'gzip')]
+        
+        sizes = [report['results']['client']['list anonymous']['bytes_per_request'] for report in reports]
+        self.assertLess(sizes[1], sizes[0] / 2)
+        self.assertEqual(reports[1]['meta']['accept_encoding'], 'gzip')
+        
+        report = benchmark_encoding(ClientDriver('gzip').request('GET', reverse('movie-list')).json(), 
+                                    repeat=1)
+        self.assertIn('json', report['renderers'])
+        self.assertEqual(report['compression']['identity']['bytes'], sizes[0])
+        self.assertLess(report['compression']['gzip:9']['bytes'], report['compression']['gzip:1']['bytes'])
+    
+    def test_compare_reports(self):
+        """
+        Ensure that slower, query heavier or lower throughput scenarios are 
+        reported as regressions.
+        """
+        metrics = {'p50_ms': 10, 'p99_ms': 20, 'queries_per_request': 4, 'throughput_rps': 100}
+        baseline = {'results': {'client': {'list': metrics, 'opinion': metrics}}}
+        current = {'results': {'client': {
+            'list': dict(metrics, p99_ms=30, throughput_rps=95),
+            'opinion': dict(metrics, queries_per_request=5, throughput_rps=50),
+        }}}
+        
+        comparison = compare_reports(baseline, current)
+        
+        self.assertEqual(comparison['results']['client']['list']['p99_ms'], 
+                         {'baseline': 20, 'current': 30, 'change': 0.5})
+        self.assertEqual(comparison['regressions'], ['client list p99_ms', 
+                                                     'client opinion queries_per_request',
+                                                     'client opinion throughput_rps'])
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+import json
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+from unittest import skipIf
+
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from core.compression import get_accepted_encoding, brotli
+from core.renderers import FastJSONRenderer, get_json_backend
+from movies.cache import get_cache
+from movies.factory import get_sample_users, get_sample_movies
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    data = OrderedDict([('b', [1, None, True]), ('a', u'Caf\xe9 / \u2028 "x"'), ('c', {'d': 1.5})])
+    
+    def test_same_json_as_json_renderer(self):
+        """
+        Ensure that every backend renders the same JSON as JSONRenderer, in 
+        the same key order and with escaped line separators.
+        """
+        for backend in (None, 'ujson', 'orjson'):
+            with self.settings(JSON_RENDERER={'BACKEND': backend}):
+                content = FastJSONRenderer().render(self.data)
+            
+            self.assertEqual(json.loads(content.decode('utf-8'), object_pairs_hook=OrderedDict), self.data)
+            self.assertIn(b'\\u2028', content)
+            self.assertNotIn(b'\\/', content)
+    
+    @skipIf(get_json_backend('ujson') is None, 'ujson is not installed')
+    def test_fallback_to_json_renderer(self):
+        """
+        Ensure that data the backend can not encode and indented output are
+        rendered by JSONRenderer.
+        """
+        data = {'date': datetime(2018, 6, 27, 9, 33)}
+        with self.settings(JSON_RENDERER={'BACKEND': 'ujson'}):
+            self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+            self.assertEqual(FastJSONRenderer().render(self.data, 'application/json; indent=4'),
+                             JSONRenderer().render(self.data, 'application/json; indent=4'))
+
+
+class CompressionMiddlewareTests(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.users = get_sample_users()
+        get_sample_movies(self.users, number=50)
+        self.url = reverse('movie-list')
+    
+    def test_accepted_encoding(self):
+        """
+        Ensure that the encoding of the highest quality is chosen and ties are
+        resolved by server preference.
+        """
+        encodings = ['br', 'gzip']
+        self.assertEqual(get_accepted_encoding('gzip, deflate, br', encodings), 'br')
+        self.assertEqual(get_accepted_encoding('br;q=0.5, gzip', encodings), 'gzip')
+        self.assertEqual(get_accepted_encoding('gzip;q=0, *;q=0.1', encodings), 'br')
+        self.assertEqual(get_accepted_encoding('identity, *;q=0', encodings), None)
+        self.assertEqual(get_accepted_encoding('', encodings), None)
+        self.assertEqual(get_accepted_encoding('br;q=x, gzip;q=1', ['gzip']), 'gzip')
+    
+    def test_gzip_list(self):
+        """
+        Ensure that large responses are compressed for clients accepting gzip
+        with a weak etag that still matches.
+        """
+        plain = self.client.get(self.url)
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertEqual(zlib.decompress(response.content, 16 + zlib.MAX_WBITS), plain.content)
+        self.assertLess(len(response.content), len(plain.content) / 2)
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+        
+        self.assertEqual(response['ETag'], 'W/' + plain['ETag'])
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip', 
+                                   HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+    
+    @skipIf(brotli is None, 'brotli is not installed')
+    def test_brotli_list(self):
+        """
+        Ensure that brotli is preferred when accepted.
+        """
+        plain = self.client.get(self.url)
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+        
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content), plain.content)
+    
+    def test_small_and_disabled(self):
+        """
+        Ensure that responses below the size threshold and disabled encodings
+        are not compressed.
+        """
+        response = self.client.get(self.url, {'limit': 1}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        
+        with self.settings(COMPRESSION=dict(settings.COMPRESSION, ENCODINGS=())):
+            response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+    
+    def test_streaming_export(self):
+        """
+        Ensure that streamed exports are compressed chunk by chunk.
+        """
+        admin = get_user_model().objects.create(username='admin', is_staff=True)
+        self.client.force_authenticate(user=admin)
+        
+        response = self.client.get(reverse('movie-export'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        
+        content = zlib.decompress(b''.join(response.streaming_content), 16 + zlib.MAX_WBITS)
+        self.assertEqual(len(content.decode('utf-8').splitlines()), 50)
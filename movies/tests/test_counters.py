@@ -0,0 +1,200 @@
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils.six import StringIO
+
+from movies.cache import get_catalog_version
+from movies.counters import (
+    get_opinion_delta,
+    apply_counter_deltas,
+    get_counter_drift,
+    get_pending_counters,
+    recount_counters,
+    set_opinion,
+    set_opinions,
+    OPINION_OK
+)
+from movies.models import Movie, MovieOpinion, MovieCounterShard, OPINION_LIKE, OPINION_HATE
+from movies.factory import (
+    get_sample_users,
+    get_sample_movies,
+    set_sample_opinions,
+    set_sample_opinion
+)
+
+
+class OpinionDeltaTests(TestCase):
+    def test_opinion_delta(self):
+        """
+        Ensure that opinion changes are translated to likes|hates counter deltas.
+        """
+        self.assertEqual(get_opinion_delta(None, OPINION_LIKE), (1, 0))
+        self.assertEqual(get_opinion_delta(None, OPINION_HATE), (0, 1))
+        self.assertEqual(get_opinion_delta(OPINION_LIKE, None), (-1, 0))
+        self.assertEqual(get_opinion_delta(OPINION_HATE, None), (0, -1))
+        self.assertEqual(get_opinion_delta(OPINION_LIKE, OPINION_HATE), (-1, 1))
+        self.assertEqual(get_opinion_delta(OPINION_HATE, OPINION_LIKE), (1, -1))
+        self.assertEqual(get_opinion_delta(OPINION_LIKE, OPINION_LIKE), (0, 0))
+        self.assertEqual(get_opinion_delta(None, None), (0, 0))
+    
+    def test_apply_counter_deltas(self):
+        """
+        Ensure that counter deltas are applied to the existing counters.
+        """
+        users = get_sample_users()
+        movies = get_sample_movies(users)
+        set_sample_opinions(users, movies, OPINION_LIKE)
+        
+        changed = apply_counter_deltas({movies[0].pk: (-1, 1), 
+                                        movies[1].pk: (-1, 1), 
+                                        movies[2].pk: (0, 0)})
+        
+        self.assertEqual(sorted(changed), [movies[0].pk, movies[1].pk])
+        self.assertEqual(list(Movie.objects.order_by('pk').values_list('likes_counter', 'hates_counter')),
+                         [(0, 1), (1, 1), (3, 0), (4, 0)])
+
+
+class CounterDriftTests(TestCase):
+    def setUp(self):
+        self.users = get_sample_users()
+        self.movies = get_sample_movies(self.users)
+        set_sample_opinion(self.users[1], self.movies[0], OPINION_LIKE)
+        set_sample_opinion(self.users[2], self.movies[0], OPINION_HATE)
+        set_sample_opinion(self.users[3], self.movies[1], OPINION_HATE)
+        
+        Movie.objects.filter(pk=self.movies[0].pk).update(likes_counter=5)
+        Movie.objects.filter(pk=self.movies[1].pk).update(hates_counter=0)
+    
+    def test_counter_drift(self):
+        """
+        Ensure that movies with counters different from their opinions are found.
+        """
+        drift = get_counter_drift().order_by('pk')
+        
+        self.assertEqual(list(drift.values_list('pk', 'likes_count', 'hates_count')),
+                         [(self.movies[0].pk, 1, 1), (self.movies[1].pk, 0, 1)])
+    
+    def test_recount_counters(self):
+        """
+        Ensure that counters are recounted from opinions.
+        """
+        recount_counters()
+        
+        self.assertFalse(get_counter_drift().exists())
+        self.assertEqual(list(Movie.objects.order_by('pk').values_list('likes_counter', 'hates_counter')),
+                         [(1, 1), (0, 1), (0, 0), (0, 0)])
+    
+    def test_audit_counters_command(self):
+        """
+        Ensure that audit_counters command reports and fixes counter drift.
+        """
+        out = StringIO()
+        call_command('audit_counters', stdout=out)
+        self.assertIn('2 movies with counter drift, 0 fixed.', out.getvalue())
+        self.assertEqual(get_counter_drift().count(), 2)
+        
+        out = StringIO()
+        call_command('audit_counters', '--fix', '--batch-size=1', stdout=out)
+        self.assertIn('2 movies with counter drift, 2 fixed.', out.getvalue())
+        self.assertFalse(get_counter_drift().exists())
+
+
+@override_settings(MOVIES_COUNTER_SHARDS=4)
+class CounterShardsTests(TestCase):
+    def setUp(self):
+        self.users = get_sample_users(number=10)
+        self.movie = get_sample_movies(self.users)[0]
+        for user in self.users[1:]:
+            set_sample_opinion(user, self.movie, OPINION_LIKE)
+        set_sample_opinion(self.users[1], self.movie, OPINION_HATE)
+    
+    def test_votes_are_sharded(self):
+        """
+        Ensure that votes are added to the shards of the movie and the movie 
+        instance has the pending counters.
+        """
+        self.assertEqual((self.movie.likes_counter, self.movie.hates_counter), (8, 1))
+        
+        movie = Movie.objects.get(pk=self.movie.pk)
+        self.assertEqual((movie.likes_counter, movie.hates_counter), (0, 0))
+        self.assertEqual(get_pending_counters([movie.pk]), {movie.pk: (8, 1)})
+        self.assertLessEqual(MovieCounterShard.objects.count(), 4)
+        self.assertFalse(get_counter_drift().exists())
+    
+    def test_sharded_votes_keep_catalog_version(self):
+        """
+        Ensure that votes added to shards do not invalidate the cached lists, 
+        as the movie rows change only when the shards are rolled up.
+        """
+        version = get_catalog_version()
+        set_sample_opinion(self.users[2], self.movie, OPINION_HATE)
+        self.assertEqual(get_catalog_version(), version)
+        
+        call_command('rollup_counter_shards', stdout=StringIO())
+        self.assertGreater(get_catalog_version(), version)
+    
+    def test_rollup_counter_shards(self):
+        """
+        Ensure that shards are rolled up to the movie counters.
+        """
+        out = StringIO()
+        call_command('rollup_counter_shards', '--batch-size=1', stdout=out)
+        self.assertIn('1 movies updated.', out.getvalue())
+        
+        movie = Movie.objects.get(pk=self.movie.pk)
+        self.assertEqual((movie.likes_counter, movie.hates_counter), (8, 1))
+        self.assertEqual(get_pending_counters([movie.pk]), {movie.pk: (0, 0)})
+        self.assertFalse(get_counter_drift().exists())
+    
+    def test_recount_counters_resets_shards(self):
+        """
+        Ensure that recounted movies do not count their shards twice.
+        """
+        recount_counters()
+        
+        movie = Movie.objects.get(pk=self.movie.pk)
+        self.assertEqual((movie.likes_counter, movie.hates_counter), (8, 1))
+        self.assertFalse(get_counter_drift().exists())
+
+
+class WideCountersTests(TestCase):
+    def test_counters_beyond_small_integer(self):
+        """
+        Ensure that counters are not limited to 16 bits.
+        """
+        users = get_sample_users()
+        movie = get_sample_movies(users)[0]
+        Movie.objects.filter(pk=movie.pk).update(likes_counter=2 ** 40)
+        
+        set_sample_opinion(users[1], movie, OPINION_LIKE)
+        
+        self.assertEqual(Movie.objects.get(pk=movie.pk).likes_counter, 2 ** 40 + 1)
+
+
+class ConcurrentOpinionsTests(TestCase):
+    def test_opinions_created_concurrently(self):
+        """
+        Ensure that opinions created by a concurrent vote between the read and
+        the insert of bulk opinions are updated instead.
+        """
+        users = get_sample_users()
+        movies = get_sample_movies(users)[:3]
+        
+        manager = MovieOpinion.objects
+        bulk_create = manager.bulk_create
+        def racing_bulk_create(objs, *args, **kwargs):
+            # the vote of another request lands first
+            manager.bulk_create = bulk_create
+            set_opinion(users[1], movies[1], OPINION_LIKE)
+            return bulk_create(objs, *args, **kwargs)
+        manager.bulk_create = racing_bulk_create
+        self.addCleanup(setattr, manager, 'bulk_create', bulk_create)
+        
+        results = set_opinions(users[1], [(movie.pk, OPINION_HATE) for movie in movies])
+        
+        self.assertEqual([result['status'] for result in results], [OPINION_OK] * 3)
+        self.assertEqual(MovieOpinion.objects.filter(user=users[1], opinion=OPINION_HATE).count(), 3)
+        counters = dict(Movie.objects.filter(pk__in=[movie.pk for movie in movies])
+                        .values_list('pk', 'likes_counter'))
+        self.assertEqual(counters[movies[1].pk], 0)
+        self.assertEqual([result['hates_counter'] for result in results], [1, 1, 1])
+        self.assertFalse(get_counter_drift().exists())
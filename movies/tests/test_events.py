@@ -0,0 +1,170 @@
+import json
+
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from movies.events import RESET, Subscription, events
+from movies.models import Movie, OPINION_LIKE, OPINION_HATE
+from movies.factory import get_sample_users, get_sample_movies, set_sample_opinion
+
+
+EVENTS_SETTINGS = {
+    'ENABLED': True,
+    'COALESCE_WINDOW': 0,
+    'HEARTBEAT': 0.01,
+    'MAX_PENDING': 2,
+    'RETRY': 1000,
+}
+
+
+class SubscriptionTests(SimpleTestCase):
+    def test_coalesce(self):
+        """
+        Ensure that only the last counters of a movie are sent.
+        """
+        subscription = Subscription()
+        subscription.put({1: (1, 0), 2: (0, 1)})
+        subscription.put({1: (2, 0)})
+        
+        self.assertEqual(dict(subscription.get(0)), {1: (2, 0), 2: (0, 1)})
+        self.assertIsNone(subscription.get(0))
+    
+    def test_movie_ids(self):
+        """
+        Ensure that only changes of the movies of interest are sent.
+        """
+        subscription = Subscription(movie_ids={2})
+        subscription.put({1: (1, 0)})
+        self.assertIsNone(subscription.get(0))
+        
+        subscription.put({1: (2, 0), 2: (0, 1)})
+        self.assertEqual(dict(subscription.get(0)), {2: (0, 1)})
+    
+    def test_overflow(self):
+        """
+        Ensure that a reset is sent instead of too many pending changes.
+        """
+        subscription = Subscription(max_pending=2)
+        subscription.put({1: (1, 0), 2: (1, 0), 3: (1, 0)})
+        
+        self.assertEqual(subscription.get(0), RESET)
+        self.assertIsNone(subscription.get(0))
+
+
+@override_settings(MOVIES_EVENTS=EVENTS_SETTINGS)
+class MovieEventsTests(APITestCase):
+    def setUp(self):
+        self.url = reverse('movie-events')
+    
+    def get_stream(self, params=None):
+        response = self.client.get(self.url, params, HTTP_ACCEPT='text/event-stream')
+        self.addCleanup(response.close)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        self.assertNotIn('Content-Encoding', response)
+        
+        stream = iter(response.streaming_content)
+        self.assertEqual(next(stream), b'retry: 1000\n\n')
+        return stream
+    
+    def test_counters_event(self):
+        """
+        Ensure that published counters of the movies of interest are streamed
+        as compact JSON.
+        """
+        stream = self.get_stream({'ids': '1,2'})
+        events.publish({1: (3, 1), 3: (1, 0)})
+        
+        self.assertEqual(next(stream),
+                         b'event: counters\ndata: [{"id":1,"likes_counter":3,"hates_counter":1}]\n\n')
+    
+    def test_heartbeat_and_reset(self):
+        """
+        Ensure that idle streams send comments and overflowing streams a reset.
+        """
+        stream = self.get_stream()
+        self.assertEqual(next(stream), b': heartbeat\n\n')
+        
+        events.publish({1: (1, 0), 2: (1, 0), 3: (1, 0)})
+        self.assertEqual(next(stream), b'event: reset\ndata: {}\n\n')
+    
+    def test_unsubscribe_on_close(self):
+        """
+        Ensure that closed streams stop receiving changes.
+        """
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        next(iter(response.streaming_content))
+        self.assertEqual(len(events.subscriptions), 1)
+        
+        response.close()
+        self.assertEqual(len(events.subscriptions), 0)
+    
+    def test_unsubscribe_on_close_before_start(self):
+        """
+        Ensure that streams closed before they start never subscribe.
+        """
+        response = self.client.get(self.url, HTTP_ACCEPT='text/event-stream')
+        response.close()
+        
+        self.assertEqual(len(events.subscriptions), 0)
+    
+    def test_disabled(self):
+        """
+        Ensure that the events are not found unless they are enabled.
+        """
+        with self.settings(MOVIES_EVENTS=dict(EVENTS_SETTINGS, ENABLED=False)):
+            response = self.client.get(self.url, HTTP_ACCEPT='text/event-stream')
+        
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(len(events.subscriptions), 0)
+    
+    def test_invalid_ids(self):
+        """
+        Ensure that invalid ids are rejected.
+        """
+        response = self.client.get(self.url, {'ids': '1,a'}, HTTP_ACCEPT='text/event-stream')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('error', json.loads(response.content.decode('utf-8')))
+        self.assertEqual(len(events.subscriptions), 0)
+
+
+class CounterEventsHookTests(TransactionTestCase):
+    def setUp(self):
+        self.users = get_sample_users()
+        self.movies = get_sample_movies(self.users)
+        self.subscription = events.subscribe()
+        self.addCleanup(events.unsubscribe, self.subscription)
+    
+    def test_set_opinion(self):
+        """
+        Ensure that opinions publish the counters of their movie after commit.
+        """
+        set_sample_opinion(self.users[0], self.movies[0], OPINION_LIKE)
+        set_sample_opinion(self.users[1], self.movies[0], OPINION_HATE)
+        set_sample_opinion(self.users[1], self.movies[0], OPINION_HATE)
+        
+        self.assertEqual(dict(self.subscription.get(0)), {self.movies[0].pk: (1, 1)})
+    
+    def test_bulk_opinions(self):
+        """
+        Ensure that bulk opinions publish the counters of changed movies only.
+        """
+        set_sample_opinion(self.users[2], self.movies[1], OPINION_LIKE)
+        self.subscription.get(0)
+        
+        client = APIClient()
+        client.force_authenticate(user=self.users[2])
+        response = client.post(reverse('movie-bulk-opinions'), {'opinions': [
+            {'movie': self.movies[0].pk, 'opinion': OPINION_HATE},
+            {'movie': self.movies[1].pk, 'opinion': OPINION_LIKE},
+        ]}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(dict(self.subscription.get(0)), {self.movies[0].pk: (0, 1)})
+        self.assertEqual(Movie.objects.get(pk=self.movies[0].pk).hates_counter, 1)
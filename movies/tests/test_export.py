@@ -0,0 +1,106 @@
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import six
+
+from movies.export import EXPORT_FIELDS, iter_movie_rows
+from movies.models import Movie, OPINION_LIKE
+from movies.factory import get_sample_users, get_sample_movies, set_sample_opinion
+
+
+class MovieExportTests(APITestCase):
+    def setUp(self):
+        self.users = get_sample_users()
+        self.movies = get_sample_movies(self.users, number=5)
+        for user in self.users[1:]:
+            set_sample_opinion(user, self.movies[0], OPINION_LIKE)
+        Movie.objects.filter(pk=self.movies[1].pk).update(title=u'Caf\xe9, "quoted"')
+        Movie.objects.filter(pk=self.movies[-1].pk).update(user=self.users[1])
+        
+        self.url = reverse('movie-export')
+        self.admin = get_user_model().objects.create(username='admin', is_staff=True)
+        self.client.force_authenticate(user=self.admin)
+    
+    def get_lines(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode('utf-8').splitlines()
+    
+    def test_rows_in_chunks(self):
+        """
+        Ensure that rows are read in primary key chunks with one query per 
+        chunk and one more for the last partial chunk.
+        """
+        with self.assertNumQueries(3):
+            rows = list(iter_movie_rows(chunk_size=len(self.movies) // 2))
+        
+        self.assertEqual([row[0] for row in rows], sorted(m.pk for m in self.movies))
+        movie = Movie.objects.get(pk=self.movies[0].pk)
+        self.assertEqual(rows[0][3:5], (movie.user_id, movie.user.username))
+        self.assertEqual(rows[0][7:], (len(self.users) - 1, 0))
+    
+    def test_export_ndjson(self):
+        """
+        Ensure that movies are streamed as one JSON object per line.
+        """
+        lines = self.get_lines(self.client.get(self.url))
+        self.assertEqual(len(lines), len(self.movies))
+        
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual(sorted(rows[0].keys()), sorted(name for name, lookup in EXPORT_FIELDS))
+        self.assertEqual(rows[0]['likes_counter'], len(self.users) - 1)
+        self.assertEqual(rows[1]['title'], u'Caf\xe9, "quoted"')
+    
+    def test_export_csv(self):
+        """
+        Ensure that movies are streamed as csv lines after a header line and
+        that export honors the user search.
+        """
+        response = self.client.get(self.url, {'output': 'csv', 'search': self.users[0].username})
+        self.assertIn('movies.csv', response['Content-Disposition'])
+        lines = self.get_lines(response)
+        
+        if six.PY2:
+            lines = [line.encode('utf-8') for line in lines]
+        rows = list(csv.reader(lines))
+        if six.PY2:
+            rows = [[value.decode('utf-8') for value in row] for row in rows]
+        
+        self.assertEqual(rows[0], [name for name, lookup in EXPORT_FIELDS])
+        owned = Movie.objects.filter(user=self.users[0]).order_by('pk')
+        self.assertEqual([int(row[0]) for row in rows[1:]], [m.pk for m in owned])
+    
+    def test_export_permissions_and_output(self):
+        """
+        Ensure that only admin users can export and unknown outputs are rejected.
+        """
+        response = self.client.get(self.url, {'output': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        self.client.force_authenticate(user=self.users[0])
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+    
+    def test_export_command(self):
+        """
+        Ensure that the export command writes all movies to a file.
+        """
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'movies.ndjson')
+            call_command('export_movies', output=path, chunk_size=2)
+            with io.open(path, encoding='utf-8') as export_file:
+                rows = [json.loads(line) for line in export_file]
+        finally:
+            shutil.rmtree(directory)
+        
+        self.assertEqual([row['id'] for row in rows], sorted(m.pk for m in self.movies))
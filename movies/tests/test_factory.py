@@ -0,0 +1,60 @@
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import F
+from django.test import TestCase
+from django.utils.six import StringIO
+
+from movies.counters import get_counter_drift
+from movies.models import Movie, MovieOpinion
+from movies.factory import seed_movies
+
+
+class SeedMoviesTests(TestCase):
+    def test_seed_movies(self):
+        """
+        Ensure that seeded opinions are unique, not by owners and counted.
+        """
+        created = seed_movies(users=10, movies=30, opinions=200, seed=3, batch_size=16)
+        
+        self.assertEqual(created, {'users': 10, 'movies': 30, 'opinions': 200})
+        self.assertEqual(MovieOpinion.objects.count(), 200)
+        self.assertFalse(MovieOpinion.objects.filter(user=F('movie__user')).exists())
+        self.assertFalse(get_counter_drift().exists())
+        self.assertEqual(sum(Movie.objects.values_list('likes_counter', flat=True)) + 
+                         sum(Movie.objects.values_list('hates_counter', flat=True)), 200)
+    
+    def test_seed_movies_is_deterministic(self):
+        """
+        Ensure that the same seed creates the same movies and opinions.
+        """
+        def get_data():
+            movies = Movie.objects.order_by('pk').values_list('title', 'description', 'user__username', 
+                                                             'publication_date', 'air_date', 
+                                                             'likes_counter', 'hates_counter')
+            opinions = MovieOpinion.objects.order_by('pk').values_list('user__username', 'movie__title', 'opinion')
+            return list(movies), list(opinions)
+        
+        seed_movies(users=5, movies=10, opinions=20, seed=7)
+        data = get_data()
+        Movie.objects.all().delete()
+        get_user_model().objects.all().delete()
+        seed_movies(users=5, movies=10, opinions=20, seed=7)
+        
+        self.assertEqual(get_data(), data)
+    
+    def test_seed_movies_command(self):
+        """
+        Ensure that the command appends data to users of previous runs.
+        """
+        out = StringIO()
+        call_command('seed_movies', users=3, movies=5, opinions=6, stdout=out)
+        call_command('seed_movies', users=2, movies=5, opinions=20, stdout=out)
+        
+        self.assertEqual(out.getvalue().splitlines(), ['3 users, 5 movies and 6 opinions created.', 
+                                                       '2 users, 5 movies and 20 opinions created.'])
+        self.assertEqual(get_user_model().objects.filter(username__startswith='user').count(), 5)
+        self.assertFalse(get_counter_drift().exists())
+        
+        with self.assertRaises(CommandError):
+            call_command('seed_movies', users=0, movies=5, username_format='nobody{}', stdout=out)
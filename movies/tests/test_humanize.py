@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+from django.contrib.humanize.templatetags.humanize import naturaltime
+from django.test import SimpleTestCase
+from django.utils import translation
+from django.utils.timezone import utc
+
+from core.humanize import NaturalTime
+
+
+class NaturalTimeTests(SimpleTestCase):
+    deltas = [timedelta(seconds=seconds) for seconds in (0, 1, 2, 59, 60, 61, 119, 3599, 3600, 7300, 86399)] + [
+        timedelta(days=days, seconds=seconds)
+        for days in (1, 2, 6, 7, 13, 29, 30, 31, 59, 364, 365, 366, 400, 730, 1500)
+        for seconds in (0, 3599, 3600, 86399)
+    ]
+    
+    def assert_naturaltime(self, value, natural_time):
+        self.assertEqual(natural_time(value), naturaltime(value), 
+                         'Different strings for {} and now {}'.format(value, natural_time.now))
+    
+    def test_same_output_as_naturaltime(self):
+        """
+        Ensure that the formatter renders the strings of `naturaltime` for past
+        and future timestamps in every language.
+        """
+        for language in ('en', 'el', 'fr', 'ru'):
+            with translation.override(language):
+                natural_time = NaturalTime()
+                # the reference time is taken before naturaltime, future values
+                # are shifted by half a second so that both truncate the same
+                now = natural_time.now = datetime.now(utc)
+                for delta in self.deltas:
+                    self.assert_naturaltime(now - delta, natural_time)
+                    self.assert_naturaltime(now + delta + timedelta(milliseconds=500), natural_time)
+    
+    def test_buckets_around_leap_days(self):
+        """
+        Ensure that timestamps of the same bucket across leap years render the
+        strings of `timesince`.
+        """
+        from django.utils.timesince import timesince
+        
+        natural_time = NaturalTime(now=datetime(2020, 3, 1, 12, tzinfo=utc))
+        for value in (datetime(2019, 3, 1, 12, tzinfo=utc), datetime(2019, 2, 28, 12, tzinfo=utc),
+                      datetime(2020, 2, 28, 12, tzinfo=utc), datetime(2016, 2, 29, 12, tzinfo=utc),
+                      datetime(2020, 2, 29, 11, tzinfo=utc)):
+            self.assertEqual(natural_time(value), u'{} ago'.format(timesince(value, natural_time.now)))
+    
+    def test_single_now(self):
+        """
+        Ensure that all values are rendered against the time of the first one.
+        """
+        natural_time = NaturalTime()
+        value = datetime.now(utc) - timedelta(minutes=5)
+        natural_time(value)
+        now = natural_time.now
+        
+        self.assertEqual(natural_time(value - timedelta(minutes=1)), u'6\xa0minutes ago')
+        self.assertIs(natural_time.now, now)
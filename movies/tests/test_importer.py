@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils.six import StringIO
+
+from movies.counters import get_counter_drift
+from movies.importer import import_catalog, UsernameCache
+from movies.models import Movie, MovieOpinion, CatalogImport, OPINION_LIKE, OPINION_HATE
+from movies.factory import get_sample_users, get_sample_movies
+
+
+class ImportCatalogTests(TestCase):
+    def setUp(self):
+        self.users = get_sample_users()
+        self.usernames = [user.username for user in self.users]
+        self.directory = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    
+    def write(self, lines, name='catalog.ndjson'):
+        path = os.path.join(self.directory, name)
+        with io.open(path, 'w', encoding='utf-8') as source:
+            source.write(u'\n'.join(lines) + u'\n')
+        return path
+    
+    def get_record(self, index, owner=0, voters=(), opinion=OPINION_LIKE):
+        return json.dumps({
+            'title': u'Movie {} ταινία'.format(index),
+            'description': 'Description {}'.format(index),
+            'air_date': '2018-06-27',
+            'publication_date': '2018-06-27T09:33:48Z',
+            'username': self.usernames[owner],
+            'opinions': [{'username': self.usernames[voter], 'opinion': opinion} for voter in voters],
+        })
+    
+    def test_import_movies_and_opinions(self):
+        """
+        Ensure that valid movies are imported with their opinions and counters
+        and invalid lines are reported with their line number.
+        """
+        path = self.write([
+            self.get_record(0, voters=(1, 2)),
+            '{"title": ',
+            json.dumps({'title': 'x' * 256, 'username': self.usernames[0]}),
+            json.dumps({'title': 'No owner', 'username': 'nobody'}),
+            self.get_record(1, voters=(0, )),
+            '',
+            self.get_record(2, owner=1, voters=(0, 3), opinion=OPINION_HATE),
+        ])
+        checkpoint, errors = import_catalog(path, batch_size=3)
+        
+        self.assertEqual((checkpoint.line, checkpoint.movies, checkpoint.opinions, checkpoint.errors), 
+                         (7, 2, 4, 4))
+        self.assertEqual([number for number, error in errors], [2, 3, 5, 4])
+        self.assertIn('title', errors[1][1])
+        self.assertIn('nobody', errors[3][1])
+        
+        movies = list(Movie.objects.order_by('pk'))
+        self.assertEqual([m.title for m in movies], [u'Movie 0 ταινία', u'Movie 2 ταινία'])
+        self.assertEqual([(m.likes_counter, m.hates_counter) for m in movies], [(2, 0), (0, 2)])
+        self.assertEqual(movies[0].publication_date.isoformat(), '2018-06-27T09:33:48+00:00')
+        self.assertEqual(MovieOpinion.objects.filter(movie=movies[1], user=self.users[3]).get().opinion, 
+                         OPINION_HATE)
+        self.assertFalse(get_counter_drift().exists())
+    
+    def test_import_resumes_after_checkpoint(self):
+        """
+        Ensure that an import continues after the checkpoint line, rebuilds the
+        counters of all movies of the import and restarts on request.
+        """
+        path = self.write([self.get_record(index, voters=(1, )) for index in range(4)])
+        CatalogImport.objects.create(source=os.path.abspath(path), line=2)
+        
+        checkpoint, errors = import_catalog(path)
+        self.assertEqual((checkpoint.line, checkpoint.movies), (4, 2))
+        self.assertEqual(sorted(Movie.objects.values_list('title', flat=True)), 
+                         [u'Movie 2 ταινία', u'Movie 3 ταινία'])
+        
+        checkpoint, errors = import_catalog(path)
+        self.assertEqual(Movie.objects.count(), 2)
+        
+        checkpoint, errors = import_catalog(path, restart=True)
+        self.assertEqual((checkpoint.line, checkpoint.movies, checkpoint.opinions), (4, 4, 4))
+        self.assertEqual(Movie.objects.count(), 6)
+        self.assertFalse(get_counter_drift().exists())
+    
+    def test_import_json_list_and_export(self):
+        """
+        Ensure that JSON lists and the NDJSON export of movies are imported.
+        """
+        get_sample_movies(self.users, number=3)
+        export = os.path.join(self.directory, 'export.ndjson')
+        call_command('export_movies', output=export)
+        
+        path = self.write(['[', self.get_record(0) + ',', self.get_record(1), ']'], name='catalog.json')
+        out = StringIO()
+        call_command('import_catalog', path, stdout=out)
+        self.assertEqual(out.getvalue().strip(), '2 movies and 0 opinions imported, 0 invalid lines.')
+        
+        checkpoint, errors = import_catalog(export)
+        self.assertEqual((checkpoint.movies, errors), (3, []))
+        self.assertEqual(Movie.objects.filter(title='0').count(), 2)
+
+
+class UsernameCacheTests(TestCase):
+    def test_overflow_keeps_batch_usernames(self):
+        """
+        Ensure that cached usernames of a batch overflowing the cache are kept.
+        """
+        users = get_sample_users()
+        cache = UsernameCache(max_size=3)
+        cache.load([users[0].username, users[1].username])
+        
+        cache.load([users[0].username, users[2].username, users[3].username])
+        
+        self.assertEqual([cache.get(user.username) for user in users[:4]],
+                         [users[0].pk, None, users[2].pk, users[3].pk])
+        self.assertEqual(len(cache.ids), 3)
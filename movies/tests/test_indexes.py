@@ -0,0 +1,29 @@
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils.six import StringIO
+
+from movies.models import OPINION_LIKE
+from movies.factory import (
+    get_sample_users,
+    get_sample_movies,
+    set_sample_opinions
+)
+
+
+class MovieIndexesTests(TestCase):
+    def test_list_queries_are_ordered_by_indexes(self):
+        """
+        Ensure that the planner uses the ordering indexes for all list queries.
+        """
+        users = get_sample_users()
+        movies = get_sample_movies(users)
+        set_sample_opinions(users, movies, OPINION_LIKE)
+        
+        out = StringIO()
+        call_command('check_movie_indexes', stdout=out)
+        
+        lines = out.getvalue().splitlines()
+        # limit|offset, cursor first and next page, with and without search
+        self.assertEqual(len(lines), 5 * 2 * 3 * 2)
+        self.assertTrue(all(line.startswith('OK') for line in lines), out.getvalue())
+        self.assertIn('ordering=-likes_counter&search=mitsos0 (movie_user_likes_idx)', out.getvalue())
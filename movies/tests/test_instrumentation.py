@@ -0,0 +1,89 @@
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from core.instrumentation import RollingHistogram, histogram
+from movies.cache import get_cache
+from movies.models import OPINION_LIKE
+from movies.factory import (
+    get_sample_users,
+    get_sample_movies,
+    set_sample_opinions
+)
+
+
+def get_sample_stats(total_time, sql_count=1):
+    return {'sql_count': sql_count, 'sql_time': 0.001, 
+            'serializer_time': 0.002, 'total_time': total_time}
+
+
+class RollingHistogramTests(TestCase):
+    def test_histogram_window(self):
+        """
+        Ensure that requests are summarized per key and dropped after the 
+        rolling window.
+        """
+        rolling = RollingHistogram(window=60, slots=2)
+        rolling.add('movie.list', get_sample_stats(0.004), timestamp=0)
+        rolling.add('movie.list', get_sample_stats(0.040, 3), timestamp=60)
+        rolling.add('movie.opinion', get_sample_stats(9), timestamp=60)
+        
+        snapshot = rolling.snapshot(timestamp=61)
+        self.assertEqual(snapshot['window'], 120)
+        entry = snapshot['endpoints']['movie.list']
+        self.assertEqual(entry['count'], 2)
+        self.assertEqual(entry['sql_count'], 2)
+        self.assertEqual(entry['total_ms'], 22)
+        self.assertEqual((entry['p50_ms'], entry['p99_ms']), (5, 50))
+        self.assertEqual(snapshot['endpoints']['movie.opinion']['p99_ms'], None)
+        
+        entry = rolling.snapshot(timestamp=120)['endpoints']['movie.list']
+        self.assertEqual(entry['count'], 1)
+        self.assertEqual(rolling.snapshot(timestamp=180)['endpoints'], {})
+
+
+class InstrumentationMiddlewareTests(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        histogram.clear()
+        self.users = get_sample_users()
+        movies = get_sample_movies(self.users)
+        set_sample_opinions(self.users, movies, OPINION_LIKE)
+    
+    def test_server_timing_header(self):
+        """
+        Ensure that responses have the sql, serializer and total timings.
+        """
+        response = self.client.get(reverse('movie-list'), format='json')
+        
+        timings = [timing.strip().split(';')[0] for timing in response['Server-Timing'].split(',')]
+        self.assertEqual(timings, ['sql', 'serializer', 'total'])
+        self.assertIn('desc="3 queries"', response['Server-Timing'])
+    
+    def test_metrics_per_action(self):
+        """
+        Ensure that requests are recorded per viewset endpoint and action and 
+        exposed to admin users only.
+        """
+        self.client.get(reverse('movie-list'), format='json')
+        self.client.force_authenticate(user=self.users[-1])
+        self.client.post(reverse('movie-opinion', kwargs={'pk': self.users[0].movie_set.first().pk}), 
+                         {'opinion': None}, format='json')
+        
+        response = self.client.get(reverse('metrics'), format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        
+        admin = get_user_model().objects.create(username='admin', is_staff=True)
+        self.client.force_authenticate(user=admin)
+        response = self.client.get(reverse('metrics'), format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        endpoints = response.data['endpoints']
+        self.assertEqual(endpoints['movie.list']['count'], 1)
+        self.assertEqual(endpoints['movie.list']['sql_count'], 3)
+        self.assertGreater(endpoints['movie.list']['serializer_ms'], 0)
+        self.assertEqual(endpoints['movie.opinion']['count'], 1)
+        self.assertEqual(sum(b['count'] for b in endpoints['movie.opinion']['buckets']), 1)
@@ -0,0 +1,223 @@
+from datetime import timedelta
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils.timezone import now
+from django.utils.six import StringIO
+
+from movies.models import Movie, MovieOpinion, MovieOpinionOutbox, OPINION_LIKE, OPINION_HATE
+from movies import outbox
+from movies.outbox import enqueue_opinion, apply_outbox, claim_outbox, apply_claimed
+from movies.factory import get_sample_users, get_sample_movies, set_sample_opinion
+
+
+OUTBOX_SETTINGS = {
+    'ENABLED': True,
+    'WORKERS': 2,
+    'BATCH_SIZE': 100,
+    'POLL_INTERVAL': 1.0,
+    'CLAIM_TIMEOUT': 60,
+    'MAX_ATTEMPTS': 2,
+}
+
+
+@override_settings(MOVIES_OPINION_OUTBOX=OUTBOX_SETTINGS)
+class OpinionOutboxTests(APITestCase):
+    def setUp(self):
+        self.users = get_sample_users()
+        self.movies = get_sample_movies(self.users)
+    
+    def post_opinion(self, user, movie, opinion):
+        self.client.force_authenticate(user=user)
+        return self.client.post(reverse('movie-opinion', kwargs={'pk': movie.pk}),
+                                {'opinion': opinion}, format='json')
+    
+    def test_queued_opinion(self):
+        """
+        Ensure that opinions are accepted with projected counters and applied
+        by the outbox.
+        """
+        set_sample_opinion(self.users[2], self.movies[0], OPINION_LIKE)
+        
+        response = self.post_opinion(self.users[1], self.movies[0], OPINION_LIKE)
+        
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual((response.data['likes_counter'], response.data['hates_counter']), (2, 0))
+        self.assertTrue(response.data['is_liked'])
+        self.assertEqual(Movie.objects.get(pk=self.movies[0].pk).likes_counter, 1)
+        self.assertEqual(MovieOpinionOutbox.objects.count(), 1)
+        
+        self.assertEqual(apply_outbox(), 1)
+        
+        movie = Movie.objects.get(pk=self.movies[0].pk)
+        self.assertEqual((movie.likes_counter, movie.hates_counter), (2, 0))
+        self.assertEqual(MovieOpinion.objects.get(user=self.users[1], movie=movie).opinion, OPINION_LIKE)
+        self.assertFalse(MovieOpinionOutbox.objects.exists())
+    
+    def test_coalesce(self):
+        """
+        Ensure that a queued opinion is replaced by the next opinion of the
+        same user and movie and projected on the applied opinion.
+        """
+        set_sample_opinion(self.users[1], self.movies[0], OPINION_LIKE)
+        other = enqueue_opinion(self.users[1], self.movies[1], OPINION_HATE)
+        
+        response = self.post_opinion(self.users[1], self.movies[0], OPINION_HATE)
+        self.assertEqual((response.data['likes_counter'], response.data['hates_counter']), (0, 1))
+        
+        response = self.post_opinion(self.users[1], self.movies[0], OPINION_LIKE)
+        self.assertEqual((response.data['likes_counter'], response.data['hates_counter']), (1, 0))
+        
+        entries = list(MovieOpinionOutbox.objects.order_by('pk').values_list('pk', 'movie_id', 'opinion'))
+        self.assertEqual([entry[1:] for entry in entries],
+                         [(self.movies[1].pk, OPINION_HATE), (self.movies[0].pk, OPINION_LIKE)])
+        self.assertEqual(entries[0][0], other.pk)
+        
+        self.assertEqual(apply_outbox(), 2)
+        movies = Movie.objects.in_bulk([self.movies[0].pk, self.movies[1].pk])
+        self.assertEqual((movies[self.movies[0].pk].likes_counter, movies[self.movies[0].pk].hates_counter),
+                         (1, 0))
+        self.assertEqual(movies[self.movies[1].pk].hates_counter, 1)
+    
+    def test_concurrent_enqueue(self):
+        """
+        Ensure that an opinion queued by a concurrent request for the same 
+        user and movie is replaced instead of failing.
+        """
+        manager = MovieOpinionOutbox.objects
+        create = manager.create
+        def racing_create(**kwargs):
+            # the opinion of another request lands first
+            manager.create = create
+            create(user=self.users[1], movie=self.movies[0], opinion=OPINION_HATE)
+            return create(**kwargs)
+        manager.create = racing_create
+        self.addCleanup(setattr, manager, 'create', create)
+        
+        entry = enqueue_opinion(self.users[1], self.movies[0], OPINION_LIKE)
+        
+        self.assertEqual(list(MovieOpinionOutbox.objects.values_list('pk', 'opinion')), 
+                         [(entry.pk, OPINION_LIKE)])
+        self.assertEqual(entry.movie.likes_counter, 1)
+    
+    def test_worker_partitions(self):
+        """
+        Ensure that every worker applies the opinions of its own users in
+        batches.
+        """
+        users = self.users[1:]
+        for movie in self.movies[:2]:
+            for user in users:
+                enqueue_opinion(user, movie, OPINION_LIKE)
+        workers = dict((worker, set(user.pk for user in users if user.pk % 2 == worker))
+                       for worker in range(2))
+        
+        self.assertEqual(apply_outbox(worker=0, workers=2, batch_size=1), 1)
+        self.assertEqual(apply_outbox(worker=0, workers=2), len(workers[0]) * 2 - 1)
+        self.assertEqual(apply_outbox(worker=0, workers=2), 0)
+        
+        applied = set(MovieOpinion.objects.values_list('user_id', flat=True))
+        self.assertEqual(applied, workers[0])
+        self.assertEqual(set(MovieOpinionOutbox.objects.values_list('user_id', flat=True)), workers[1])
+        
+        self.assertEqual(apply_outbox(worker=1, workers=2), len(workers[1]) * 2)
+        self.assertFalse(MovieOpinionOutbox.objects.exists())
+        self.assertEqual(Movie.objects.get(pk=self.movies[1].pk).likes_counter, len(users))
+    
+    def test_claims(self):
+        """
+        Ensure that opinions claimed by a worker are not applied by others
+        until the claim expires.
+        """
+        enqueue_opinion(self.users[1], self.movies[0], OPINION_LIKE)
+        claim, claimed = claim_outbox()
+        self.assertEqual(claimed, 1)
+        
+        self.assertEqual(apply_outbox(), 0)
+        self.assertFalse(MovieOpinion.objects.exists())
+        
+        MovieOpinionOutbox.objects.update(claimed_at=now() - timedelta(seconds=61))
+        self.assertEqual(apply_outbox(), 1)
+        self.assertEqual(apply_claimed(claim), 0)
+        self.assertEqual(Movie.objects.get(pk=self.movies[0].pk).likes_counter, 1)
+    
+    def test_replaced_claim(self):
+        """
+        Ensure that claimed opinions replaced before they are applied are
+        skipped, so an older opinion is never applied after a later one.
+        """
+        enqueue_opinion(self.users[1], self.movies[0], OPINION_LIKE)
+        claim, claimed = claim_outbox()
+        
+        enqueue_opinion(self.users[1], self.movies[0], OPINION_HATE)
+        self.assertEqual(apply_outbox(), 1)
+        self.assertEqual(apply_claimed(claim), 0)
+        
+        self.assertEqual(MovieOpinion.objects.get(user=self.users[1], movie=self.movies[0]).opinion, OPINION_HATE)
+        movie = Movie.objects.get(pk=self.movies[0].pk)
+        self.assertEqual((movie.likes_counter, movie.hates_counter), (0, 1))
+    
+    def test_failed_opinions(self):
+        """
+        Ensure that opinions failing to be applied do not block the ones of 
+        other users and are set aside after MAX_ATTEMPTS.
+        """
+        set_opinions = outbox.set_opinions
+        def failing_set_opinions(user, opinions):
+            if user.pk == self.users[1].pk:
+                raise ValueError('Invalid opinion')
+            return set_opinions(user, opinions)
+        outbox.set_opinions = failing_set_opinions
+        self.addCleanup(setattr, outbox, 'set_opinions', set_opinions)
+        
+        enqueue_opinion(self.users[1], self.movies[0], OPINION_LIKE)
+        enqueue_opinion(self.users[3], self.movies[0], OPINION_LIKE)
+        
+        self.assertEqual(apply_outbox(), 2)
+        self.assertEqual(list(MovieOpinion.objects.values_list('user_id', flat=True)), [self.users[3].pk])
+        self.assertEqual(MovieOpinionOutbox.objects.get().attempts, 1)
+        
+        self.assertEqual(apply_outbox(), 1)
+        self.assertEqual(apply_outbox(), 0)
+        entry = MovieOpinionOutbox.objects.get()
+        self.assertEqual((entry.attempts, entry.error), (2, 'ValueError: Invalid opinion'))
+        
+        outbox.set_opinions = set_opinions
+        enqueue_opinion(self.users[1], self.movies[0], OPINION_HATE)
+        self.assertEqual(apply_outbox(), 1)
+        self.assertEqual(MovieOpinion.objects.get(user=self.users[1]).opinion, OPINION_HATE)
+    
+    def test_owner(self):
+        """
+        Ensure that owners can not queue opinions of their movies and that
+        opinions the movie no longer accepts are dropped.
+        """
+        response = self.post_opinion(self.movies[0].user, self.movies[0], OPINION_LIKE)
+        
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(MovieOpinionOutbox.objects.exists())
+        
+        enqueue_opinion(self.users[1], self.movies[0], OPINION_LIKE)
+        Movie.objects.filter(pk=self.movies[0].pk).update(user=self.users[1])
+        
+        self.assertEqual(apply_outbox(), 1)
+        self.assertFalse(MovieOpinion.objects.exists())
+        self.assertFalse(MovieOpinionOutbox.objects.exists())
+    
+    def test_drain_command(self):
+        """
+        Ensure that the drain command applies all the queued opinions.
+        """
+        for movie in self.movies[1:]:
+            enqueue_opinion(self.users[3], movie, OPINION_HATE)
+        
+        output = StringIO()
+        call_command('drain_opinion_outbox', batch_size=2, stdout=output)
+        
+        self.assertEqual(output.getvalue().strip(), '3 opinions applied.')
+        self.assertEqual(MovieOpinion.objects.filter(user=self.users[3], opinion=OPINION_HATE).count(), 3)
+        self.assertFalse(MovieOpinionOutbox.objects.exists())
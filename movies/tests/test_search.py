@@ -0,0 +1,113 @@
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from django.urls import reverse
+
+from movies.cache import get_cache
+from movies.models import Movie
+from movies.search import (
+    get_search_terms,
+    search_movies_unindexed,
+    create_search_index,
+    drop_search_index
+)
+from movies.factory import get_sample_users
+
+
+class MovieFullTextSearchTests(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.user = get_sample_users(number=1)[0]
+        self.movies = [
+            Movie.objects.create(user=self.user, title='Space war', 
+                                 description='A war in space, space and more space.'),
+            Movie.objects.create(user=self.user, title='Love story', 
+                                 description='A long love story that ends somewhere in outer space.'),
+            Movie.objects.create(user=self.user, title='River king', description='No match here.'),
+        ]
+        Movie.objects.filter(pk=self.movies[1].pk).update(likes_counter=5)
+    
+    def search(self, query, **params):
+        params['q'] = query
+        response = self.client.get(reverse('movie-list'), params, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+    
+    def test_search_terms(self):
+        """
+        Ensure that full text search syntax is dropped from search queries.
+        """
+        self.assertEqual(get_search_terms('"Space" OR -war*: NEAR(a)'), ['space', 'or', 'war', 'near', 'a'])
+        self.assertEqual(get_search_terms(' "* '), [])
+    
+    def test_search_ranked_by_relevance(self):
+        """
+        Ensure that matching movies are ordered by relevance, prefixes of the 
+        last word match and syntax characters are ignored.
+        """
+        response = self.search('space')
+        self.assertEqual([m['id'] for m in response.data['results']], 
+                         [self.movies[0].pk, self.movies[1].pk])
+        self.assertEqual(response.data['count'], 2)
+        
+        response = self.search('love sto')
+        self.assertEqual([m['id'] for m in response.data['results']], [self.movies[1].pk])
+        self.assertEqual(self.search('"war": -(').data['count'], 1)
+        self.assertEqual(self.search('"*').data['count'], 3)
+    
+    def test_search_with_ordering_and_pagination(self):
+        """
+        Ensure that search composes with ordering, user search and cursor 
+        pagination.
+        """
+        response = self.search('space', ordering='-likes_counter')
+        self.assertEqual([m['id'] for m in response.data['results']], 
+                         [self.movies[1].pk, self.movies[0].pk])
+        
+        response = self.search('space', pagination='cursor', limit=1)
+        self.assertEqual([m['id'] for m in response.data['results']], [self.movies[1].pk])
+        response = self.client.get(response.data['next'], format='json')
+        self.assertEqual([m['id'] for m in response.data['results']], [self.movies[0].pk])
+        
+        self.assertEqual(self.search('space', search=self.user.username).data['count'], 2)
+        self.assertEqual(self.search('space', search='nobody').data['count'], 0)
+    
+    def test_search_index_is_synced(self):
+        """
+        Ensure that the index follows created, updated and deleted movies.
+        """
+        movie = self.movies[2]
+        movie.title = 'Space river'
+        movie.save()
+        self.assertEqual(self.search('river').data['count'], 1)
+        self.assertEqual(self.search('space').data['count'], 3)
+        
+        Movie.objects.filter(pk=movie.pk).update(description='Dragons')
+        self.assertEqual(self.search('dragons').data['count'], 1)
+        
+        movie.delete()
+        self.assertEqual(self.search('river').data['count'], 0)
+        self.assertEqual(self.search('space').data['count'], 2)
+    
+    def test_unindexed_search(self):
+        """
+        Ensure that databases without a full text index match all terms with
+        `icontains` and skip the index in migrations.
+        """
+        movies = search_movies_unindexed(Movie.objects.order_by('-search_rank', 'id'), ['space', 'sto'])
+        self.assertEqual([movie.pk for movie in movies], [self.movies[1].pk])
+        
+        movies = search_movies_unindexed(Movie.objects.order_by('-search_rank', 'id'), ['space'])
+        self.assertEqual([movie.pk for movie in movies], [self.movies[0].pk, self.movies[1].pk])
+        
+        class SchemaEditor(object):
+            connection = type('Connection', (object, ), {'vendor': 'mysql'})()
+            statements = []
+            
+            def execute(self, sql):
+                self.statements.append(sql)
+        
+        schema_editor = SchemaEditor()
+        create_search_index(schema_editor)
+        drop_search_index(schema_editor)
+        self.assertEqual(schema_editor.statements, [])
@@ -1,7 +1,19 @@
+from datetime import timedelta
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.six.moves.urllib.parse import parse_qs, urlsplit
+from django.utils.timezone import now
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from movies.cache import get_cache
 
 from movies.serializers import MovieSerializer
-from movies.models import OPINION_LIKE, OPINION_HATE
+from movies.models import Movie, OPINION_LIKE, OPINION_HATE
 from movies.factory import (
     get_sample_users,
     get_sample_movies,
@@ -66,4 +78,120 @@ class MovieSerializerTests(TestCase):
         
         request = get_sample_request(other_user)
         data = MovieSerializer(instance=movie, context={'request': request}).data
-        self.assertFalse(data['is_hated'])
\ No newline at end of file
+        self.assertFalse(data['is_hated'])
+
+class MovieListSerializerTests(TestCase):
+    def serialize_movies(self, user):
+        request = get_sample_request(user)
+        qs = Movie.objects.select_related('user')
+        return MovieSerializer(qs, many=True, context={'request': request}).data
+    
+    def test_opinions_match_single_serializer(self):
+        """
+        Ensure that list serialized movies have the same opinion attributes as 
+        single serialized movies.
+        """
+        users = get_sample_users()
+        movies = get_sample_movies(users)
+        user = users[-1]
+        set_sample_opinion(user, movies[0], OPINION_LIKE)
+        set_sample_opinion(user, movies[1], OPINION_HATE)
+        set_sample_opinion(user, movies[2], None)
+        
+        request = get_sample_request(user)
+        data = self.serialize_movies(user)
+        expected_data = [MovieSerializer(instance=movie, context={'request': request}).data 
+                         for movie in Movie.objects.all()]
+        
+        self.assertEqual(data, expected_data)
+    
+    def test_opinions_query_count_is_constant(self):
+        """
+        Ensure that list serialization queries do not depend on the number of 
+        movies.
+        """
+        users = get_sample_users()
+        user = users[-1]
+        
+        movies = get_sample_movies(users, number=2)
+        set_sample_opinion(user, movies[0], OPINION_LIKE)
+        with CaptureQueriesContext(connection) as few_movies_queries:
+            self.serialize_movies(user)
+        
+        movies = get_sample_movies(users, number=20)
+        set_sample_opinion(user, movies[0], OPINION_HATE)
+        with CaptureQueriesContext(connection) as many_movies_queries:
+            data = self.serialize_movies(user)
+        
+        self.assertEqual(len(data), 22)
+        self.assertEqual(len(few_movies_queries), len(many_movies_queries))
+
+
+class MovieValuesSerializerTests(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.users = get_sample_users()
+        movies = get_sample_movies(self.users, number=30)
+        for index, movie in enumerate(movies):
+            # relative times away from bucket boundaries so both renders match
+            Movie.objects.filter(pk=movie.pk).update(
+                user=self.users[index % 3], 
+                description=None if index % 7 == 0 else u'Caf\xe9 "{}"'.format(index),
+                air_date=None if index % 5 == 0 else movie.air_date,
+                publication_date=now() - timedelta(days=index * 11, hours=index, minutes=30))
+        for user in self.users[1:]:
+            for movie in movies[::4]:
+                set_sample_opinion(user, movie, OPINION_HATE if user.pk % 2 else OPINION_LIKE)
+        self.users[0].first_name = u'M\xeftsos'
+        self.users[0].save()
+    
+    def assert_same_content(self, params=None, user=None):
+        self.client.force_authenticate(user=user)
+        responses = []
+        for values_serializer in (False, True):
+            get_cache().clear()
+            with self.settings(MOVIES_VALUES_SERIALIZER=values_serializer):
+                responses.append(self.client.get(reverse('movie-list'), params or {}))
+        
+        self.assertEqual(responses[0].status_code, status.HTTP_200_OK)
+        self.assertEqual(responses[0].content, responses[1].content)
+        return responses[1]
+    
+    def test_same_json_as_movie_serializer(self):
+        """
+        Ensure that lists rendered from values rows are byte identical to 
+        lists of MovieSerializer for anonymous users, voters and owners.
+        """
+        for user in (None, self.users[0], self.users[3]):
+            response = self.assert_same_content(user=user)
+            self.assertEqual(len(response.data['results']), 30)
+            self.assertEqual(self.assert_same_content({'ordering': 'air_date', 'limit': 7, 'offset': 3}, 
+                                                      user=user).data['count'], 30)
+    
+    def test_same_json_with_sparse_fields_search_and_cursor(self):
+        """
+        Ensure that sparse fieldsets, search and cursor pages are rendered the
+        same from values rows.
+        """
+        user = self.users[2]
+        self.assert_same_content({'fields': 'id,is_liked,user'}, user=user)
+        self.assert_same_content({'omit': 'user,description,is_hated'}, user=user)
+        self.assert_same_content({'search': self.users[1].username, 'ordering': '-hates_counter'}, user=user)
+        self.assert_same_content({'q': 'caf'}, user=user)
+        
+        params = {'pagination': 'cursor', 'limit': 10, 'ordering': '-likes_counter'}
+        response = self.assert_same_content(params, user=user)
+        params['cursor'] = parse_qs(urlsplit(response.data['next']).query)['cursor'][0]
+        self.assert_same_content(params, user=user)
+    
+    def test_values_queries(self):
+        """
+        Ensure that owners and opinions of a page are fetched with one query
+        each.
+        """
+        self.client.force_authenticate(user=self.users[-1])
+        with self.settings(MOVIES_VALUES_SERIALIZER=True):
+            with self.assertNumQueries(5):
+                self.client.get(reverse('movie-list'))
+            with self.assertNumQueries(3):
+                self.client.get(reverse('movie-list'), {'fields': 'id,title,is_opinion_disabled'})
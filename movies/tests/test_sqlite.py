@@ -0,0 +1,63 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+
+from benchmarks.writes import SQLITE_PROFILES
+from core.backends.sqlite3.base import DatabaseWrapper
+
+
+class SQLiteProfileTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.name = os.path.join(directory, 'profile.sqlite3')
+    
+    def connect(self):
+        wrapper = DatabaseWrapper(dict(connection.settings_dict, NAME=self.name), alias='profile')
+        wrapper.ensure_connection()
+        self.addCleanup(wrapper.close)
+        return wrapper
+    
+    def get_pragma(self, wrapper, name):
+        return wrapper.connection.execute('PRAGMA {}'.format(name)).fetchone()[0]
+    
+    def test_pragmas(self):
+        """
+        Ensure that new connections use WAL, normal sync, mmap and a busy
+        timeout and that transactions take the write lock when they begin.
+        """
+        wrapper = self.connect()
+        
+        self.assertEqual(self.get_pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(self.get_pragma(wrapper, 'synchronous'), 1)
+        self.assertEqual(self.get_pragma(wrapper, 'busy_timeout'), 5000)
+        self.assertEqual(self.get_pragma(wrapper, 'mmap_size'), 256 * 1024 * 1024)
+        
+        # as transaction.atomic begins transactions on SQLite
+        wrapper._start_transaction_under_autocommit()
+        other = sqlite3.connect(self.name, timeout=0)
+        self.addCleanup(other.close)
+        with self.assertRaises(sqlite3.OperationalError):
+            other.execute('BEGIN IMMEDIATE')
+        wrapper.connection.rollback()
+    
+    def test_default_profile(self):
+        """
+        Ensure that the default profile restores deferred transactions.
+        """
+        with override_settings(SQLITE=SQLITE_PROFILES['default']):
+            wrapper = self.connect()
+            
+            self.assertEqual(self.get_pragma(wrapper, 'journal_mode'), 'delete')
+            self.assertEqual(self.get_pragma(wrapper, 'synchronous'), 2)
+            
+            wrapper._start_transaction_under_autocommit()
+            other = sqlite3.connect(self.name, timeout=0)
+            self.addCleanup(other.close)
+            other.execute('BEGIN IMMEDIATE')
+            other.rollback()
+            wrapper.connection.rollback()
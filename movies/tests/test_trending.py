@@ -0,0 +1,89 @@
+from datetime import timedelta
+
+from rest_framework.test import APITestCase
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.six import StringIO
+from django.utils.timezone import now
+
+from movies.models import Movie, OPINION_LIKE, OPINION_HATE
+from movies.trending import get_trending_score
+from movies.factory import (
+    get_sample_users,
+    get_sample_movies,
+    set_sample_opinions,
+    set_sample_opinion
+)
+
+
+class TrendingScoreTests(TestCase):
+    def test_trending_score(self):
+        """
+        Ensure that scores grow with net likes and publication date.
+        """
+        date = now()
+        
+        self.assertGreater(get_trending_score(10, 0, date), get_trending_score(1, 0, date))
+        self.assertGreater(get_trending_score(1, 0, date), get_trending_score(0, 0, date))
+        self.assertGreater(get_trending_score(0, 0, date), get_trending_score(0, 1, date))
+        self.assertEqual(get_trending_score(5, 5, date), get_trending_score(0, 0, date))
+        # a day newer movie outranks one with ten times the votes
+        self.assertGreater(get_trending_score(1, 0, date + timedelta(days=1)), 
+                           get_trending_score(10, 0, date))
+    
+    def test_trending_score_is_updated(self):
+        """
+        Ensure that scores are set on create and updated on opinion changes.
+        """
+        users = get_sample_users()
+        movies = get_sample_movies(users)
+        movie = movies[0]
+        
+        movie.refresh_from_db()
+        self.assertEqual(movie.trending, get_trending_score(0, 0, movie.publication_date))
+        
+        set_sample_opinion(users[1], movie, OPINION_LIKE)
+        set_sample_opinion(users[2], movie, OPINION_LIKE)
+        set_sample_opinion(users[3], movie, OPINION_HATE)
+        movie.refresh_from_db()
+        self.assertEqual(movie.trending, get_trending_score(2, 1, movie.publication_date))
+    
+    def test_rebuild_trending_command(self):
+        """
+        Ensure that the rebuild command recomputes scores of all movies.
+        """
+        users = get_sample_users()
+        movies = get_sample_movies(users)
+        set_sample_opinions(users[1:], movies, OPINION_LIKE)
+        Movie.objects.update(trending=0)
+        
+        out = StringIO()
+        call_command('rebuild_trending', batch_size=3, stdout=out)
+        
+        self.assertEqual(out.getvalue().strip(), '4 movies updated.')
+        for movie in Movie.objects.all():
+            self.assertEqual(movie.trending, get_trending_score(movie.likes_counter, 
+                                                                movie.hates_counter, 
+                                                                movie.publication_date))
+
+
+class MovieViewSetTrendingTests(APITestCase):
+    def test_ordering_descending_trending(self):
+        """
+        Ensure that movies can be ordered by descending trending score.
+        """
+        users = get_sample_users()
+        movies = get_sample_movies(users)
+        set_sample_opinions(users[1:], movies, OPINION_LIKE)
+        
+        expected = list(Movie.objects.order_by('-trending', '-id').values_list('pk', flat=True))
+        
+        for params in ('ordering=-trending', 'ordering=-trending&pagination=cursor'):
+            response = self.client.get('{}?{}'.format(reverse('movie-list'), params), format='json')
+            self.assertEqual([m['id'] for m in response.data['results']], expected)
+            self.assertNotIn('trending', response.data['results'][0])
+        
+        # same publication time, most liked first
+        self.assertEqual(expected[0], movies[-1].pk)
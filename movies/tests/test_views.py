@@ -0,0 +1,102 @@
+import json
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from django.conf import settings
+from django.test import override_settings
+from django.urls import reverse
+
+from movies.cache import get_cache, get_list_cache_stats
+from movies.models import Movie, OPINION_LIKE
+from movies.factory import get_sample_users, get_sample_movies, set_sample_opinion
+from movies.tests.utils import SHARED_CACHES
+
+
+@override_settings(CACHES=SHARED_CACHES)
+class HomepageFirstPageTests(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.users = get_sample_users()
+        self.movies = get_sample_movies(self.users)
+        self.other_movie = Movie.objects.create(title='other', description='other', user=self.users[1])
+        set_sample_opinion(self.users[2], self.movies[1], OPINION_LIKE)
+    
+    def get_first_page(self, params=None):
+        response = self.client.get(reverse('homepage'), params)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertContains(response, '<script type="application/json" id="movies-first-page">')
+        return json.loads(response.context['first_page'])
+    
+    def get_api_page(self, params=None):
+        return json.loads(self.client.get(reverse('movie-list'), params, format='json').content.decode('utf-8'))
+    
+    def test_first_page(self):
+        """
+        Ensure that the homepage embeds the first page of the movies API.
+        """
+        first_page = self.get_first_page()
+        
+        self.assertEqual(first_page['ordering'], '-publication_date')
+        self.assertIsNone(first_page['search'])
+        self.assertEqual(first_page['page'], self.get_api_page())
+        self.assertEqual(len(first_page['page']['results']), 5)
+    
+    def test_search_and_ordering(self):
+        """
+        Ensure that the embedded page follows the search and ordering of the
+        homepage.
+        """
+        params = {'search': self.users[0].username, 'ordering': '-likes_counter'}
+        first_page = self.get_first_page(params)
+        
+        self.assertEqual((first_page['search'], first_page['ordering']),
+                         (self.users[0].username, '-likes_counter'))
+        self.assertEqual(first_page['page'], self.get_api_page(params))
+        self.assertEqual([movie['id'] for movie in first_page['page']['results']][:1], [self.movies[1].pk])
+        self.assertNotIn(self.other_movie.pk, [movie['id'] for movie in first_page['page']['results']])
+    
+    def test_cached_page(self):
+        """
+        Ensure that anonymous homepages share the cached pages of the API.
+        """
+        self.get_api_page()
+        hits = get_list_cache_stats()['hits']
+        
+        self.get_first_page()
+        self.assertEqual(get_list_cache_stats()['hits'], hits + 1)
+    
+    def test_authenticated_page(self):
+        """
+        Ensure that the embedded page has the opinions of the user.
+        """
+        self.client.force_login(self.users[2])
+        first_page = self.get_first_page()
+        
+        liked = dict((movie['id'], movie['is_liked']) for movie in first_page['page']['results'])
+        self.assertTrue(liked[self.movies[1].pk])
+        self.assertFalse(liked[self.movies[0].pk])
+    
+    def test_counter_events(self):
+        """
+        Ensure that the homepage listens to counter events only when they are
+        enabled.
+        """
+        self.assertNotContains(self.client.get(reverse('homepage')), 'data-counter-events')
+        
+        with self.settings(MOVIES_EVENTS=dict(settings.MOVIES_EVENTS, ENABLED=True)):
+            self.assertContains(self.client.get(reverse('homepage')), 'data-counter-events')
+    
+    def test_script_escape(self):
+        """
+        Ensure that movie texts can not end the inline script.
+        """
+        Movie.objects.filter(pk=self.movies[0].pk).update(title='</script><script>alert(1)</script>')
+        
+        response = self.client.get(reverse('homepage'))
+        
+        self.assertNotContains(response, '</script><script>alert')
+        title = [movie['title'] for movie in json.loads(response.context['first_page'])['page']['results']
+                 if movie['id'] == self.movies[0].pk]
+        self.assertEqual(title, ['</script><script>alert(1)</script>'])
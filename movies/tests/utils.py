@@ -0,0 +1,12 @@
+import os
+import tempfile
+
+
+# file caches are shared by the processes of a host as memcached would be, 
+# so that the caches disabled on local memory caches can be tested
+SHARED_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(tempfile.gettempdir(), 'movies-tests-cache'),
+    },
+}
@@ -0,0 +1,95 @@
+import math
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Case, When, Value, FloatField
+from django.utils.timezone import now, utc
+
+from movies.models import Movie
+
+
+# publication dates are measured from this epoch to keep scores small
+TRENDING_EPOCH = datetime(2018, 1, 1, tzinfo=utc)
+
+# movies updated per UPDATE query, keeps the query parameters within limits
+TRENDING_BATCH_SIZE = 200
+
+
+def get_trending_score(likes, hates, publication_date):
+    """
+    Get the trending score of a movie.
+    
+    Net likes count logarithmically, 9 net likes weigh as much as the next 90,
+    and every `MOVIES_TRENDING['DECAY']` seconds of newer publication weigh 
+    as much as ten times the net likes. The age is applied to the publication
+    date instead of the current time, so the scores of movies keep their 
+    order as time passes and never need to be decayed again.
+    
+    Args:
+        likes(int): likes counter
+        hates(int): hates counter
+        publication_date(datetime): publication date, now when None
+    
+    Returns:
+        float: trending score
+    """
+    votes = likes - hates * settings.MOVIES_TRENDING['HATE_WEIGHT']
+    order = math.log10(1 + abs(votes))
+    sign = 1 if votes > 0 else -1 if votes < 0 else 0
+    
+    seconds = ((publication_date or now()) - TRENDING_EPOCH).total_seconds()
+    return round(sign * order + seconds / settings.MOVIES_TRENDING['DECAY'], 7)
+
+
+def update_trending(movie_ids):
+    """
+    Recompute the trending scores of movies from their counters with a
+    single select and one UPDATE per batch of movies.
+    
+    Args:
+        movie_ids(list<int>): list of movie ids
+    
+    Returns:
+        int: number of updated movies
+    """
+    movie_ids = list(movie_ids)
+    updated = 0
+    for index in range(0, len(movie_ids), TRENDING_BATCH_SIZE):
+        movies = Movie.objects.filter(pk__in=movie_ids[index:index + TRENDING_BATCH_SIZE]).order_by()
+        movies = movies.values_list('pk', 'likes_counter', 'hates_counter', 'publication_date')
+        scores = dict((pk, get_trending_score(likes, hates, publication_date))
+                      for pk, likes, hates, publication_date in movies)
+        if scores:
+            trending = Case(*[When(pk=pk, then=Value(score)) for pk, score in scores.items()],
+                            output_field=FloatField())
+            updated += Movie.objects.filter(pk__in=list(scores.keys())).update(trending=trending)
+    
+    return updated
+
+
+def rebuild_trending(queryset=None, batch_size=1000):
+    """
+    Recompute the trending scores of all movies in batches by primary key,
+    needed after `MOVIES_TRENDING` changes or after counters are updated
+    without the counters engine.
+    
+    Args:
+        queryset(django.db.models.QuerySet): movies to be updated, all by default
+        batch_size(int): number of movies selected per batch
+    
+    Returns:
+        int: number of updated movies
+    """
+    queryset = Movie.objects.all() if queryset is None else queryset
+    
+    updated = 0
+    last_id = 0
+    while True:
+        movie_ids = list(queryset.filter(pk__gt=last_id).order_by('pk'
+                                       ).values_list('pk', flat=True)[:batch_size])
+        if not movie_ids:
+            break
+        last_id = movie_ids[-1]
+        updated += update_trending(movie_ids)
+    
+    return updated
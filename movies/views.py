@@ -1,5 +1,81 @@
+import copy
+
+from django.conf import settings
+from django.http import QueryDict
+from django.urls import reverse
 from django.views.generic import TemplateView
 
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+
+from .viewsets import MovieViewSet
+
+
+# query params of the homepage passed on to the movies list
+FIRST_PAGE_PARAMS = ('search', 'ordering')
+
+# characters that could end or comment out the inline script
+SCRIPT_ESCAPES = ((b'<', b'\\u003c'), (b'>', b'\\u003e'), (b'&', b'\\u0026'))
+
+
+def get_first_page(request):
+    """
+    Get the first page of the movies list API for the `search` and `ordering`
+    query params of a request, through the list action of MovieViewSet so that
+    pages are cached and serialized as API responses are.
+    
+    Args:
+        request(django.http.HttpRequest): homepage request
+    
+    Returns:
+        dict: movies list response data or None when it fails
+    """
+    query = QueryDict(mutable=True)
+    for name in FIRST_PAGE_PARAMS:
+        if request.GET.get(name):
+            query[name] = request.GET[name]
+    
+    api_request = copy.copy(request)
+    api_request.path = api_request.path_info = reverse('movie-list')
+    api_request.GET = query
+    api_request.META = dict(request.META, QUERY_STRING=query.urlencode(), HTTP_ACCEPT='application/json')
+    # the conditional headers of the homepage do not apply to the embedded page
+    api_request.META.pop('HTTP_IF_NONE_MATCH', None)
+    api_request.META.pop('HTTP_IF_MODIFIED_SINCE', None)
+    
+    response = MovieViewSet.as_view({'get': 'list'})(api_request)
+    return response.data if response.status_code == status.HTTP_200_OK else None
+
+
+def render_inline_json(data):
+    """
+    Render data as the API does for a `<script type="application/json">` tag.
+    """
+    content = JSONRenderer().render(data)
+    for character, escape in SCRIPT_ESCAPES:
+        content = content.replace(character, escape)
+    
+    return content.decode('utf-8')
+
 
 class MoviesListView(TemplateView):
     template_name = 'movies/homepage.html'
+    
+    def get_context_data(self, **kwargs):
+        """
+        Embed the first movies page of the homepage search and ordering, so
+        that main.js renders it without requesting it, and tell main.js 
+        whether to listen to counter events.
+        """
+        context = super(MoviesListView, self).get_context_data(**kwargs)
+        context['counter_events'] = settings.MOVIES_EVENTS['ENABLED']
+        
+        page = get_first_page(self.request)
+        if page is not None:
+            context['first_page'] = render_inline_json({
+                'search': self.request.GET.get('search') or None,
+                'ordering': self.request.GET.get('ordering') or MovieViewSet.ordering[0],
+                'page': page,
+            })
+        
+        return context
@@ -1,30 +1,135 @@
-from django.http import Http404
+from django.conf import settings
+from django.http import Http404, StreamingHttpResponse
 
 from rest_framework import mixins, viewsets, filters, status, exceptions
-from rest_framework.decorators import detail_route
-from rest_framework.permissions import IsAuthenticated, AllowAny
-from rest_framework.filters import OrderingFilter, SearchFilter
+from rest_framework.decorators import detail_route, list_route
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
+from rest_framework.filters import OrderingFilter
 from rest_framework.response import Response
 
+from core.instrumentation import InstrumentedViewSetMixin
+from core.renderers import FastJSONRenderer, EventStreamRenderer
+
 from .models import Movie, OPINION_LIKE, OPINION_HATE
-from .serializers import MovieSerializer, MovieOpinionSerializer
+from .cache import is_list_cache_enabled, get_cached_list, set_cached_list, get_list_cache_stats
+from .events import iter_event_stream
+from .export import EXPORT_FORMATS, iter_movie_rows
+from .etags import get_list_etag, is_not_modified, set_etag_headers
+from .filters import UserSearchFilter, MovieFullTextSearchFilter
+from .pagination import MovieCursorPagination
+from .serializers import (
+    MovieSerializer, 
+    MovieValuesSerializer, 
+    MovieOpinionSerializer, 
+    MovieBulkOpinionSerializer
+)
 
 
-class MovieViewSet(mixins.ListModelMixin, 
+class MovieViewSet(InstrumentedViewSetMixin,
+                   mixins.ListModelMixin, 
                    mixins.CreateModelMixin,
                    viewsets.GenericViewSet):
 
-    queryset = Movie.objects.all()
+    # owners are joined for the nested user serializer and columns that are 
+    # never rendered are not loaded
+    queryset = Movie.objects.select_related('user').defer(
+        'updated_at', 
+        'user__password', 
+        'user__last_login', 
+        'user__email', 
+        'user__date_joined'
+    )
     serializer_class = MovieSerializer
     
-    filter_backends = (OrderingFilter, SearchFilter)
-    ordering_fields = ('likes_counter', 'hates_counter', 'publication_date', 'air_date', )
+    filter_backends = (OrderingFilter, UserSearchFilter, MovieFullTextSearchFilter)
+    ordering_fields = ('likes_counter', 'hates_counter', 'publication_date', 'air_date', 'trending', )
     ordering = ('-publication_date', )
     search_fields = ('=user__username', )
     
+    cursor_pagination_class = MovieCursorPagination
+    
+    @property
+    def paginator(self):
+        """
+        Use keyset pagination when requested with `pagination=cursor` or a 
+        `cursor` query param, limit|offset pagination otherwise.
+        """
+        if not hasattr(self, '_paginator') and self.is_cursor_paginated():
+            self._paginator = self.cursor_pagination_class()
+        
+        return super(MovieViewSet, self).paginator
+    
+    def is_cursor_paginated(self):
+        request = getattr(self, 'request', None)
+        if request is None:
+            return False
+        
+        query_params = request.query_params
+        return query_params.get('pagination') == 'cursor' or 'cursor' in query_params
+    
+    def get_sparse_fields(self):
+        """
+        Get the names of the fields requested with the `fields` query param 
+        minus the ones of the `omit` query param, comma separated.
+        
+        Returns:
+            set<str>: field names or None when all fields are rendered
+        """
+        if not hasattr(self, '_sparse_fields'):
+            self._sparse_fields = None
+            
+            query_params = self.request.query_params
+            requested = dict((param, [name for name in query_params.get(param, '').split(',') if name])
+                             for param in ('fields', 'omit'))
+            if requested['fields'] or requested['omit']:
+                available = set(self.get_serializer_class()(context=self.get_serializer_context()).fields)
+                errors = dict((param, 'Unknown fields `{}`.'.format('`, `'.join(sorted(set(names) - available))))
+                              for param, names in requested.items() if set(names) - available)
+                if errors:
+                    raise exceptions.ValidationError(errors)
+                
+                fields = set(requested['fields']) if requested['fields'] else available
+                self._sparse_fields = fields - set(requested['omit'])
+        
+        return self._sparse_fields
+    
+    def get_serializer(self, *args, **kwargs):
+        if self.action == 'list':
+            kwargs.setdefault('fields', self.get_sparse_fields())
+            if settings.MOVIES_VALUES_SERIALIZER:
+                kwargs.pop('many', None)
+                kwargs['context'] = self.get_serializer_context()
+                return MovieValuesSerializer(*args, **kwargs)
+        
+        return super(MovieViewSet, self).get_serializer(*args, **kwargs)
+    
+    def filter_queryset(self, queryset):
+        """
+        Load only the columns of sparse fieldsets and of the list ordering, as
+        `.values()` rows when lists are rendered by MovieValuesSerializer.
+        """
+        queryset = super(MovieViewSet, self).filter_queryset(queryset)
+        if self.action != 'list':
+            return queryset
+        
+        model_fields = set(field.name for field in Movie._meta.concrete_fields)
+        ordering = [name.lstrip('-') for name in queryset.query.order_by 
+                    if name.lstrip('-') in model_fields]
+        fields = self.get_sparse_fields()
+        
+        if settings.MOVIES_VALUES_SERIALIZER:
+            queryset = MovieValuesSerializer.get_values(queryset.select_related(None), fields, ordering)
+        elif fields is not None:
+            columns = self.get_serializer_class().get_columns(fields)
+            if 'user' not in fields:
+                queryset = queryset.select_related(None)
+            queryset = queryset.only(*(columns + ordering))
+        
+        return queryset
+    
     def check_object_permissions(self, request, instance):
         if self.action == 'opinion':
-            if  instance.user == request.user:
+            if instance.user_id == request.user.pk:
                 raise exceptions.PermissionDenied
                 
         return super(MovieViewSet, self).check_object_permissions(request, instance)
@@ -78,7 +183,12 @@ class MovieViewSet(mixins.ListModelMixin,
         
         request:
         
-            {}
+            {
+                q(str): (optional) full text search of title and description,
+                        ordered by relevance without ordering
+                fields(str): (optional) comma separated fields of the models
+                omit(str): (optional) comma separated fields left out of the models
+            }
         
         response:
             
@@ -90,6 +200,22 @@ class MovieViewSet(mixins.ListModelMixin,
                
            }
         
+        cursor pagination request (?pagination=cursor&limit=&count=true):
+        
+            {
+                cursor(str): (optional) cursor of the next link
+                limit(int): (optional) max: 100
+                count(bool): (optional) include count in response
+            }
+        
+        cursor pagination response:
+            
+           { 
+                next(str): link to fetch next resources
+                count(int): only when requested
+                results(list): list of models
+           }
+        
         model:
             
             {
@@ -108,9 +234,161 @@ class MovieViewSet(mixins.ListModelMixin,
             200: on failure
             201: on success
             403: on user without permission
+        
+        Pages of anonymous users are cached until the movies catalog changes.
+        Responses have ETag and Last-Modified headers, requests with a matching
+        If-None-Match header get a 304 response.
+        """
+        is_cached = not request.user.is_authenticated() and is_list_cache_enabled()
+        if is_cached:
+            cache_key, cached = get_cached_list(request)
+            if cached is not None:
+                return self.get_conditional_response(request, cached['data'], 
+                                                     cached['etag'], cached['last_modified'])
+        
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            etag, last_modified = get_list_etag(page, request, getattr(self.paginator, 'count', None))
+        else:
+            queryset = list(queryset)
+            etag, last_modified = get_list_etag(queryset, request, len(queryset))
+        if is_not_modified(request, etag):
+            return set_etag_headers(Response(status=status.HTTP_304_NOT_MODIFIED), etag, last_modified)
+        
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            response = self.get_paginated_response(serializer.data)
+        else:
+            serializer = self.get_serializer(queryset, many=True)
+            response = Response(serializer.data)
+        
+        if is_cached:
+            set_cached_list(cache_key, {'data': response.data, 
+                                        'etag': etag, 
+                                        'last_modified': last_modified})
+        
+        return set_etag_headers(response, etag, last_modified)
+    
+    def get_conditional_response(self, request, data, etag, last_modified):
+        if is_not_modified(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(data)
+        
+        return set_etag_headers(response, etag, last_modified)
+    
+    @list_route(methods=['get'], permission_classes=[IsAdminUser], url_path='cache-stats')
+    def cache_stats(self, request, *args, **kwargs):
+        """
+        Get the hit|miss counters of the anonymous movies list cache.
+        
+        response:
             
+            {
+                hits(int):
+                misses(int):
+                version(int): catalog version
+            }
+        
+        http codes:
+
+            200: on success
+            403: on user without permission
         """
-        return super(MovieViewSet, self).list(request, *args, **kwargs)
+        return Response(get_list_cache_stats())
+    
+    @list_route(methods=['get'], permission_classes=[IsAdminUser])
+    def export(self, request, *args, **kwargs):
+        """
+        Stream all Movie resources with their owner and counters, movies are
+        read in chunks so that memory does not grow with the catalog.
+        
+        request (?output=ndjson|csv&search=):
+            
+            {
+                output(str): (optional) ndjson|csv, default ndjson
+                search(str): (optional) username of the movies owner
+                q(str): (optional) full text search of title and description
+            }
+        
+        response:
+            
+            one line per movie, after a header line on csv
+            
+            {
+                id(int): movie id,
+                title(str):,
+                description(str):,
+                user_id(int):,
+                username(str):,
+                air_date(datetime): datetime or null,
+                publication_date(datetime):,
+                likes_counter(int):,
+                hates_counter(int):
+            }
+        
+        http codes:
+
+            200: on success
+            400: on unknown output
+            403: on user without permission
+        """
+        output = request.query_params.get('output', 'ndjson')
+        if output not in EXPORT_FORMATS:
+            return Response({'error': 'Unknown output `{}`, use one of {}'.format(
+                                output, ', '.join(sorted(EXPORT_FORMATS)))},
+                            status=status.HTTP_400_BAD_REQUEST)
+        
+        iter_lines, content_type, extension = EXPORT_FORMATS[output]
+        queryset = self.filter_queryset(Movie.objects.all())
+        response = StreamingHttpResponse(iter_lines(iter_movie_rows(queryset)),
+                                         content_type='{}; charset=utf-8'.format(content_type))
+        response['Content-Disposition'] = 'attachment; filename="movies.{}"'.format(extension)
+        return response
+    
+    @list_route(methods=['get'], permission_classes=[AllowAny], 
+                renderer_classes=[FastJSONRenderer, EventStreamRenderer])
+    def events(self, request, *args, **kwargs):
+        """
+        Stream server sent events of likes|hates counter changes, changes of a
+        movie within settings.MOVIES_EVENTS COALESCE_WINDOW are sent once. Not
+        found unless settings.MOVIES_EVENTS is ENABLED.
+        
+        request (?ids=1,2,3):
+            
+            {
+                ids(str): (optional) comma separated ids of the movies of 
+                          interest, all movies by default
+            }
+        
+        response:
+            
+            event: counters
+            data: [{id(int):, likes_counter(int):, hates_counter(int):}]
+            
+            event: reset, when changes were missed and movies should be reloaded
+        
+        http codes:
+
+            200: on success
+            400: on invalid ids
+            404: on disabled events
+        """
+        if not settings.MOVIES_EVENTS['ENABLED']:
+            raise exceptions.NotFound
+        
+        ids = request.query_params.get('ids')
+        try:
+            movie_ids = set(int(movie_id) for movie_id in ids.split(',') if movie_id) if ids else None
+        except ValueError:
+            return Response({'error': 'Invalid ids `{}`'.format(ids)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        response = StreamingHttpResponse(iter_event_stream(movie_ids), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # proxies like nginx would hold the events back
+        response['X-Accel-Buffering'] = 'no'
+        return response
     
     @detail_route(methods=['post'])
     def opinion(self, request, *args, **kwargs):
@@ -146,9 +424,14 @@ class MovieViewSet(mixins.ListModelMixin,
                 publication_date(datetime):
             }
     
+        When settings.MOVIES_OPINION_OUTBOX is enabled the opinion is queued
+        and applied in the background, the counters of the response are the
+        current ones with the opinion applied.
+    
         http codes:
 
             200: on failure|success
+            202: on opinion queued
             403: on user without permission
             400: on invalid movie id
         """
@@ -160,8 +443,14 @@ class MovieViewSet(mixins.ListModelMixin,
             instance = self.get_object()
             serializer.is_valid(True)
             
-            opinion = serializer.save(user=request.user, movie=instance)
-            response_data = MovieSerializer(instance=opinion.movie, context={'request': request}).data
+            if settings.MOVIES_OPINION_OUTBOX['ENABLED']:
+                opinion = serializer.enqueue(user=request.user, movie=instance)
+                status_code = status.HTTP_202_ACCEPTED
+            else:
+                opinion = serializer.save(user=request.user, movie=instance)
+            movie_serializer = MovieSerializer(instance=opinion.movie, context={'request': request})
+            movie_serializer.opinions = {opinion.movie_id: opinion.opinion}
+            response_data = movie_serializer.data
         except Http404 as e:
             response_data['error'] = 'Movie with pk `{}` does not exist'.format(kwargs.get('pk'))
             status_code = status.HTTP_400_BAD_REQUEST
@@ -169,4 +458,39 @@ class MovieViewSet(mixins.ListModelMixin,
         #     response_data['error'] = 'Exception `{}`'.format(unicode(e))
 
         return Response(response_data, status=status_code)
- 
\ No newline at end of file
+     
+    @list_route(methods=['post'], permission_classes=[IsAuthenticated], 
+                url_path='opinions/bulk', url_name='bulk-opinions')
+    def bulk_opinions(self, request, *args, **kwargs):
+        """
+        Set your opinions about many Movie resources at once.
+        
+        request:
+            {
+                opinions(list): (required) max: 100
+                    [{movie(int): movie id, opinion(str): L|H|null}]
+            }
+        
+        response:
+            
+            {
+                results(list): one result per requested opinion in request order
+                    [{
+                        movie(int): movie id,
+                        status(str): ok|not_found|forbidden,
+                        opinion(str): L|H|null, only on ok
+                        likes_counter(int): only on ok
+                        hates_counter(int): only on ok
+                    }]
+            }
+    
+        http codes:
+
+            200: on success, per opinion failures are reported in results
+            400: on invalid request
+            403: on anonymous user
+        """
+        serializer = MovieBulkOpinionSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(True)
+        
+        return Response({'results': serializer.save(user=request.user)})